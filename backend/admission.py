@@ -0,0 +1,124 @@
+"""
+Admission control for code execution
+Tracks the test-case executions each worker process has in flight and how
+long they wait for a thread. When either passes its threshold the worker is
+overloaded: low-priority traffic (/run, /run-batch) is turned away with 503
+and a Retry-After estimate, while /submit is still admitted, so the work that
+is accepted keeps a bounded latency instead of everything timing out together.
+
+Limits apply per worker process, like the thread pools they protect.
+"""
+
+import os
+import math
+import time
+import threading
+from contextlib import contextmanager
+
+import metrics
+
+# Executions (queued or running) above which low-priority requests are shed
+MAX_IN_FLIGHT = int(os.getenv("ADMISSION_MAX_IN_FLIGHT", "100"))
+# Average seconds a task waits for a worker thread above which low-priority requests are shed
+MAX_QUEUE_WAIT = float(os.getenv("ADMISSION_MAX_QUEUE_WAIT", "1.0"))
+# Upper bound for the Retry-After header, in seconds
+MAX_RETRY_AFTER = 30
+
+# Weight of the newest sample in the moving averages
+_EWMA_WEIGHT = 0.2
+
+ADMISSION_REJECTED = metrics.Counter(
+    "admission_rejected_requests_total", "Requests turned away with 503 while overloaded", ("endpoint",)
+)
+
+class AdmissionController:
+    """In-flight execution count plus moving averages of queue wait and execution time"""
+
+    def __init__(self, max_in_flight: int = MAX_IN_FLIGHT, max_queue_wait: float = MAX_QUEUE_WAIT):
+        self.max_in_flight = max_in_flight
+        self.max_queue_wait = max_queue_wait
+        self.queued = 0
+        self.running = 0
+        self.queue_wait = 0.0  # seconds, moving average
+        self.execution_time = 0.0  # seconds, moving average
+        self._lock = threading.Lock()
+
+    @property
+    def in_flight(self) -> int:
+        return self.queued + self.running
+
+    def _average(self, current: float, sample: float) -> float:
+        return sample if current == 0.0 else current + _EWMA_WEIGHT * (sample - current)
+
+    def track_task(self, fn):
+        """
+        Wrap a function submitted to a test-case thread pool so it counts as
+        in flight from submission until it returns
+
+        Call this at submit time, like metrics.track_pool_task.
+        """
+        with self._lock:
+            self.queued += 1
+        submitted_at = time.perf_counter()
+
+        def run(*args, **kwargs):
+            started_at = time.perf_counter()
+            with self._lock:
+                self.queued -= 1
+                self.running += 1
+                self.queue_wait = self._average(self.queue_wait, started_at - submitted_at)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self.running -= 1
+                    self.execution_time = self._average(self.execution_time, time.perf_counter() - started_at)
+
+        return run
+
+    @contextmanager
+    def executing(self):
+        """Count an execution made directly on the request thread (no pool) as in flight"""
+        with self._lock:
+            self.running += 1
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.running -= 1
+                self.execution_time = self._average(self.execution_time, time.perf_counter() - started_at)
+
+    def overloaded(self) -> bool:
+        with self._lock:
+            # With nothing queued the wait average is stale: there is no backlog to wait behind
+            return (self.in_flight >= self.max_in_flight
+                    or (self.queued > 0 and self.queue_wait > self.max_queue_wait))
+
+    def retry_after(self) -> int:
+        """Seconds until the backlog should have drained enough to admit new work"""
+        with self._lock:
+            excess = self.in_flight - self.max_in_flight + 1
+            # Running tasks finish at about running / execution_time per second
+            drain = excess * self.execution_time / max(self.running, 1) if excess > 0 else 0.0
+            estimate = max(drain, self.queue_wait if self.queued else 0.0)
+        return min(max(math.ceil(estimate), 1), MAX_RETRY_AFTER)
+
+    def admit(self, endpoint: str, low_priority: bool = True):
+        """
+        Decide whether to accept a request
+
+        Returns:
+            None if admitted, otherwise the Retry-After value in seconds
+        """
+        if not low_priority or not self.overloaded():
+            return None
+        ADMISSION_REJECTED.labels(endpoint).inc()
+        return self.retry_after()
+
+controller = AdmissionController()
+
+metrics.Gauge(
+    "admission_in_flight_executions", "Test-case executions queued or running in this worker",
+    callback=lambda: controller.in_flight
+)
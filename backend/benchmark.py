@@ -0,0 +1,419 @@
+"""
+Scenario-based benchmark for the backend API
+
+Drives a weighted mix of login, problems, testcases, run, run-batch and
+submit requests at a constant arrival rate (open loop: requests are sent on
+schedule whether or not earlier ones have finished), then reports latency
+percentiles and throughput per route and saves machine-readable JSON.
+
+Usage:
+    python benchmark.py run --rate 10 --duration 60 --output results.json
+    python benchmark.py run --mix problems=3,run_batch=5,submit=1
+    python benchmark.py compare baseline.json results.json --threshold 10
+
+Every run, run-batch and submit request ends its code with a comment holding
+a per-request nonce. Identical requests would otherwise be answered by the
+execution result cache or joined to one already in flight, and the results
+would show capacity the executor path does not have.
+
+Run and run-batch requests are spread over --users simulated teams (team ids
+from BENCHMARK_TEAM_ID_BASE), so each gets its own rate limit bucket as in
+the contest instead of all sharing one.
+
+Note: the submit scenario overwrites the benchmark team's submission status.
+Use a dedicated team (--team-name/--password) rather than a real contestant.
+All submits share that team's submission rate limit (5, then one every 10
+seconds by default); raise SUBMIT_RATE_LIMIT_BURST and
+SUBMIT_RATE_LIMIT_PER_SECOND on the server for submit-heavy mixes.
+"""
+
+import argparse
+import itertools
+import json
+import math
+import random
+import secrets
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import requests
+
+# API base URL
+BASE_URL = "http://127.0.0.1:8001"
+
+DEFAULT_MIX = "login=1,problems=2,testcases=3,run=2,run_errors=1,run_batch=3,submit=1"
+
+# Team ids for simulated users' /run and /run-batch traffic (only used for rate limiting)
+BENCHMARK_TEAM_ID_BASE = 2_000_000
+
+# Programs for the run scenarios; the error ones exercise error logging
+SUCCESS_PROGRAMS = [
+    ("print('Hello from benchmark')", ""),
+    ("import sys\na, b = map(int, sys.stdin.readline().split())\nprint(a + b)", "5 10"),
+]
+ERROR_PROGRAMS = [
+    ("print(hello)", ""),  # NameError
+    ("print('hello'", ""),  # SyntaxError
+    ("x = 10 / 0", ""),  # ZeroDivisionError
+]
+
+class ScenarioContext:
+    """Data shared by the scenarios, loaded once before the run"""
+
+    def __init__(self, base_url, team_name, password, timeout, users=1):
+        self.base_url = base_url
+        self.team_name = team_name
+        self.password = password
+        self.timeout = timeout
+        self.users = max(users, 1)
+        self.team_id = None
+        self.problems = []
+        self.visible_test_cases = {}  # problem_id -> list of test cases
+        self._local = threading.local()
+        # Unique per benchmark and per request, so no two executions are identical
+        self._run_token = secrets.token_hex(4)
+        self._counter = itertools.count()
+
+    def unique_code(self, code: str) -> str:
+        """Python code with a trailing nonce comment, so caches cannot answer it"""
+        return f"{code or ''}\n# benchmark {self._run_token}-{next(self._counter)}\n"
+
+    def user_team_id(self, rng) -> int:
+        """Team id of a random simulated user"""
+        return BENCHMARK_TEAM_ID_BASE + rng.randrange(self.users)
+
+    @property
+    def session(self):
+        """One HTTP session (connection pool) per worker thread"""
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            self._local.session = session
+        return session
+
+    def setup(self):
+        """Log in and load problems and visible test cases for the payloads"""
+        response = requests.post(
+            f"{self.base_url}/login",
+            json={"team_name": self.team_name, "password": self.password},
+            timeout=self.timeout
+        )
+        response.raise_for_status()
+        self.team_id = response.json()["team_id"]
+
+        response = requests.get(f"{self.base_url}/problems", timeout=self.timeout)
+        response.raise_for_status()
+        self.problems = response.json()
+        if not self.problems:
+            raise RuntimeError("No problems found; seed the database first")
+
+        for problem in self.problems:
+            response = requests.get(
+                f"{self.base_url}/testcases",
+                params={"problem_id": problem["id"]},
+                timeout=self.timeout
+            )
+            response.raise_for_status()
+            self.visible_test_cases[problem["id"]] = response.json()
+
+def _login(ctx, rng):
+    return ctx.session.post(
+        f"{ctx.base_url}/login",
+        json={"team_name": ctx.team_name, "password": ctx.password},
+        timeout=ctx.timeout
+    )
+
+def _problems(ctx, rng):
+    return ctx.session.get(f"{ctx.base_url}/problems", timeout=ctx.timeout)
+
+def _testcases(ctx, rng):
+    problem = rng.choice(ctx.problems)
+    return ctx.session.get(
+        f"{ctx.base_url}/testcases", params={"problem_id": problem["id"]}, timeout=ctx.timeout
+    )
+
+def _run(ctx, rng):
+    code, stdin = rng.choice(SUCCESS_PROGRAMS)
+    return ctx.session.post(
+        f"{ctx.base_url}/run",
+        json={"language": "python", "code": ctx.unique_code(code), "stdin": stdin, "team_id": ctx.user_team_id(rng)},
+        timeout=ctx.timeout
+    )
+
+def _run_errors(ctx, rng):
+    code, stdin = rng.choice(ERROR_PROGRAMS)
+    return ctx.session.post(
+        f"{ctx.base_url}/run",
+        json={"language": "python", "code": ctx.unique_code(code), "stdin": stdin, "team_id": ctx.user_team_id(rng)},
+        timeout=ctx.timeout
+    )
+
+def _run_batch(ctx, rng):
+    problem = rng.choice(ctx.problems)
+    test_cases = [
+        {"input": tc["input_data"], "expected_output": tc["expected_output"]}
+        for tc in ctx.visible_test_cases.get(problem["id"], [])
+    ]
+    return ctx.session.post(
+        f"{ctx.base_url}/run-batch",
+        json={"language": "python", "code": ctx.unique_code(problem["buggy_file_blob"]), "test_cases": test_cases,
+              "team_id": ctx.user_team_id(rng)},
+        timeout=ctx.timeout
+    )
+
+def _submit(ctx, rng):
+    problem = rng.choice(ctx.problems)
+    return ctx.session.post(
+        f"{ctx.base_url}/submit",
+        json={
+            "problem_id": problem["id"],
+            "team_id": ctx.team_id,
+            "code": ctx.unique_code(problem["buggy_file_blob"]),
+            "language": "python"
+        },
+        timeout=ctx.timeout
+    )
+
+SCENARIOS = {
+    "login": _login,
+    "problems": _problems,
+    "testcases": _testcases,
+    "run": _run,
+    "run_errors": _run_errors,
+    "run_batch": _run_batch,
+    "submit": _submit,
+}
+
+def parse_mix(mix: str) -> dict:
+    """Parse "name=weight,name=weight" into a dict of scenario weights"""
+    weights = {}
+    for part in mix.split(","):
+        if not part.strip():
+            continue
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise ValueError(f"Unknown scenario '{name}' (choose from {', '.join(SCENARIOS)})")
+        weights[name] = float(weight or 1)
+    if not weights or sum(weights.values()) <= 0:
+        raise ValueError("The mix needs at least one scenario with a positive weight")
+    return weights
+
+def percentile(sorted_values: list, pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(pct / 100 * len(sorted_values)), 1)
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+def summarize(samples: list, elapsed: float) -> dict:
+    """
+    Latency/throughput statistics for a list of samples
+
+    Args:
+        samples: Dicts with "latency" (seconds) and "ok" (bool)
+        elapsed: Wall time of the run in seconds
+
+    Returns:
+        Dict with count, errors, error_rate, throughput_rps and
+        mean/p50/p95/p99/max latency in milliseconds (successful requests)
+    """
+    latencies = sorted(s["latency"] * 1000 for s in samples if s["ok"])
+    errors = sum(1 for s in samples if not s["ok"])
+    return {
+        "count": len(samples),
+        "errors": errors,
+        "error_rate": round(errors / len(samples), 4) if samples else 0.0,
+        "throughput_rps": round(len(latencies) / elapsed, 3) if elapsed > 0 else 0.0,
+        "mean_ms": round(sum(latencies) / len(latencies), 2) if latencies else 0.0,
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "max_ms": round(latencies[-1], 2) if latencies else 0.0,
+    }
+
+def summarize_by_route(samples: list, elapsed: float) -> dict:
+    by_route = {}
+    for sample in samples:
+        by_route.setdefault(sample["route"], []).append(sample)
+    return {route: summarize(route_samples, elapsed) for route, route_samples in sorted(by_route.items())}
+
+def print_report(routes: dict, overall: dict):
+    print(f"{'route':<14}{'count':>7}{'err':>6}{'rps':>9}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}")
+    print("-" * 76)
+    for route, stats in list(routes.items()) + [("ALL", overall)]:
+        print(f"{route:<14}{stats['count']:>7}{stats['errors']:>6}{stats['throughput_rps']:>9.2f}"
+              f"{stats['p50_ms']:>9.1f}ms{stats['p95_ms']:>8.1f}ms{stats['p99_ms']:>8.1f}ms{stats['max_ms']:>8.1f}ms")
+
+def run_benchmark(ctx, weights: dict, rate: float, duration: float, max_concurrency: int, seed: int):
+    """
+    Send requests at a constant arrival rate for the given duration
+
+    Latency is measured from each request's scheduled send time, so time
+    spent waiting for a free client thread counts against the server
+    instead of being hidden (no coordinated omission).
+    """
+    rng = random.Random(seed)
+    names = list(weights)
+    scenario_weights = list(weights.values())
+    total_requests = int(rate * duration)
+    samples = []
+    samples_lock = threading.Lock()
+
+    def execute(name, scheduled_at, request_rng):
+        try:
+            response = SCENARIOS[name](ctx, request_rng)
+            ok = response.status_code < 400
+            status_code = response.status_code
+            error = None if ok else f"HTTP {status_code}"
+        except requests.exceptions.Timeout:
+            ok, status_code, error = False, None, "Timeout"
+        except Exception as e:
+            ok, status_code, error = False, None, str(e)
+        sample = {
+            "route": name,
+            "latency": time.perf_counter() - scheduled_at,
+            "ok": ok,
+            "status_code": status_code,
+            "error": error,
+        }
+        with samples_lock:
+            samples.append(sample)
+
+    print(f"📦 Sending {total_requests} requests at {rate} req/s for {duration}s...")
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        for i in range(total_requests):
+            scheduled_at = start + i / rate
+            delay = scheduled_at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            name = rng.choices(names, weights=scenario_weights)[0]
+            executor.submit(execute, name, scheduled_at, random.Random(rng.random()))
+    elapsed = time.perf_counter() - start
+    return samples, elapsed
+
+def compare_results(baseline: dict, candidate: dict, threshold_pct: float) -> list:
+    """
+    Compare two result files route by route
+
+    Returns:
+        List of regression descriptions (empty if none)
+    """
+    regressions = []
+    factor = 1 + threshold_pct / 100
+    print(f"{'route':<14}{'metric':<16}{'baseline':>12}{'candidate':>12}{'change':>10}")
+    print("-" * 64)
+    routes = sorted(set(baseline["routes"]) & set(candidate["routes"]))
+    for route in routes + ["ALL"]:
+        base = baseline["overall"] if route == "ALL" else baseline["routes"][route]
+        cand = candidate["overall"] if route == "ALL" else candidate["routes"][route]
+        for metric in ("p50_ms", "p95_ms", "p99_ms", "throughput_rps", "error_rate"):
+            old, new = base[metric], cand[metric]
+            change = ((new - old) / old * 100) if old else 0.0
+            if metric == "throughput_rps":
+                regressed = old > 0 and new * factor < old
+            elif metric == "error_rate":
+                regressed = new > old + threshold_pct / 100
+            else:
+                regressed = old > 0 and new > old * factor
+            marker = "  ⚠️" if regressed else ""
+            print(f"{route:<14}{metric:<16}{old:>12.2f}{new:>12.2f}{change:>9.1f}%{marker}")
+            if regressed:
+                regressions.append(f"{route} {metric}: {old} -> {new}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the backend API")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Run a benchmark")
+    run_parser.add_argument("--base-url", default=BASE_URL)
+    run_parser.add_argument("--rate", type=float, default=5.0, help="Requests per second (arrival rate)")
+    run_parser.add_argument("--duration", type=float, default=30.0, help="Seconds to send requests for")
+    run_parser.add_argument("--mix", default=DEFAULT_MIX, help="Scenario weights, e.g. problems=2,submit=1")
+    run_parser.add_argument("--max-concurrency", type=int, default=256, help="Maximum requests in flight")
+    run_parser.add_argument("--timeout", type=float, default=30.0, help="Per-request timeout in seconds")
+    run_parser.add_argument("--users", type=int, default=50,
+                            help="Simulated teams for run/run-batch rate limits")
+    run_parser.add_argument("--team-name", default="Default Team")
+    run_parser.add_argument("--password", default="password")
+    run_parser.add_argument("--seed", type=int, default=1, help="Random seed for the request mix")
+    run_parser.add_argument("--output", help="Write results as JSON to this file")
+
+    compare_parser = subparsers.add_parser("compare", help="Compare two result files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("candidate")
+    compare_parser.add_argument("--threshold", type=float, default=10.0,
+                                help="Percent change counted as a regression")
+
+    args = parser.parse_args()
+
+    if args.command == "compare":
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        with open(args.candidate, "r", encoding="utf-8") as f:
+            candidate = json.load(f)
+        regressions = compare_results(baseline, candidate, args.threshold)
+        print()
+        if regressions:
+            print(f"❌ {len(regressions)} regression(s) beyond {args.threshold}%:")
+            for regression in regressions:
+                print(f"   {regression}")
+            sys.exit(1)
+        print(f"✅ No regressions beyond {args.threshold}%")
+        return
+
+    weights = parse_mix(args.mix)
+    print("="*80)
+    print("🚀 BENCHMARK")
+    print("="*80)
+    print(f"Target: {args.base_url}")
+    print(f"Mix: {', '.join(f'{name}={weight:g}' for name, weight in weights.items())}")
+    print(f"Simulated users: {args.users}")
+    print(f"Started at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print("="*80)
+
+    ctx = ScenarioContext(args.base_url, args.team_name, args.password, args.timeout, users=args.users)
+    ctx.setup()
+    started_at = datetime.now().isoformat()
+    samples, elapsed = run_benchmark(ctx, weights, args.rate, args.duration, args.max_concurrency, args.seed)
+
+    routes = summarize_by_route(samples, elapsed)
+    overall = summarize(samples, elapsed)
+    print()
+    print_report(routes, overall)
+
+    failures = {}
+    for sample in samples:
+        if not sample["ok"]:
+            failures[sample["error"]] = failures.get(sample["error"], 0) + 1
+    if failures:
+        print("\n❌ Failure Analysis:")
+        for error, count in sorted(failures.items(), key=lambda item: -item[1]):
+            print(f"   {error}: {count}")
+
+    if args.output:
+        results = {
+            "meta": {
+                "started_at": started_at,
+                "base_url": args.base_url,
+                "rate": args.rate,
+                "duration": args.duration,
+                "elapsed": round(elapsed, 3),
+                "mix": weights,
+                "seed": args.seed,
+                "users": args.users,
+            },
+            "routes": routes,
+            "overall": overall,
+        }
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""
+Opt-in capture of production traffic for replay.py
+Set TRAFFIC_CAPTURE_PATH to record one JSON line per contestant request:
+arrival time, method, path, status and server-side duration, plus the shape
+of execution requests (language, code and stdin sizes, test case sizes).
+Code, inputs, outputs, team names and passwords are never written; team ids
+are replaced by salted hashes, so a trace still shows which requests came
+from the same team without saying which team it was.
+
+Each worker process appends to its own file (<path>.<pid>.jsonl) from a
+background thread, so capturing adds no file I/O to the request path.
+replay.py merges the files by arrival time.
+"""
+
+import os
+import json
+import time
+import queue
+import atexit
+import hashlib
+import secrets
+import threading
+from pathlib import Path
+from urllib.parse import parse_qsl
+
+import orjson
+
+from shared_state import store
+
+# Where to write the trace; capture is off when unset
+TRAFFIC_CAPTURE_PATH = os.getenv("TRAFFIC_CAPTURE_PATH", "")
+# Request bodies larger than this are recorded without their shape
+MAX_CAPTURED_BODY = 16 * 1024 * 1024
+
+# Contestant-facing endpoints; admin, metrics and health checks are not captured
+CAPTURED_PATHS = ("/login", "/problems", "/testcases", "/submissions", "/bootstrap", "/submit", "/run", "/run-batch")
+_BODY_PATHS = ("/submit", "/run", "/run-batch")
+
+_SALT_KEY = "capture:salt"
+
+def _salt() -> str:
+    """Salt shared by all workers, so one team hashes the same in every file"""
+    salt = store.get(_SALT_KEY)
+    if salt is None:
+        # Workers starting together keep whichever salt was stored first
+        salt = store.setdefault(_SALT_KEY, secrets.token_hex(16))
+    return salt
+
+def request_shape(path: str, body: dict) -> dict:
+    """Sizes and settings of an execution request, without its content"""
+    if path == "/login":
+        return {}
+    shape = {
+        "language": body.get("language"),
+        "code_len": len(body.get("code") or ""),
+    }
+    if path == "/run":
+        shape["stdin_len"] = len(body.get("stdin") or "")
+    elif path == "/run-batch":
+        shape["cases"] = [
+            [len(case.get("input") or ""), len(case.get("expected_output") or "")]
+            for case in body.get("test_cases") or []
+        ]
+        shape["compact"] = bool(body.get("compact"))
+    if body.get("problem_id") is not None:
+        shape["problem_id"] = body["problem_id"]
+    return shape
+
+class TraceWriter:
+    """Appends records to a JSON lines file from a daemon thread"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="traffic-capture", daemon=True)
+        self._thread.start()
+
+    def write(self, record: dict):
+        self._queue.put(record)
+
+    def _run(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "ab") as f:
+            while True:
+                record = self._queue.get()
+                if record is None:
+                    break
+                f.write(orjson.dumps(record) + b"\n")
+                # Write out everything queued meanwhile before flushing once
+                while not self._queue.empty():
+                    record = self._queue.get()
+                    if record is None:
+                        f.flush()
+                        return
+                    f.write(orjson.dumps(record) + b"\n")
+                f.flush()
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+
+class CaptureMiddleware:
+    """ASGI middleware writing one anonymized trace record per contestant request"""
+
+    def __init__(self, app, path: str = TRAFFIC_CAPTURE_PATH):
+        self.app = app
+        base = Path(path)
+        self.writer = TraceWriter(base.with_name(f"{base.stem}.{os.getpid()}.jsonl"))
+        self.salt = _salt()
+        atexit.register(self.writer.close)
+
+    def _anonymize(self, team_id) -> str:
+        return hashlib.sha256(f"{self.salt}:{team_id}".encode("utf-8")).hexdigest()[:12]
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope.get("path") not in CAPTURED_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        arrived_at = time.time()
+        start = time.perf_counter()
+        path = scope["path"]
+        status_code = 500
+        chunks = []
+        body_size = 0
+
+        async def receive_wrapper():
+            nonlocal body_size
+            message = await receive()
+            if message["type"] == "http.request" and path in _BODY_PATHS:
+                body_size += len(message.get("body", b""))
+                if body_size <= MAX_CAPTURED_BODY:
+                    chunks.append(message.get("body", b""))
+            return message
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+        finally:
+            record = {
+                "ts": round(arrived_at, 4),
+                "method": scope.get("method", ""),
+                "path": path,
+                "status": status_code,
+                "ms": round((time.perf_counter() - start) * 1000, 2),
+            }
+            query = dict(parse_qsl(scope.get("query_string", b"").decode("latin-1")))
+            team_id = query.pop("team_id", None)
+            if query:
+                record["query"] = query
+            if path in _BODY_PATHS:
+                record["body_bytes"] = body_size
+                try:
+                    body = orjson.loads(b"".join(chunks)) if body_size <= MAX_CAPTURED_BODY else {}
+                    team_id = body.get("team_id", team_id)
+                    record["shape"] = request_shape(path, body)
+                except (orjson.JSONDecodeError, AttributeError, TypeError):
+                    pass
+            if team_id is not None:
+                record["team"] = self._anonymize(team_id)
+            self.writer.write(record)
+
+def read_trace(paths) -> list:
+    """Records from one or more trace files, ordered by arrival time"""
+    records = []
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    records.append(json.loads(line))
+    records.sort(key=lambda record: record["ts"])
+    return records
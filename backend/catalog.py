@@ -0,0 +1,112 @@
+"""
+Cached problem catalog for /bootstrap
+The catalog (problems plus their visible test cases) changes only when
+problems are edited, so each worker keeps it in memory. A generation counter
+in the shared state store tells every worker when to reload; call
+invalidate() after changing problems or test cases. The cached copy also
+expires after CATALOG_CACHE_TTL seconds, so edits made straight in the
+database are picked up without a restart.
+
+The catalog's version tag is a hash of its content, so all workers agree on
+it without coordinating. Starter code in every language (templates.py) and
+the normalized expected output of every test case, hidden ones included
+(checkers.py), are prepared along with it, so they are rebuilt exactly
+when problems change.
+"""
+
+import os
+import json
+import time
+import hashlib
+import threading
+
+import models
+import checkers
+import templates
+from shared_state import store
+
+# Seconds a worker reuses its catalog before reloading it anyway
+CATALOG_CACHE_TTL = float(os.getenv("CATALOG_CACHE_TTL", "300"))
+
+_GENERATION_KEY = "catalog:generation"
+
+_cached = None  # (generation, loaded_at, catalog)
+_lock = threading.Lock()
+
+def _generation() -> int:
+    try:
+        return store.get(_GENERATION_KEY, 0)
+    except Exception as e:
+        print(f"Catalog generation lookup failed: {e}")
+        return -1
+
+def invalidate():
+    """Make every worker reload the catalog on its next request"""
+    global _cached
+    with _lock:
+        _cached = None
+    try:
+        store.incr(_GENERATION_KEY)
+    except Exception as e:
+        print(f"Catalog invalidation failed: {e}")
+
+def _load(db) -> dict:
+    problems = db.query(models.Problem).order_by(models.Problem.id).all()
+    rows = db.query(models.TestCase).order_by(models.TestCase.test_case_id).all()
+
+    test_cases = {p.id: [] for p in problems}
+    expected = {}
+    for tc in rows:
+        expected[tc.test_case_id] = (
+            tc.expected_output, checkers.for_problem(tc.problem_id).prepare(tc.expected_output or "")
+        )
+        if tc.is_hidden:
+            continue
+        test_cases.setdefault(tc.problem_id, []).append({
+            "test_case_id": tc.test_case_id,
+            "input_data": tc.input_data,
+            "expected_output": tc.expected_output,
+            "is_hidden": False
+        })
+    catalog = {
+        "problems": [{"id": p.id, "title": p.title, "buggy_file_blob": p.buggy_file_blob} for p in problems],
+        # JSON object keys are strings; keep them so in the hash and the response alike
+        "test_cases": {str(problem_id): cases for problem_id, cases in test_cases.items()}
+    }
+    content = json.dumps(catalog, sort_keys=True).encode("utf-8")
+    catalog["version"] = hashlib.sha256(content).hexdigest()[:16]
+    # Not part of the version: hidden outputs are never sent, and the templates
+    # derive from the problems, which it already covers
+    catalog["expected"] = expected
+    catalog["templates"] = {}
+    for p in problems:
+        catalog["templates"][str(p.id)] = {
+            language: (code, templates.etag(code))
+            for language, code in templates.generate(p.buggy_file_blob).items()
+        }
+    return catalog
+
+def get_catalog(db) -> dict:
+    """
+    Problems and visible test cases, from this worker's cache when current
+
+    Returns:
+        Dict with "version", "problems" (as in /problems), "test_cases"
+        (problem id as a string -> list of visible test cases as in /testcases)
+        "templates" (problem id as a string -> language -> (code, ETag)) and
+        "expected" (test_case_id -> (expected output, prepared form) for
+        every test case, for judge.judge_submission)
+    """
+    global _cached
+    generation = _generation()
+    with _lock:
+        cached = _cached
+    if cached is not None:
+        cached_generation, loaded_at, catalog = cached
+        if cached_generation == generation and time.monotonic() - loaded_at < CATALOG_CACHE_TTL:
+            return catalog
+
+    catalog = _load(db)
+    with _lock:
+        _cached = (generation, time.monotonic(), catalog)
+    return catalog
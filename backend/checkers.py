@@ -0,0 +1,244 @@
+"""
+Output checkers
+Decide whether a program's stdout matches a test case's expected output.
+Each problem uses one mode:
+
+- exact: equal after trimming leading/trailing whitespace (the default, and
+  how answers have always been compared)
+- tokens: the same whitespace-separated tokens, however they are spaced
+- float: like tokens, but numbers may differ by `epsilon` (absolute, or
+  relative for values above 1)
+- custom: a function "module:function" called as fn(input, expected, actual)
+  that returns True for an accepted answer
+
+Modes are set per problem in the JSON file named by CHECKERS_CONFIG
+(default backend/checkers.json, optional):
+
+    {"4": {"mode": "float", "epsilon": 1e-6}, "6": {"mode": "tokens"}}
+
+Expected outputs of stored test cases are normalized (stripped, or split
+into tokens) once when the catalog loads (see catalog.py) and compared with
+check(). matches() normalizes the expected output on every call, for
+outputs sent by clients, which are never cached. Exact comparison works on
+the actual output in place without copying it; token comparison splits it
+in blocks of CHUNK_SIZE characters. Both stop at the first mismatch. Only stdout is compared;
+stderr never counts as an answer.
+"""
+
+import os
+import re
+import json
+import importlib
+from pathlib import Path
+
+CHECKERS_CONFIG = Path(os.getenv("CHECKERS_CONFIG", str(Path(__file__).parent / "checkers.json")))
+# Characters of actual output tokenized at a time
+CHUNK_SIZE = 64 * 1024
+# Outputs up to this size are simply stripped (copying them costs less than scanning)
+SMALL_OUTPUT = 4096
+
+_WHITESPACE = re.compile(r"\s")
+
+def strip_bounds(text: str):
+    """(start, end) of text without surrounding whitespace, found without copying it"""
+    start, end = 0, len(text)
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return start, end
+
+def _lines(text: str, start: int, end: int):
+    """Lines of text[start:end] (without their line breaks), sliced one at a time"""
+    while start <= end:
+        newline = text.find("\n", start, end)
+        if newline == -1:
+            yield text[start:end]
+            return
+        yield text[start:newline]
+        start = newline + 1
+
+def first_difference(expected: str, actual: str, max_chars: int = 200):
+    """
+    First line where two outputs differ, ignoring surrounding whitespace
+    and trailing spaces on each line
+
+    Returns:
+        None if no line differs, else {"line": 1-based line number,
+        "expected": line or None past the end, "actual": line or None},
+        with lines cut to max_chars
+    """
+    expected_lines = _lines(expected, *strip_bounds(expected))
+    actual_lines = _lines(actual, *strip_bounds(actual))
+    line = 0
+    while True:
+        line += 1
+        expected_line = next(expected_lines, None)
+        actual_line = next(actual_lines, None)
+        if expected_line is None and actual_line is None:
+            return None
+        if expected_line is not None:
+            expected_line = expected_line.rstrip()
+        if actual_line is not None:
+            actual_line = actual_line.rstrip()
+        if expected_line != actual_line:
+            return {
+                "line": line,
+                "expected": expected_line[:max_chars] if expected_line is not None else None,
+                "actual": actual_line[:max_chars] if actual_line is not None else None
+            }
+
+def _token_chunks(text: str):
+    """Token lists of successive blocks of text, cut at whitespace so no token is split"""
+    start, length = 0, len(text)
+    while start < length:
+        end = start + CHUNK_SIZE
+        if end < length:
+            boundary = _WHITESPACE.search(text, end)
+            end = boundary.start() if boundary else length
+        tokens = text[start:end].split()
+        if tokens:
+            yield tokens
+        start = end
+
+class Checker:
+    """Compares actual output with a prepared (normalized) expected output"""
+    mode = None
+
+    def prepare(self, expected: str):
+        """Normalize an expected output; done once per distinct output"""
+        raise NotImplementedError
+
+    def check(self, prepared, actual: str, input_data: str) -> bool:
+        raise NotImplementedError
+
+    def matches(self, expected: str, actual: str, input_data: str = "") -> bool:
+        """Whether actual is an accepted answer for this expected output (prepared on every call)"""
+        return self.check(self.prepare(expected or ""), actual or "", input_data or "")
+
+class ExactChecker(Checker):
+    mode = "exact"
+
+    def prepare(self, expected: str):
+        return expected.strip()
+
+    def check(self, prepared, actual: str, input_data: str) -> bool:
+        if len(actual) <= SMALL_OUTPUT:
+            return actual.strip() == prepared
+        start, end = strip_bounds(actual)
+        return end - start == len(prepared) and actual.startswith(prepared, start)
+
+class TokenChecker(Checker):
+    mode = "tokens"
+
+    def prepare(self, expected: str):
+        return expected.split()
+
+    def _expected_tokens(self, prepared) -> list:
+        return prepared
+
+    def _close_enough(self, prepared, start: int, tokens: list) -> bool:
+        """Whether tokens differing from the expected ones at start still match"""
+        return False
+
+    def check(self, prepared, actual: str, input_data: str) -> bool:
+        expected = self._expected_tokens(prepared)
+        position = 0
+        for tokens in _token_chunks(actual):
+            end = position + len(tokens)
+            if end > len(expected):
+                return False
+            if expected[position:end] != tokens and not self._close_enough(prepared, position, tokens):
+                return False
+            position = end
+        return position == len(expected)
+
+class FloatChecker(TokenChecker):
+    mode = "float"
+
+    def __init__(self, epsilon: float = 1e-6):
+        self.epsilon = epsilon
+
+    def prepare(self, expected: str):
+        tokens = expected.split()
+        values = []
+        for token in tokens:
+            try:
+                values.append(float(token))
+            except ValueError:
+                values.append(None)
+        return tokens, values
+
+    def _expected_tokens(self, prepared) -> list:
+        return prepared[0]
+
+    def _close_enough(self, prepared, start: int, tokens: list) -> bool:
+        expected, values = prepared
+        for offset, token in enumerate(tokens):
+            index = start + offset
+            if token == expected[index]:
+                continue
+            value = values[index]
+            if value is None:
+                return False
+            try:
+                actual = float(token)
+            except ValueError:
+                return False
+            if not abs(actual - value) <= self.epsilon * max(1.0, abs(value)):
+                return False
+        return True
+
+class CustomChecker(Checker):
+    mode = "custom"
+
+    def __init__(self, function):
+        self.function = function
+
+    def prepare(self, expected: str):
+        return expected
+
+    def check(self, prepared, actual: str, input_data: str) -> bool:
+        return bool(self.function(input_data, prepared, actual))
+
+def _load_function(path: str):
+    module_name, _, function_name = path.partition(":")
+    return getattr(importlib.import_module(module_name), function_name)
+
+def build(config: dict) -> Checker:
+    """Checker from one problem's config, e.g. {"mode": "float", "epsilon": 1e-4}"""
+    mode = config.get("mode", "exact")
+    if mode == "exact":
+        return ExactChecker()
+    if mode == "tokens":
+        return TokenChecker()
+    if mode == "float":
+        return FloatChecker(float(config.get("epsilon", 1e-6)))
+    if mode == "custom":
+        return CustomChecker(_load_function(config["checker"]))
+    raise ValueError(f"Unknown checker mode '{mode}'")
+
+def load(path: Path = CHECKERS_CONFIG) -> dict:
+    """problem_id -> Checker from a config file; problems that are not listed use the default"""
+    if not path.exists():
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            config = json.load(f)
+    except Exception as e:
+        print(f"Failed to read checker config {path}: {e}")
+        return {}
+    checkers = {}
+    for problem_id, problem_config in config.items():
+        try:
+            checkers[int(problem_id)] = build(problem_config)
+        except Exception as e:
+            print(f"Invalid checker for problem {problem_id}, using exact comparison: {e}")
+    return checkers
+
+DEFAULT = ExactChecker()
+_problem_checkers = load()
+
+def for_problem(problem_id) -> Checker:
+    """The checker configured for a problem (exact comparison if none)"""
+    return _problem_checkers.get(problem_id, DEFAULT)
@@ -1,8 +1,12 @@
 import os
-from sqlalchemy import create_engine
+import time
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.pool import QueuePool
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
+import metrics
+import tracing
 
 # We must specify the path to the .env file
 load_dotenv()
@@ -12,6 +16,16 @@ SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 
 DATABASE_URL = f"postgresql://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}@{os.getenv('DB_HOST')}:{os.getenv('DB_PORT')}/{os.getenv('DB_NAME')}"
 
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a free connection"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            metrics.DB_POOL_CHECKOUT_WAIT.observe(time.perf_counter() - start)
+
 # Configure engine with proper pool settings to avoid connection limit issues
 # pool_size: number of connections to maintain
 # max_overflow: additional connections that can be created beyond pool_size
@@ -19,6 +33,7 @@ DATABASE_URL = f"postgresql://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}@
 # pool_recycle: recycle connections after this many seconds (3600 = 1 hour)
 engine = create_engine(
     DATABASE_URL,
+    poolclass=TimedQueuePool,
     pool_size=5,  # Reduced from default to avoid hitting Supabase limits
     max_overflow=0,  # Don't allow overflow connections
     pool_pre_ping=True,  # Verify connections before using
@@ -26,9 +41,37 @@ engine = create_engine(
     echo=False  # Set to True for SQL query logging
 )
 
+metrics.Gauge(
+    "db_pool_checked_out_connections", "Database connections currently checked out of the pool",
+    callback=lambda: engine.pool.checkedout()
+)
+
+# Record query time as "db" spans in the current request's trace
+@event.listens_for(engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+@event.listens_for(engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    tracing.record("db", time.perf_counter() - conn.info["query_start"].pop())
+
+# A failed query never reaches after_cursor_execute; drop its start time so
+# later queries are not paired with it
+@event.listens_for(engine, "handle_error")
+def _handle_error(exception_context):
+    # Errors before the statement was executed come without an execution context
+    conn = exception_context.connection
+    if conn is not None and exception_context.execution_context is not None and conn.info.get("query_start"):
+        conn.info["query_start"].pop()
+
 # Don't test connection at startup - it will be tested when first used
 # This prevents holding connections unnecessarily
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-Base = declarative_base()
\ No newline at end of file
+Base = declarative_base()
+
+def upgrade_schema():
+    """Add columns introduced after a deployment's tables were created (create_all only creates missing tables)"""
+    with engine.begin() as conn:
+        conn.execute(text("ALTER TABLE submissions ADD COLUMN IF NOT EXISTS language VARCHAR"))
@@ -0,0 +1,60 @@
+"""
+Deadlines for code execution requests
+Every /run, /run-batch and /submit request gets an overall deadline. The
+deadline is split into per-test budgets according to how many waves of
+tests the thread pool has to run. Each budget is enforced at four layers:
+as Piston's run_timeout, as the HTTP client timeout, by not starting a test
+that has too little time left (MIN_TEST_BUDGET), and when waiting for the
+futures. A test that runs out of time gets a "Time Limit Exceeded" verdict
+instead of holding the request open.
+"""
+
+import os
+import math
+import time
+
+# Overall wall-clock limits per request, in seconds
+SUBMIT_DEADLINE = float(os.getenv("SUBMIT_DEADLINE_SECONDS", "60"))
+RUN_DEADLINE = float(os.getenv("RUN_DEADLINE_SECONDS", "30"))
+# Upper bound for a single test, however much of the request deadline is left
+TEST_TIME_LIMIT = float(os.getenv("TEST_TIME_LIMIT_SECONDS", "10"))
+# Tests left with less than this are not started at all
+MIN_TEST_BUDGET = 0.05
+# How long past the deadline a request waits for tests already running
+WAIT_GRACE = 1.0
+
+TIME_LIMIT_EXCEEDED = "Time Limit Exceeded"
+
+class Deadline:
+    """Point in time by which a request must have finished"""
+
+    def __init__(self, seconds: float):
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def test_budget(self, num_tests: int, workers: int) -> float:
+        """
+        Time each test may use so that all of them fit in the deadline
+
+        Args:
+            num_tests: Tests the request will run
+            workers: Tests run at the same time
+
+        Returns:
+            Seconds per test, at most TEST_TIME_LIMIT
+        """
+        waves = max(math.ceil(num_tests / max(workers, 1)), 1)
+        return min(TEST_TIME_LIMIT, self.remaining() / waves)
+
+    def budget(self, test_budget: float) -> float:
+        """Time a test starting now may use: its share, cut short by the deadline"""
+        return min(test_budget, self.remaining())
+
+    def wait_timeout(self) -> float:
+        """Timeout for waiting on the request's futures"""
+        return self.remaining() + WAIT_GRACE
@@ -0,0 +1,188 @@
+"""
+Columnar export of contest data for post-contest analysis
+Writes submissions, error log entries and the error log's code blobs as
+zstd-compressed Parquet files with a fixed schema, which pandas, polars and
+DuckDB load directly (e.g. pd.read_parquet("exports/error_logs.parquet")).
+
+Rows are streamed from the database EXPORT_BATCH_SIZE at a time (keyset
+pagination over the error log index, a streaming cursor for submissions)
+and written as one row group per batch, so memory use stays flat however
+many rows there are.
+
+Error log entries reference submitted code by SHA-256 (code_hash) as they do
+in the log itself; join them with code_blobs.parquet on hash to get the
+source. Entries written before blobs existed carry their code inline.
+
+pyarrow is needed only here and is imported when an export runs.
+
+Usage:
+    python export.py                          # all datasets into exports/
+    python export.py --output-dir /tmp/contest --dataset error_logs
+"""
+
+import argparse
+import sqlite3
+import time
+from pathlib import Path
+
+from dotenv import load_dotenv
+from sqlalchemy import select
+
+load_dotenv()
+
+import models
+import logger
+import database
+
+# Rows per streamed batch (and Parquet row group)
+EXPORT_BATCH_SIZE = 50_000
+PARQUET_COMPRESSION = "zstd"
+
+DATASETS = ("submissions", "error_logs", "code_blobs")
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ImportError("Exports need pyarrow (pip install pyarrow)") from e
+    return pyarrow
+
+def _schemas(pa) -> dict:
+    return {
+        "submissions": pa.schema([
+            ("team_id", pa.int32()),
+            ("problem_id", pa.int32()),
+            ("submitted_at", pa.timestamp("us")),
+            ("status", pa.string()),
+            ("language", pa.string()),  # null for submissions made before it was recorded
+            ("code", pa.large_string()),
+        ]),
+        "error_logs": pa.schema([
+            ("id", pa.int64()),
+            ("timestamp", pa.timestamp("us")),
+            ("error_type", pa.string()),
+            ("endpoint", pa.string()),
+            ("team_id", pa.int32()),
+            ("problem_id", pa.int32()),
+            ("language", pa.string()),
+            ("error_message", pa.large_string()),
+            ("code_hash", pa.string()),
+            ("code", pa.large_string()),
+            ("stdin_hash", pa.string()),
+            ("stdin", pa.large_string()),
+            ("additional_info", pa.string()),
+        ]),
+        "code_blobs": pa.schema([
+            ("hash", pa.string()),
+            ("content", pa.large_string()),
+        ]),
+    }
+
+def _submission_batches(db):
+    columns = (models.Submission.team_id, models.Submission.problem_id, models.Submission.submitted_at,
+               models.Submission.status, models.Submission.language, models.Submission.code_file_blob)
+    result = db.execute(select(*columns).execution_options(yield_per=EXPORT_BATCH_SIZE))
+    for rows in result.partitions():
+        yield list(zip(*rows))
+
+# Fields of the stored JSON entry are extracted by SQLite, not parsed row by row in Python
+_ERROR_LOG_SQL = (
+    "SELECT id, timestamp, error_type, endpoint, team_id, problem_id, language, "
+    "json_extract(entry, '$.error_message'), json_extract(entry, '$.code_ref'), json_extract(entry, '$.code'), "
+    "json_extract(entry, '$.stdin_ref'), json_extract(entry, '$.stdin'), "
+    "NULLIF(json_extract(entry, '$.additional_info'), '{}') "
+    "FROM error_logs WHERE id > ? ORDER BY id LIMIT ?"
+)
+
+def _error_log_batches(conn):
+    last_id = 0
+    while True:
+        rows = conn.execute(_ERROR_LOG_SQL, (last_id, EXPORT_BATCH_SIZE)).fetchall()
+        if not rows:
+            return
+        last_id = rows[-1][0]
+        yield list(zip(*rows))
+
+def _blob_batches(conn):
+    last_hash = ""
+    while True:
+        rows = conn.execute(
+            "SELECT hash, content FROM blobs WHERE hash > ? ORDER BY hash LIMIT ?",
+            (last_hash, EXPORT_BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            return
+        last_hash = rows[-1][0]
+        yield list(zip(*rows))
+
+def _column(pa, values, arrow_type):
+    if pa.types.is_timestamp(arrow_type) and any(isinstance(value, str) for value in values):
+        # ISO 8601 text from the log index, parsed by Arrow in one pass
+        return pa.array(values, type=pa.string()).cast(arrow_type)
+    return pa.array(values, type=arrow_type)
+
+def _log_connection():
+    """Read-only connection to the error log index, so exporting never blocks logging"""
+    return sqlite3.connect(f"file:{logger.ERROR_LOG_DB}?mode=ro", uri=True, check_same_thread=False)
+
+def export_dataset(dataset: str, path: Path, db=None) -> int:
+    """
+    Stream one dataset into a Parquet file
+
+    Args:
+        dataset: "submissions", "error_logs" or "code_blobs"
+        path: File to write
+        db: SQLAlchemy session (needed for submissions)
+
+    Returns:
+        Number of rows written
+    """
+    pa = _pyarrow()
+    schema = _schemas(pa)[dataset]
+    conn = None
+    if dataset == "submissions":
+        batches = _submission_batches(db)
+    elif not logger.ERROR_LOG_DB.exists():
+        batches = iter(())  # nothing logged yet
+    else:
+        conn = _log_connection()
+        batches = _error_log_batches(conn) if dataset == "error_logs" else _blob_batches(conn)
+
+    rows = 0
+    try:
+        with pa.parquet.ParquetWriter(path, schema, compression=PARQUET_COMPRESSION) as writer:
+            for columns in batches:
+                batch = pa.RecordBatch.from_arrays(
+                    [_column(pa, values, field.type) for values, field in zip(columns, schema)],
+                    schema=schema
+                )
+                writer.write_batch(batch)
+                rows += batch.num_rows
+    finally:
+        if conn is not None:
+            conn.close()
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Export contest data as Parquet for analysis")
+    parser.add_argument("--output-dir", default="exports", help="Directory for the .parquet files")
+    parser.add_argument("--dataset", choices=DATASETS, action="append",
+                        help="Dataset to export (repeatable; default: all)")
+    args = parser.parse_args()
+
+    output_dir = Path(args.output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    db = database.SessionLocal()
+    try:
+        for dataset in args.dataset or DATASETS:
+            path = output_dir / f"{dataset}.parquet"
+            start = time.perf_counter()
+            rows = export_dataset(dataset, path, db)
+            print(f"✅ {dataset}: {rows} rows -> {path} "
+                  f"({path.stat().st_size / 1024:.0f} KB, {time.perf_counter() - start:.1f}s)")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Failure statistics per test case
+With fail-fast judging the judge runs the tests most likely to catch a
+wrong answer first, so more of the tests after a failure can be skipped.
+Each test's failure rate is smoothed as (failures + 1) / (runs + 2), so
+tests without history sit in the middle. Ties go to the test with the
+smaller input, which is usually the cheapest to run.
+
+Outcomes are counted in memory and added to a table in the shared state
+database every FLUSH_INTERVAL seconds with one upsert per test, so recording
+costs nothing on the request path. Each worker re-reads a problem's counts at
+most every STATS_CACHE_TTL seconds.
+"""
+
+import os
+import time
+import atexit
+import sqlite3
+import threading
+
+from shared_state import SHARED_STATE_PATH
+
+# Seconds between writes of the accumulated counts
+FLUSH_INTERVAL = float(os.getenv("FAILURE_STATS_FLUSH_INTERVAL", "10"))
+# Seconds a worker reuses a problem's counts before reading them again
+STATS_CACHE_TTL = 60.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS test_case_stats (
+    test_case_id INTEGER PRIMARY KEY,
+    problem_id INTEGER NOT NULL,
+    runs INTEGER NOT NULL DEFAULT 0,
+    failures INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_test_case_stats_problem ON test_case_stats(problem_id);
+"""
+
+class FailureStats:
+    """Run and failure counts per test case, buffered in memory and flushed to SQLite"""
+
+    def __init__(self, path):
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+        self._pending = {}  # test_case_id -> [problem_id, runs, failures]
+        self._cache = {}  # problem_id -> (loaded_at, {test_case_id: [runs, failures]})
+        self._last_flush = time.monotonic()
+
+    def _connection(self):
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def record(self, problem_id: int, outcomes):
+        """
+        Count the outcome of each test that ran
+
+        Args:
+            problem_id: Problem the tests belong to
+            outcomes: Iterable of (test_case_id, failed) pairs
+        """
+        with self._lock:
+            cached = self._cache.get(problem_id)
+            for test_case_id, failed in outcomes:
+                pending = self._pending.setdefault(test_case_id, [problem_id, 0, 0])
+                pending[1] += 1
+                pending[2] += 1 if failed else 0
+                # This worker sees its own results right away
+                if cached is not None:
+                    counts = cached[1].setdefault(test_case_id, [0, 0])
+                    counts[0] += 1
+                    counts[1] += 1 if failed else 0
+            due = time.monotonic() - self._last_flush >= FLUSH_INTERVAL
+        if due:
+            self.flush()
+
+    def flush(self):
+        """Add the counts accumulated since the last flush to the database"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._last_flush = time.monotonic()
+            if not pending:
+                return
+            try:
+                conn = self._connection()
+                conn.execute("BEGIN IMMEDIATE")
+                conn.executemany(
+                    "INSERT INTO test_case_stats (test_case_id, problem_id, runs, failures) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT (test_case_id) DO UPDATE SET runs = runs + excluded.runs, "
+                    "failures = failures + excluded.failures",
+                    [(test_case_id, problem_id, runs, failures)
+                     for test_case_id, (problem_id, runs, failures) in pending.items()]
+                )
+                conn.execute("COMMIT")
+            except Exception as e:
+                print(f"Failed to save test case failure stats: {e}")
+                try:
+                    self._conn.execute("ROLLBACK")
+                except Exception:
+                    pass
+
+    def counts(self, problem_id: int) -> dict:
+        """test_case_id -> [runs, failures] for one problem"""
+        with self._lock:
+            cached = self._cache.get(problem_id)
+            if cached is not None and time.monotonic() - cached[0] < STATS_CACHE_TTL:
+                return cached[1]
+            try:
+                rows = self._connection().execute(
+                    "SELECT test_case_id, runs, failures FROM test_case_stats WHERE problem_id = ?", (problem_id,)
+                ).fetchall()
+            except Exception as e:
+                print(f"Failed to read test case failure stats: {e}")
+                rows = []
+            counts = {test_case_id: [runs, failures] for test_case_id, runs, failures in rows}
+            # Include what this worker has not flushed yet
+            for test_case_id, (pending_problem, runs, failures) in self._pending.items():
+                if pending_problem == problem_id:
+                    totals = counts.setdefault(test_case_id, [0, 0])
+                    totals[0] += runs
+                    totals[1] += failures
+            self._cache[problem_id] = (time.monotonic(), counts)
+            return counts
+
+    def order(self, problem_id: int, test_cases: list) -> list:
+        """Test cases sorted most likely to fail first, then smallest input first"""
+        counts = self.counts(problem_id)
+
+        def key(item):
+            idx, test_case = item
+            runs, failures = counts.get(test_case.test_case_id, (0, 0))
+            return (-(failures + 1) / (runs + 2), len(test_case.input_data or ""), idx)
+
+        return [test_case for _, test_case in sorted(enumerate(test_cases), key=key)]
+
+tracker = FailureStats(SHARED_STATE_PATH)
+atexit.register(tracker.flush)
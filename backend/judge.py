@@ -0,0 +1,232 @@
+"""
+Judging a submission against a problem's test cases
+Shared by /submit and rejudge.py: every test case runs through
+judge_test_case in a thread pool.
+
+The status is always the verdict of the failing test with the lowest index
+(test_case_id order), so the same code gets the same verdict however the
+tests are scheduled.
+
+By default every test runs and is logged. Fail-fast judging
+(JUDGE_FAIL_FAST=1) dispatches tests most likely to fail first (see
+failure_stats.py), runs at most FAIL_FAST_WORKERS at a time, and skips
+tests after the lowest failing index once they are no longer needed. It
+only saves executions when a submission has more tests than
+FAIL_FAST_WORKERS, and each test then gets a smaller share of the deadline
+because the tests run in more waves.
+"""
+
+import os
+import threading
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeoutError
+
+import piston
+import logger
+import metrics
+import tracing
+import admission
+import checkers
+import deadlines
+from failure_stats import tracker
+
+# Test cases of one submission run at the same time at most
+MAX_WORKERS = 20
+# Skip tests that can no longer change the verdict (off: every test runs and is logged)
+FAIL_FAST = os.getenv("JUDGE_FAIL_FAST", "0") == "1"
+# Test cases run at the same time with fail-fast judging, so later ones can still be skipped
+FAIL_FAST_WORKERS = int(os.getenv("JUDGE_FAIL_FAST_WORKERS", "4"))
+
+class _Cutoff:
+    """Lowest failing test index seen so far; tests after it need not run"""
+
+    def __init__(self):
+        self.index = None
+        self._lock = threading.Lock()
+
+    def lower(self, index: int):
+        with self._lock:
+            if self.index is None or index < self.index:
+                self.index = index
+
+    def skips(self, index: int) -> bool:
+        cutoff = self.index
+        return cutoff is not None and index > cutoff
+
+def _prepared_expected(checker, test_case, prepared):
+    """The test's expected output as prepared at catalog load, or prepared now if the row changed since"""
+    entry = prepared.get(test_case.test_case_id) if prepared else None
+    if entry is not None and entry[0] == test_case.expected_output:
+        return entry[1]
+    return checker.prepare(test_case.expected_output or "")
+
+def judge_test_case(test_case, language, code, team_id, problem_id, deadline=None, test_budget=None,
+                    endpoint="/submit", stop=None, prepared=None):
+    """Run one test case of a submission and return its verdict (used in parallel execution)
+
+    With a deadline, the test may use test_budget seconds (less if the
+    deadline is closer) and is not started once too little time is left.
+    When stop() returns True the test is skipped (verdict None). prepared
+    maps test_case_id to (expected output, prepared form), as in the catalog.
+    """
+    if stop is not None and stop():
+        return {"passed": False, "error": None, "verdict": None}
+    timeout = None
+    if deadline is not None:
+        timeout = deadline.budget(test_budget)
+        if timeout < deadlines.MIN_TEST_BUDGET:
+            return {"passed": False, "error": None, "verdict": deadlines.TIME_LIMIT_EXCEEDED}
+    try:
+        result = piston.execute_code(language=language, code=code, stdin=test_case.input_data, timeout=timeout)
+        
+        # Log errors if they exist
+        if result.get("compile") and result["compile"].get("stderr"):
+            logger.log_error(
+                error_type="CompilationError",
+                error_message=result["compile"]["stderr"],
+                code=code,
+                language=language,
+                stdin=test_case.input_data,
+                team_id=team_id,
+                problem_id=problem_id,
+                endpoint=endpoint
+            )
+        elif result.get("run") and result["run"].get("stderr"):
+            logger.log_error(
+                error_type="RuntimeError",
+                error_message=result["run"]["stderr"],
+                code=code,
+                language=language,
+                stdin=test_case.input_data,
+                team_id=team_id,
+                problem_id=problem_id,
+                endpoint=endpoint
+            )
+        
+        if piston.timed_out(result):
+            return {"passed": False, "error": None, "verdict": deadlines.TIME_LIMIT_EXCEEDED}
+
+        # Only stdout is an answer; see checkers.py for the comparison modes
+        actual_output = (result.get("run") or {}).get("stdout") or ""
+        checker = checkers.for_problem(problem_id)
+        expected = _prepared_expected(checker, test_case, prepared)
+        passed = checker.check(expected, actual_output, test_case.input_data or "")
+        
+        return {
+            "passed": passed,
+            "error": None,
+            "verdict": "Accepted" if passed else "Wrong Answer"
+        }
+    except piston.ExecutionTimeout as e:
+        logger.log_error(
+            error_type="TimeLimitExceeded",
+            error_message=str(e),
+            code=code,
+            language=language,
+            stdin=test_case.input_data,
+            team_id=team_id,
+            problem_id=problem_id,
+            endpoint=endpoint
+        )
+        return {"passed": False, "error": None, "verdict": deadlines.TIME_LIMIT_EXCEEDED}
+    except Exception as e:
+        # Log submission errors
+        logger.log_error(
+            error_type="SubmissionError",
+            error_message=str(e),
+            code=code,
+            language=language,
+            stdin=test_case.input_data,
+            team_id=team_id,
+            problem_id=problem_id,
+            endpoint=endpoint
+        )
+        return {
+            "passed": False,
+            "error": str(e),
+            "verdict": "Wrong Answer"
+        }
+
+def judge_submission(test_cases, language, code, team_id, problem_id, deadline,
+                     max_workers=MAX_WORKERS, pool="submit", endpoint="/submit", fail_fast=FAIL_FAST,
+                     prepared=None) -> str:
+    """
+    Run code against all test cases in parallel and return the submission status
+
+    Args:
+        test_cases: TestCase rows of the problem
+        deadline: deadlines.Deadline for the whole submission
+        max_workers: Test cases run at the same time
+        pool: Label for the thread pool metrics
+        endpoint: Endpoint recorded with logged errors
+        fail_fast: Dispatch likely failures first and skip tests after the
+            lowest failing index (the verdict is the same either way)
+        prepared: The catalog's prepared expected outputs (catalog "expected")
+
+    Returns:
+        "Accepted", "Wrong Answer" or "Time Limit Exceeded"
+    """
+    if fail_fast:
+        # With every test already running there would be nothing left to skip
+        max_workers = min(max_workers, FAIL_FAST_WORKERS)
+    # This helps handle concurrent requests from multiple teams during competition
+    max_workers = min(len(test_cases), max_workers)  # Limit concurrent threads to avoid overwhelming the API
+    test_budget = deadline.test_budget(len(test_cases), max_workers)
+    index_of = {test_case.test_case_id: idx for idx, test_case in enumerate(test_cases)}
+    dispatch = tracker.order(problem_id, test_cases) if fail_fast else test_cases
+    cutoff = _Cutoff() if fail_fast else None
+    
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        # Submit all test cases for parallel execution
+        future_to_index = {
+            executor.submit(
+                tracing.bind(admission.controller.track_task(
+                    metrics.track_pool_task(pool, judge_test_case)
+                )),
+                test_case,
+                language,
+                code,
+                team_id,
+                problem_id,
+                deadline,
+                test_budget,
+                endpoint,
+                partial(cutoff.skips, index_of[test_case.test_case_id]) if cutoff else None,
+                prepared
+            ): index_of[test_case.test_case_id]
+            for test_case in dispatch
+        }
+        
+        # Process results as they complete
+        verdicts = {}
+        outcomes = []
+        try:
+            for future in as_completed(future_to_index, timeout=deadline.wait_timeout()):
+                idx = future_to_index[future]
+                result = future.result()
+                verdicts[idx] = result["verdict"]
+                if result["verdict"] is not None and result["error"] is None:
+                    outcomes.append((test_cases[idx].test_case_id, not result["passed"]))
+                if cutoff is not None:
+                    if result["verdict"] not in (None, "Accepted"):
+                        cutoff.lower(idx)
+                    # Done once every test before the lowest failure has finished
+                    if cutoff.index is not None and all(i in verdicts for i in range(cutoff.index)):
+                        break
+        except FuturesTimeoutError:
+            pass  # tests still running past the deadline count as Time Limit Exceeded
+    finally:
+        # Don't wait for stragglers; their executor calls end at their own timeout.
+        # Queued tests are not cancelled: they return at once (stopped or out of
+        # time), which keeps the pool and admission accounting balanced.
+        executor.shutdown(wait=False)
+
+    tracker.record(problem_id, outcomes)
+
+    # The verdict of the failing test with the lowest index decides the status
+    for idx in range(len(test_cases)):
+        verdict = verdicts.get(idx, deadlines.TIME_LIMIT_EXCEEDED)
+        if verdict != "Accepted":
+            return verdict
+    return "Accepted"
@@ -1,11 +1,31 @@
 """
 Error logging system for event organizers
 Logs all errors to a file that participants cannot access
+
+Every entry is appended to a JSON Lines file (the raw, append-only record)
+and indexed in an embedded SQLite database so the admin endpoint and
+view_logs.py can filter and paginate without scanning the whole file.
+
+Submitted code (and large stdin) is stored once per distinct content in a
+blob table and referenced from entries by SHA-256, so a submission failing
+N test cases does not write N copies of its source.
+
+Per-minute error counters (error type x problem x language) and per-team
+totals are updated with every entry, so statistics never scan the log.
+
+follow_error_logs() tails the file for live views, reading only the bytes
+appended since the last read.
 """
 
 import os
 import json
-from datetime import datetime
+import hashlib
+import metrics
+import tracing
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
 from pathlib import Path
 
 # Create logs directory if it doesn't exist
@@ -15,6 +35,204 @@ LOG_DIR.mkdir(exist_ok=True)
 # Error log file path
 ERROR_LOG_FILE = LOG_DIR / "error_log.jsonl"  # JSON Lines format for easy parsing
 
+# Indexed store used for querying (rebuilt from ERROR_LOG_FILE if missing)
+ERROR_LOG_DB = LOG_DIR / "error_log.db"
+
+# stdin shorter than this is kept inline; longer input is stored as a blob
+STDIN_INLINE_LIMIT = 1024
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS error_logs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL,
+    error_type TEXT,
+    endpoint TEXT,
+    team_id INTEGER,
+    problem_id INTEGER,
+    language TEXT,
+    entry TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_error_logs_timestamp ON error_logs(timestamp);
+CREATE INDEX IF NOT EXISTS idx_error_logs_error_type ON error_logs(error_type, id);
+CREATE INDEX IF NOT EXISTS idx_error_logs_team_id ON error_logs(team_id, id);
+CREATE INDEX IF NOT EXISTS idx_error_logs_problem_id ON error_logs(problem_id, id);
+CREATE INDEX IF NOT EXISTS idx_error_logs_language ON error_logs(language, id);
+CREATE INDEX IF NOT EXISTS idx_error_logs_endpoint ON error_logs(endpoint, id);
+CREATE TABLE IF NOT EXISTS blobs (
+    hash TEXT PRIMARY KEY,
+    content TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS error_stats (
+    minute TEXT NOT NULL,
+    error_type TEXT NOT NULL,
+    problem_id INTEGER NOT NULL,
+    language TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (minute, error_type, problem_id, language)
+);
+CREATE TABLE IF NOT EXISTS team_error_stats (
+    team_id INTEGER NOT NULL,
+    error_type TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (team_id, error_type)
+);
+"""
+
+# A single connection shared by all threads; sqlite3 serializes access,
+# the lock keeps each insert + commit atomic with respect to other threads
+_db_lock = threading.Lock()
+_db_conn = None
+
+# Notified on every append so followers in this process wake immediately
+_appended = threading.Condition()
+
+def _get_connection():
+    """Open (once) the SQLite index, creating and backfilling it if needed"""
+    global _db_conn
+    if _db_conn is None:
+        conn = sqlite3.connect(ERROR_LOG_DB, timeout=10, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        _backfill_from_file(conn)
+        _backfill_stats(conn)
+        _db_conn = conn
+    return _db_conn
+
+def _index_row(log_entry: dict) -> tuple:
+    return (
+        log_entry.get("timestamp") or "",
+        log_entry.get("error_type"),
+        log_entry.get("endpoint"),
+        log_entry.get("team_id"),
+        log_entry.get("problem_id"),
+        log_entry.get("language"),
+        json.dumps(log_entry),
+    )
+
+_INSERT_SQL = (
+    "INSERT INTO error_logs (timestamp, error_type, endpoint, team_id, problem_id, language, entry) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?)"
+)
+
+def _backfill_from_file(conn):
+    """Index entries written before the SQLite store existed (runs once, on an empty index)"""
+    if not ERROR_LOG_FILE.exists():
+        return
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        if conn.execute("SELECT 1 FROM error_logs LIMIT 1").fetchone():
+            conn.execute("COMMIT")
+            return
+        with open(ERROR_LOG_FILE, "r", encoding="utf-8") as f:
+            rows = []
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    rows.append(_index_row(json.loads(line)))
+                except json.JSONDecodeError:
+                    continue
+                if len(rows) >= 1000:
+                    conn.executemany(_INSERT_SQL, rows)
+                    rows = []
+            if rows:
+                conn.executemany(_INSERT_SQL, rows)
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+# Counters key "unknown" problem/language as 0/'' so they fit the primary key
+_STATS_UPSERT_SQL = (
+    "INSERT INTO error_stats (minute, error_type, problem_id, language, count) VALUES (?, ?, ?, ?, 1) "
+    "ON CONFLICT (minute, error_type, problem_id, language) DO UPDATE SET count = count + 1"
+)
+_TEAM_STATS_UPSERT_SQL = (
+    "INSERT INTO team_error_stats (team_id, error_type, count) VALUES (?, ?, 1) "
+    "ON CONFLICT (team_id, error_type) DO UPDATE SET count = count + 1"
+)
+
+def _backfill_stats(conn):
+    """Build the counters from the index when they are empty (e.g. after an upgrade)"""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        has_stats = conn.execute("SELECT 1 FROM error_stats LIMIT 1").fetchone()
+        has_logs = conn.execute("SELECT 1 FROM error_logs LIMIT 1").fetchone()
+        if has_logs and not has_stats:
+            conn.execute("DELETE FROM team_error_stats")
+            conn.execute(
+                "INSERT INTO error_stats (minute, error_type, problem_id, language, count) "
+                "SELECT substr(timestamp, 1, 16), COALESCE(error_type, ''), COALESCE(problem_id, 0), "
+                "COALESCE(language, ''), COUNT(*) FROM error_logs GROUP BY 1, 2, 3, 4"
+            )
+            conn.execute(
+                "INSERT INTO team_error_stats (team_id, error_type, count) "
+                "SELECT team_id, COALESCE(error_type, ''), COUNT(*) FROM error_logs "
+                "WHERE team_id IS NOT NULL GROUP BY 1, 2"
+            )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+def _record_stats(conn, log_entry: dict):
+    """Bump the counters for one entry (caller holds _db_lock and commits)"""
+    error_type = log_entry.get("error_type") or ""
+    conn.execute(_STATS_UPSERT_SQL, (
+        log_entry["timestamp"][:16],
+        error_type,
+        log_entry.get("problem_id") or 0,
+        log_entry.get("language") or "",
+    ))
+    if log_entry.get("team_id") is not None:
+        conn.execute(_TEAM_STATS_UPSERT_SQL, (log_entry["team_id"], error_type))
+
+def _store_blob(content: str) -> str:
+    """Store content once in the blob table and return its hash"""
+    blob_hash = hashlib.sha256(content.encode("utf-8")).hexdigest()
+    # Always inserted: the primary key dedups, and a process-local "already
+    # stored" set would go stale when another worker clears the log
+    with _db_lock:
+        conn = _get_connection()
+        conn.execute("INSERT OR IGNORE INTO blobs (hash, content) VALUES (?, ?)", (blob_hash, content))
+        conn.commit()
+    return blob_hash
+
+def rehydrate_entries(log_entries: list) -> list:
+    """
+    Replace code_ref/stdin_ref blob references with their content (in place)
+
+    Args:
+        log_entries: Entries as written to the log file or index
+
+    Returns:
+        The same list, with "code" and "stdin" filled in
+    """
+    refs = set()
+    for log_entry in log_entries:
+        for field in ("code_ref", "stdin_ref"):
+            if log_entry.get(field):
+                refs.add(log_entry[field])
+    if not refs:
+        return log_entries
+
+    with _db_lock:
+        conn = _get_connection()
+        placeholders = ",".join("?" * len(refs))
+        rows = conn.execute(
+            f"SELECT hash, content FROM blobs WHERE hash IN ({placeholders})", list(refs)
+        ).fetchall()
+    contents = {row["hash"]: row["content"] for row in rows}
+
+    for log_entry in log_entries:
+        for field, ref_field in (("code", "code_ref"), ("stdin", "stdin_ref")):
+            ref = log_entry.pop(ref_field, None)
+            if ref:
+                log_entry[field] = contents.get(ref)
+    return log_entries
+
 def log_error(
     error_type: str,
     error_message: str,
@@ -28,7 +246,7 @@ def log_error(
 ):
     """
     Log an error to the error log file
-    
+
     Args:
         error_type: Type of error (e.g., "CompilationError", "RuntimeError", "APIError")
         error_message: The actual error message/details
@@ -40,6 +258,29 @@ def log_error(
         endpoint: API endpoint where error occurred (optional)
         additional_info: Any additional information (optional dict)
     """
+    start = time.perf_counter()
+
+    # Open the index before appending so a first-time backfill can't pick up this entry twice
+    try:
+        with _db_lock:
+            _get_connection()
+    except Exception as e:
+        print(f"Failed to open error log index: {e}")
+
+    # Reference code and large stdin by hash; the content is stored once
+    code_ref = None
+    stdin_ref = None
+    try:
+        if code:
+            code_ref = _store_blob(code)
+            code = None
+        if stdin and len(stdin) > STDIN_INLINE_LIMIT:
+            stdin_ref = _store_blob(stdin)
+            stdin = None
+    except Exception as e:
+        # Keep the content inline if the blob store is unavailable
+        print(f"Failed to store error log blob: {e}")
+
     log_entry = {
         "timestamp": datetime.now().isoformat(),
         "error_type": error_type,
@@ -52,7 +293,11 @@ def log_error(
         "stdin": stdin,
         "additional_info": additional_info or {}
     }
-    
+    if code_ref:
+        log_entry["code_ref"] = code_ref
+    if stdin_ref:
+        log_entry["stdin_ref"] = stdin_ref
+
     # Write to log file (append mode)
     try:
         with open(ERROR_LOG_FILE, "a", encoding="utf-8") as f:
@@ -61,54 +306,296 @@ def log_error(
         # Fallback: print to console if file write fails
         print(f"Failed to write to error log: {e}")
         print(f"Log entry: {log_entry}")
+    else:
+        with _appended:
+            _appended.notify_all()
+
+    # Index the entry for querying
+    try:
+        with _db_lock:
+            conn = _get_connection()
+            conn.execute(_INSERT_SQL, _index_row(log_entry))
+            _record_stats(conn, log_entry)
+            conn.commit()
+    except Exception as e:
+        print(f"Failed to index error log entry: {e}")
+
+    elapsed = time.perf_counter() - start
+    metrics.ERROR_LOG_WRITES.labels(error_type).inc()
+    metrics.ERROR_LOG_WRITE_DURATION.observe(elapsed)
+    tracing.record("log", elapsed)
+
+def _normalize_timestamp(value):
+    """Parse an ISO-8601 time bound so it compares correctly with stored timestamps"""
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return datetime.fromisoformat(value).isoformat()
+
+def query_error_logs(
+    limit: int = 100,
+    error_type: str = None,
+    team_id: int = None,
+    problem_id: int = None,
+    language: str = None,
+    endpoint: str = None,
+    since=None,
+    until=None,
+    cursor: int = None
+):
+    """
+    Query the indexed error logs, most recent first
+
+    Args:
+        limit: Maximum number of log entries to return
+        error_type: Filter by error type (optional)
+        team_id: Filter by team_id (optional)
+        problem_id: Filter by problem_id (optional)
+        language: Filter by language (optional)
+        endpoint: Filter by endpoint (optional)
+        since: Only entries at or after this ISO-8601 time (optional)
+        until: Only entries before this ISO-8601 time (optional)
+        cursor: Value of next_cursor from a previous page (optional)
+
+    Returns:
+        Tuple of (list of log entries, next_cursor or None when there are no more)
+
+    Raises:
+        ValueError: If since/until are not valid ISO-8601 times
+    """
+    clauses = []
+    params = []
+    for column, value in (
+        ("error_type", error_type),
+        ("team_id", team_id),
+        ("problem_id", problem_id),
+        ("language", language),
+        ("endpoint", endpoint),
+    ):
+        if value is not None:
+            clauses.append(f"{column} = ?")
+            params.append(value)
+    since = _normalize_timestamp(since)
+    until = _normalize_timestamp(until)
+    if since is not None:
+        clauses.append("timestamp >= ?")
+        params.append(since)
+    if until is not None:
+        clauses.append("timestamp < ?")
+        params.append(until)
+    if cursor is not None:
+        clauses.append("id < ?")
+        params.append(cursor)
+
+    sql = "SELECT id, entry FROM error_logs"
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    # Fetch one extra row to know whether another page exists
+    sql += " ORDER BY id DESC LIMIT ?"
+    params.append(max(limit, 0) + 1)
+
+    with _db_lock:
+        rows = _get_connection().execute(sql, params).fetchall()
+
+    logs = []
+    for row in rows[:limit]:
+        log_entry = json.loads(row["entry"])
+        log_entry["id"] = row["id"]
+        logs.append(log_entry)
+    rehydrate_entries(logs)
+    next_cursor = logs[-1]["id"] if len(rows) > limit and logs else None
+    return logs, next_cursor
 
 def get_error_logs(limit: int = 100, error_type: str = None, team_id: int = None):
     """
-    Read error logs from the log file
-    
+    Read error logs from the log store
+
     Args:
         limit: Maximum number of log entries to return
         error_type: Filter by error type (optional)
         team_id: Filter by team_id (optional)
-    
+
     Returns:
         List of log entries
     """
-    if not ERROR_LOG_FILE.exists():
+    try:
+        logs, _ = query_error_logs(limit=limit, error_type=error_type, team_id=team_id)
+        return logs
+    except Exception as e:
+        print(f"Failed to read error log: {e}")
         return []
-    
-    logs = []
+
+def follow_error_logs(
+    from_start: bool = False,
+    error_type: str = None,
+    team_id: int = None,
+    problem_id: int = None,
+    language: str = None,
+    endpoint: str = None,
+    poll_interval: float = 1.0,
+    idle_timeout: float = None
+):
+    """
+    Yield log entries as they are appended to the log file (like tail -f)
+
+    Only newly appended bytes are read and entries are handled one line at a
+    time, so memory use does not depend on the size of the log. Followers in
+    this process are woken by log_error directly; entries written by other
+    processes are picked up within poll_interval seconds.
+
+    Args:
+        from_start: Replay the existing file before following (default: only new entries)
+        error_type, team_id, problem_id, language, endpoint: Optional filters
+        poll_interval: Seconds between checks for entries from other processes
+        idle_timeout: If set, yield None after this many seconds without an entry
+            (lets callers send keep-alives or check for cancellation)
+
+    Yields:
+        Log entries (with code/stdin rehydrated), or None on idle timeouts
+    """
+    filters = {
+        "error_type": error_type,
+        "team_id": team_id,
+        "problem_id": problem_id,
+        "language": language,
+        "endpoint": endpoint,
+    }
+    filters = {key: value for key, value in filters.items() if value is not None}
+
+    f = None
+    offset = 0
+    if not from_start and ERROR_LOG_FILE.exists():
+        offset = ERROR_LOG_FILE.stat().st_size
+    last_activity = time.monotonic()
     try:
-        with open(ERROR_LOG_FILE, "r", encoding="utf-8") as f:
-            for line in f:
-                if line.strip():
+        while True:
+            # (Re)open when the file appears, is cleared or is replaced
+            try:
+                stat = ERROR_LOG_FILE.stat()
+            except FileNotFoundError:
+                stat = None
+            if f is not None and (stat is None or stat.st_ino != os.fstat(f.fileno()).st_ino or stat.st_size < offset):
+                f.close()
+                f = None
+                offset = 0
+            if f is None and stat is not None:
+                f = open(ERROR_LOG_FILE, "rb")
+                f.seek(offset)
+
+            got_entry = False
+            if f is not None:
+                while True:
+                    line = f.readline()
+                    if not line:
+                        break
+                    if not line.endswith(b"\n"):
+                        # Partially written line; read it again once it is complete
+                        f.seek(offset)
+                        break
+                    offset += len(line)
                     try:
                         log_entry = json.loads(line)
-                        
-                        # Apply filters
-                        if error_type and log_entry.get("error_type") != error_type:
-                            continue
-                        if team_id and log_entry.get("team_id") != team_id:
-                            continue
-                        
-                        logs.append(log_entry)
                     except json.JSONDecodeError:
                         continue
-        
-        # Return most recent logs first, limit the count
-        logs.reverse()
-        return logs[:limit]
-    except Exception as e:
-        print(f"Failed to read error log: {e}")
-        return []
+                    if any(log_entry.get(key) != value for key, value in filters.items()):
+                        continue
+                    got_entry = True
+                    last_activity = time.monotonic()
+                    yield rehydrate_entries([log_entry])[0]
+
+            if not got_entry:
+                if idle_timeout is not None and time.monotonic() - last_activity >= idle_timeout:
+                    last_activity = time.monotonic()
+                    yield None
+                wait = poll_interval
+                if idle_timeout is not None:
+                    wait = min(wait, max(idle_timeout - (time.monotonic() - last_activity), 0))
+                with _appended:
+                    _appended.wait(wait)
+    finally:
+        if f is not None:
+            f.close()
+
+def get_error_stats(minutes: int = 60):
+    """
+    Error counts from the incrementally maintained counters
+
+    The cost depends on the number of minute buckets in the window and the
+    number of teams, never on the number of log entries.
+
+    Args:
+        minutes: Size of the time window in minutes (0 = since the log was started)
+
+    Returns:
+        Dict with totals by error type, problem and language for the window,
+        a per-minute timeline, and all-time per-team totals
+    """
+    since = None
+    if minutes > 0:
+        since = (datetime.now() - timedelta(minutes=minutes - 1)).isoformat()[:16]
+
+    with _db_lock:
+        conn = _get_connection()
+        if since is None:
+            rows = conn.execute(
+                "SELECT minute, error_type, problem_id, language, count FROM error_stats ORDER BY minute"
+            ).fetchall()
+        else:
+            rows = conn.execute(
+                "SELECT minute, error_type, problem_id, language, count FROM error_stats "
+                "WHERE minute >= ? ORDER BY minute",
+                (since,)
+            ).fetchall()
+        team_rows = conn.execute(
+            "SELECT team_id, error_type, count FROM team_error_stats ORDER BY count DESC"
+        ).fetchall()
+
+    by_error_type = {}
+    by_problem = {}
+    by_language = {}
+    timeline = {}
+    for row in rows:
+        error_type = row["error_type"]
+        count = row["count"]
+        by_error_type[error_type] = by_error_type.get(error_type, 0) + count
+        if row["problem_id"]:
+            counts = by_problem.setdefault(row["problem_id"], {})
+            counts[error_type] = counts.get(error_type, 0) + count
+        if row["language"]:
+            counts = by_language.setdefault(row["language"], {})
+            counts[error_type] = counts.get(error_type, 0) + count
+        counts = timeline.setdefault(row["minute"], {})
+        counts[error_type] = counts.get(error_type, 0) + count
+
+    by_team = {}
+    for row in team_rows:
+        by_team.setdefault(row["team_id"], {})[row["error_type"]] = row["count"]
+
+    return {
+        "window_minutes": minutes,
+        "since": since,
+        "total": sum(by_error_type.values()),
+        "by_error_type": by_error_type,
+        "by_problem": by_problem,
+        "by_language": by_language,
+        "by_team": by_team,
+        "timeline": [{"minute": minute, "counts": counts} for minute, counts in timeline.items()]
+    }
 
 def clear_error_logs():
     """Clear all error logs (use with caution)"""
     try:
-        if ERROR_LOG_FILE.exists():
-            ERROR_LOG_FILE.unlink()
+        with _db_lock:
+            conn = _get_connection()
+            conn.execute("DELETE FROM error_logs")
+            conn.execute("DELETE FROM blobs")
+            conn.execute("DELETE FROM error_stats")
+            conn.execute("DELETE FROM team_error_stats")
+            conn.commit()
+            if ERROR_LOG_FILE.exists():
+                ERROR_LOG_FILE.unlink()
         return True
     except Exception as e:
         print(f"Failed to clear error log: {e}")
         return False
-
@@ -3,20 +3,34 @@ from dotenv import load_dotenv
 load_dotenv()
 
 import os
-from fastapi import FastAPI, Depends, HTTPException, Header
+import json
+import time
+import hashlib
+import tempfile
+from pathlib import Path
+from fastapi import FastAPI, Depends, HTTPException, Header, Request
+from fastapi.responses import StreamingResponse, Response, FileResponse
+from starlette.background import BackgroundTask
 from sqlalchemy.orm import Session
-import models, database, piston, logger
+import models, database, piston, logger, metrics, tracing, responses, capture, admission, ratelimit, deadlines, catalog, templates, checkers, judge, rejudge, export
 from pydantic import BaseModel
 from datetime import datetime
 from typing import List, Dict, Any, Optional
 import bcrypt
 from fastapi.middleware.cors import CORSMiddleware
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeoutError
 
 # Admin secret key for accessing error logs (set in .env file)
 ADMIN_SECRET = os.getenv("ADMIN_SECRET", "change-this-secret-key")
 
-app = FastAPI()
+# Characters of program output returned per /run-batch test case (the rest is cut off)
+RUN_BATCH_OUTPUT_LIMIT = int(os.getenv("RUN_BATCH_OUTPUT_LIMIT", str(64 * 1024)))
+# Same, in compact mode
+COMPACT_OUTPUT_LIMIT = int(os.getenv("COMPACT_OUTPUT_LIMIT", "1024"))
+# Seconds browsers may reuse a language template before revalidating it
+TEMPLATE_CACHE_MAX_AGE = int(os.getenv("TEMPLATE_CACHE_MAX_AGE", "300"))
+
+app = FastAPI(default_response_class=responses.FastJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -26,9 +40,17 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.add_middleware(responses.CompressionMiddleware)
+app.add_middleware(tracing.TimingMiddleware)
+# Opt-in, anonymized traffic capture for replay.py (see capture.py)
+if capture.TRAFFIC_CAPTURE_PATH:
+    app.add_middleware(capture.CaptureMiddleware)
+# Outermost, so recorded latency covers the whole request
+app.add_middleware(metrics.MetricsMiddleware)
+
 @app.on_event("startup")
 async def startup_event():
-    """Test database connection on startup"""
+    """Test database connection, upgrade the schema and start runtime discovery on startup"""
     try:
         db = database.SessionLocal()
         try:
@@ -45,10 +67,25 @@ async def startup_event():
         print(f"❌ Database connection failed: {e}")
         print("   ⚠️  Server will continue, but database operations may fail")
 
+    # Tables created by an older seed.py lack newer columns (submissions.language)
+    try:
+        database.upgrade_schema()
+    except Exception as e:
+        print(f"❌ Database schema upgrade failed: {e}")
+        print("   ⚠️  Run seed.py or add the missing columns by hand")
+
+    # Pin executor runtime versions and keep the list current
+    piston.runtime_registry.start()
+
 @app.get("/ping")
 def ping():
     return {"message": "pong"}
 
+@app.get("/metrics")
+def get_metrics():
+    """Prometheus metrics for this worker process"""
+    return Response(content=metrics.render_latest(), media_type=metrics.CONTENT_TYPE_LATEST)
+
 def get_db():
     db = database.SessionLocal()
     try:
@@ -70,11 +107,17 @@ class RunRequest(BaseModel):
     language: str
     code: str
     stdin: str = ""
+    team_id: Optional[int] = None  # for rate limiting; the client address is used if missing
 
 class BatchRunRequest(BaseModel):
     language: str
     code: str
     test_cases: List[Dict[str, Any]]  # List of {"input": str, "expected_output": str}
+    team_id: Optional[int] = None
+    problem_id: Optional[int] = None  # selects the problem's output checker
+    # Return only verdicts, timings, a short output excerpt and the first differing line,
+    # not the inputs and expected outputs the client already has
+    compact: bool = False
 
 # Admin endpoints for viewing error logs
 def verify_admin(admin_secret: Optional[str] = Header(None, alias="X-Admin-Secret")):
@@ -87,18 +130,91 @@ def get_error_logs(
     limit: int = 100,
     error_type: Optional[str] = None,
     team_id: Optional[int] = None,
-    admin_secret: str = Header(None, alias="X-Admin-Secret"),
-    db: Session = Depends(get_db)
+    problem_id: Optional[int] = None,
+    language: Optional[str] = None,
+    endpoint: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    cursor: Optional[int] = None,
+    admin_secret: str = Header(None, alias="X-Admin-Secret")
 ):
-    """Get error logs (admin only) - requires X-Admin-Secret header"""
+    """Get error logs (admin only) - requires X-Admin-Secret header
+
+    Results are most recent first. Pass the returned next_cursor as `cursor`
+    to fetch the following page; it is null once there are no more entries.
+    """
     verify_admin(admin_secret)
     
-    logs = logger.get_error_logs(limit=limit, error_type=error_type, team_id=team_id)
+    try:
+        logs, next_cursor = logger.query_error_logs(
+            limit=limit,
+            error_type=error_type,
+            team_id=team_id,
+            problem_id=problem_id,
+            language=language,
+            endpoint=endpoint,
+            since=since,
+            until=until,
+            cursor=cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid time range: {str(e)}")
     return {
         "total": len(logs),
-        "logs": logs
+        "logs": logs,
+        "next_cursor": next_cursor
     }
 
+@app.get("/admin/logs/stream")
+def stream_error_logs(
+    error_type: Optional[str] = None,
+    team_id: Optional[int] = None,
+    problem_id: Optional[int] = None,
+    language: Optional[str] = None,
+    endpoint: Optional[str] = None,
+    admin_secret: str = Header(None, alias="X-Admin-Secret")
+):
+    """Stream new error logs as Server-Sent Events (admin only)
+
+    Each event's data is one log entry as JSON. A comment line is sent every
+    15 seconds without errors to keep the connection open.
+    """
+    verify_admin(admin_secret)
+
+    def event_stream():
+        for log_entry in logger.follow_error_logs(
+            error_type=error_type,
+            team_id=team_id,
+            problem_id=problem_id,
+            language=language,
+            endpoint=endpoint,
+            idle_timeout=15
+        ):
+            if log_entry is None:
+                yield ": keep-alive\n\n"
+            else:
+                yield f"event: error_log\ndata: {json.dumps(log_entry)}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/admin/logs/stats")
+def get_error_stats(
+    minutes: int = 60,
+    admin_secret: str = Header(None, alias="X-Admin-Secret")
+):
+    """Get error counts by type, problem, language and team (admin only)
+
+    Counts cover the last `minutes` minutes (0 = everything); per-team totals
+    are always all-time. Served from counters, so cost does not grow with the log.
+    """
+    verify_admin(admin_secret)
+
+    return logger.get_error_stats(minutes=max(minutes, 0))
+
 @app.delete("/admin/logs")
 def clear_error_logs(admin_secret: str = Header(None, alias="X-Admin-Secret")):
     """Clear all error logs (admin only) - requires X-Admin-Secret header"""
@@ -107,6 +223,104 @@ def clear_error_logs(admin_secret: str = Header(None, alias="X-Admin-Secret")):
     success = logger.clear_error_logs()
     return {"success": success, "message": "Error logs cleared" if success else "Failed to clear logs"}
 
+@app.get("/admin/slow-requests")
+def get_slow_requests(admin_secret: str = Header(None, alias="X-Admin-Secret")):
+    """Slowest requests seen by this worker with their timing spans (admin only)"""
+    verify_admin(admin_secret)
+
+    requests_list = tracing.slowest_requests()
+    return {"total": len(requests_list), "requests": requests_list}
+
+@app.delete("/admin/slow-requests")
+def clear_slow_requests(admin_secret: str = Header(None, alias="X-Admin-Secret")):
+    """Reset the slow request list (admin only)"""
+    verify_admin(admin_secret)
+
+    tracing.clear_slowest_requests()
+    return {"success": True}
+
+@app.post("/admin/profiler/start")
+def start_profiler(interval_ms: float = 5, admin_secret: str = Header(None, alias="X-Admin-Secret")):
+    """Start sampling CPU stacks of live traffic (admin only)"""
+    verify_admin(admin_secret)
+
+    if not tracing.start_profiler(interval=max(interval_ms, 1) / 1000):
+        raise HTTPException(status_code=409, detail="Profiler is already running")
+    return {"running": True, "interval_ms": max(interval_ms, 1)}
+
+@app.post("/admin/profiler/stop")
+def stop_profiler(admin_secret: str = Header(None, alias="X-Admin-Secret")):
+    """Stop the profiler and write the folded stacks to backend/logs/profiles (admin only)"""
+    verify_admin(admin_secret)
+
+    stopped = tracing.stop_profiler()
+    if stopped is None:
+        raise HTTPException(status_code=409, detail="Profiler is not running")
+    path, samples = stopped
+    return {"running": False, "file": str(path), "samples": samples}
+
+@app.post("/admin/catalog/refresh")
+def refresh_catalog(admin_secret: str = Header(None, alias="X-Admin-Secret")):
+    """Make all workers reload problems and test cases for /bootstrap (admin only)"""
+    verify_admin(admin_secret)
+
+    catalog.invalidate()
+    return {"success": True}
+
+@app.post("/admin/rejudge")
+def start_rejudge(
+    problem_id: Optional[int] = None,
+    parallelism: int = rejudge.REJUDGE_PARALLELISM,
+    restart: bool = False,
+    admin_secret: str = Header(None, alias="X-Admin-Secret")
+):
+    """Rejudge stored submissions of a problem (or all problems) in the background (admin only)
+
+    Follow progress with GET /admin/rejudge. An interrupted job resumes from its
+    checkpoint unless restart is set.
+    """
+    verify_admin(admin_secret)
+
+    if not rejudge.start_in_background(problem_id=problem_id, parallelism=max(parallelism, 1), restart=restart):
+        raise HTTPException(status_code=409, detail="A rejudge job is already running")
+    return {"started": True, "problem_id": problem_id}
+
+@app.get("/admin/rejudge")
+def get_rejudge_progress(admin_secret: str = Header(None, alias="X-Admin-Secret")):
+    """Progress of the current or last rejudge job (admin only)"""
+    verify_admin(admin_secret)
+
+    return rejudge.current_progress() or {"state": "idle"}
+
+@app.get("/admin/export/{dataset}")
+def export_data(dataset: str, admin_secret: str = Header(None, alias="X-Admin-Secret"), db: Session = Depends(get_db)):
+    """Download submissions, error_logs or code_blobs as a Parquet file (admin only)
+
+    Rows are streamed into a temporary file batch by batch, then sent in chunks.
+    """
+    verify_admin(admin_secret)
+
+    if dataset not in export.DATASETS:
+        raise HTTPException(status_code=404, detail=f"Unknown dataset (choose from {', '.join(export.DATASETS)})")
+    fd, name = tempfile.mkstemp(prefix=f"export-{dataset}-", suffix=".parquet")
+    os.close(fd)
+    path = Path(name)
+    try:
+        rows = export.export_dataset(dataset, path, db)
+    except ImportError as e:
+        path.unlink(missing_ok=True)
+        raise HTTPException(status_code=501, detail=str(e))
+    except Exception:
+        path.unlink(missing_ok=True)
+        raise
+    return FileResponse(
+        path,
+        media_type="application/vnd.apache.parquet",
+        filename=f"{dataset}.parquet",
+        headers={"X-Row-Count": str(rows)},
+        background=BackgroundTask(path.unlink, missing_ok=True)
+    )
+
 @app.get("/test-db")
 def test_db(db: Session = Depends(get_db)):
     """Test database connection and return basic info"""
@@ -168,68 +382,104 @@ def get_testcases(problem_id: int, include_hidden: bool = False, db: Session = D
     test_cases = query.all()
     return [{"test_case_id": tc.test_case_id, "input_data": tc.input_data, "expected_output": tc.expected_output, "is_hidden": bool(tc.is_hidden)} for tc in test_cases]
 
+@app.get("/problems/{problem_id}/template")
+def get_template(
+    problem_id: int,
+    language: str,
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
+    """Starter code for a problem in one language, generated when the catalog loads
+
+    The ETag is a hash of the code, so a template stays cached across
+    catalog reloads until its problem actually changes.
+    """
+    problem_templates = catalog.get_catalog(db)["templates"].get(str(problem_id))
+    if problem_templates is None:
+        raise HTTPException(status_code=404, detail="Problem not found")
+    if language not in problem_templates:
+        raise HTTPException(status_code=400, detail=f"Unsupported language (choose from {', '.join(templates.LANGUAGES)})")
+
+    code, etag = problem_templates[language]
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={TEMPLATE_CACHE_MAX_AGE}"}
+    if if_none_match == etag:
+        return Response(status_code=304, headers=headers)
+    return responses.FastJSONResponse(
+        {"problem_id": problem_id, "language": language, "code": code},
+        headers=headers
+    )
+
 @app.get("/submissions")
 def get_submissions(team_id: int, db: Session = Depends(get_db)):
     submissions = db.query(models.Submission).filter(models.Submission.team_id == team_id).all()
     return [{"problem_id": s.problem_id, "status": s.status} for s in submissions]
 
-def _process_test_case_submit(test_case, language, code, team_id, problem_id):
-    """Process a single test case for submission (used in parallel execution)"""
+@app.get("/bootstrap")
+def bootstrap(
+    team_id: int,
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
+    """Everything a page needs on load: problems, visible test cases per problem and the team's statuses
+
+    Problems and test cases come from the cached catalog. The ETag covers the
+    catalog version and the team's statuses, so sending it back in
+    If-None-Match gives 304 when nothing changed.
+    """
+    catalog_data = catalog.get_catalog(db)
+    rows = db.query(models.Submission.problem_id, models.Submission.status).filter(
+        models.Submission.team_id == team_id
+    ).all()
+    submissions = [{"problem_id": problem_id, "status": status} for problem_id, status in rows]
+
+    digest = hashlib.sha256(json.dumps([catalog_data["version"], submissions]).encode("utf-8")).hexdigest()
+    headers = {"ETag": f'"{digest[:20]}"', "Cache-Control": "private, no-cache"}
+    if if_none_match == headers["ETag"]:
+        return Response(status_code=304, headers=headers)
+    return responses.FastJSONResponse(
+        {
+            "version": catalog_data["version"],
+            "problems": catalog_data["problems"],
+            "test_cases": catalog_data["test_cases"],
+            "submissions": submissions
+        },
+        headers=headers
+    )
+
+def _check_admission(endpoint: str):
+    """Turn away low-priority execution requests with 503 while this worker is overloaded"""
+    retry_after = admission.controller.admit(endpoint)
+    if retry_after is not None:
+        raise HTTPException(
+            status_code=503,
+            detail="Server is busy running other code, please retry shortly",
+            headers={"Retry-After": str(retry_after)}
+        )
+
+def _check_language(language: str):
+    """Reject languages the executor has no runtime for with 400, before any executor call"""
     try:
-        result = piston.execute_code(language=language, code=code, stdin=test_case.input_data)
-        
-        # Log errors if they exist
-        if result.get("compile") and result["compile"].get("stderr"):
-            logger.log_error(
-                error_type="CompilationError",
-                error_message=result["compile"]["stderr"],
-                code=code,
-                language=language,
-                stdin=test_case.input_data,
-                team_id=team_id,
-                problem_id=problem_id,
-                endpoint="/submit"
-            )
-        elif result.get("run") and result["run"].get("stderr"):
-            logger.log_error(
-                error_type="RuntimeError",
-                error_message=result["run"]["stderr"],
-                code=code,
-                language=language,
-                stdin=test_case.input_data,
-                team_id=team_id,
-                problem_id=problem_id,
-                endpoint="/submit"
-            )
-        
-        actual_output = ""
-        if result.get("run"):
-            actual_output = (result["run"].get("stdout") or result["run"].get("stderr") or result["run"].get("output") or "").strip()
-        expected_output = (test_case.expected_output or "").strip()
-        
-        return {
-            "passed": actual_output == expected_output,
-            "error": None
-        }
-    except Exception as e:
-        # Log submission errors
-        logger.log_error(
-            error_type="SubmissionError",
-            error_message=str(e),
-            code=code,
-            language=language,
-            stdin=test_case.input_data,
-            team_id=team_id,
-            problem_id=problem_id,
-            endpoint="/submit"
+        piston.runtime_registry.resolve(language)
+    except piston.UnsupportedLanguage as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def _check_rate_limit(bucket: str, team_id: Optional[int], http_request: Request, response: Response, cost: int = 1):
+    """Take tokens from the team's bucket; 429 with X-RateLimit-* headers when it is empty"""
+    client_host = http_request.client.host if http_request.client else None
+    result = ratelimit.check(bucket, ratelimit.client_key(team_id, client_host), cost=cost)
+    if not result.allowed:
+        raise HTTPException(
+            status_code=429,
+            detail="Rate limit exceeded, please slow down",
+            headers=result.headers()
         )
-        return {
-            "passed": False,
-            "error": str(e)
-        }
+    response.headers.update(result.headers())
 
 @app.post("/submit")
-def submit(request: SubmissionRequest, db: Session = Depends(get_db)):
+def submit(request: SubmissionRequest, http_request: Request, response: Response, db: Session = Depends(get_db)):
+    _check_language(request.language)
+    _check_rate_limit("submit", request.team_id, http_request, response)
+
     # Check problem existence
     problem = db.query(models.Problem).filter(models.Problem.id == request.problem_id).first()
     if not problem:
@@ -241,36 +491,15 @@ def submit(request: SubmissionRequest, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Team not found")
 
     # Fetch all test cases (including hidden ones)
-    test_cases = db.query(models.TestCase).filter(models.TestCase.problem_id == request.problem_id).all()
-
-    # Run code against all test cases in parallel using ThreadPoolExecutor
-    # This helps handle concurrent requests from multiple teams during competition
-    all_passed = True
-    max_workers = min(len(test_cases), 20)  # Limit concurrent threads to avoid overwhelming the API
-    
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        # Submit all test cases for parallel execution
-        future_to_test = {
-            executor.submit(
-                _process_test_case_submit,
-                test_case,
-                request.language,
-                request.code,
-                request.team_id,
-                request.problem_id
-            ): test_case
-            for test_case in test_cases
-        }
-        
-        # Process results as they complete
-        for future in as_completed(future_to_test):
-            result = future.result()
-            if not result["passed"]:
-                all_passed = False
-                # Don't break immediately - let other threads complete, but we know it failed
-                # This ensures all test cases are processed and logged
+    test_cases = db.query(models.TestCase).filter(
+        models.TestCase.problem_id == request.problem_id
+    ).order_by(models.TestCase.test_case_id).all()  # the lowest failing test decides the verdict
 
-    status = "Accepted" if all_passed else "Wrong Answer"
+    deadline = deadlines.Deadline(deadlines.SUBMIT_DEADLINE)
+    status = judge.judge_submission(
+        test_cases, request.language, request.code, request.team_id, request.problem_id, deadline,
+        prepared=catalog.get_catalog(db)["expected"]
+    )
 
     # Check if a previous submission exists for this team & problem
     existing_submission = db.query(models.Submission).filter(
@@ -282,6 +511,7 @@ def submit(request: SubmissionRequest, db: Session = Depends(get_db)):
         # Update the existing submission
         existing_submission.status = status
         existing_submission.code_file_blob = request.code
+        existing_submission.language = request.language
         existing_submission.submitted_at = datetime.now()
     else:
         # Insert a new submission
@@ -290,21 +520,30 @@ def submit(request: SubmissionRequest, db: Session = Depends(get_db)):
             problem_id=request.problem_id,
             submitted_at=datetime.now(),
             code_file_blob=request.code,
+            language=request.language,
             status=status
         )
         db.add(new_submission)
 
-    db.commit()
+    with tracing.span("db"):
+        db.commit()
     return {"status": status}
 
 @app.post("/run")
-def run_code(request: RunRequest):
+def run_code(request: RunRequest, http_request: Request, response: Response):
+    # /submit is always admitted; practice runs are shed first under load
+    _check_admission("/run")
+    _check_language(request.language)
+    _check_rate_limit("run", request.team_id, http_request, response)
+    deadline = deadlines.Deadline(deadlines.RUN_DEADLINE)
     try:
-        result = piston.execute_code(
-            language=request.language,
-            code=request.code,
-            stdin=request.stdin
-        )
+        with admission.controller.executing():
+            result = piston.execute_code(
+                language=request.language,
+                code=request.code,
+                stdin=request.stdin,
+                timeout=deadline.test_budget(1, 1)
+            )
         
         # Log errors if they exist in the result
         # Check for compilation errors first
@@ -360,6 +599,16 @@ def run_code(request: RunRequest):
                     )
         
         return result
+    except piston.ExecutionTimeout as e:
+        logger.log_error(
+            error_type="TimeLimitExceeded",
+            error_message=str(e),
+            code=request.code,
+            language=request.language,
+            stdin=request.stdin,
+            endpoint="/run"
+        )
+        raise HTTPException(status_code=504, detail=deadlines.TIME_LIMIT_EXCEEDED)
     except Exception as e:
         # Log API errors
         logger.log_error(
@@ -372,14 +621,58 @@ def run_code(request: RunRequest):
         )
         raise HTTPException(status_code=500, detail=f"Execution failed: {str(e)}")
 
-def _process_test_case_batch(test_case, language, code):
-    """Process a single test case for batch run (used in parallel execution)"""
+def _clip_output(text: str, limit: int):
+    """text without surrounding whitespace, cut to limit characters; returns (clipped, truncated)"""
+    start, end = checkers.strip_bounds(text)
+    return text[start:min(end, start + limit)], end - start > limit
+
+def _batch_result(test_case, compact, passed=False, error=None, actual_output=None, truncated=False,
+                  time_ms=None, diff=None):
+    """One /run-batch result, full or compact"""
+    if compact:
+        return {
+            "passed": passed,
+            "error": error,
+            "time_ms": time_ms,
+            "actual_output": actual_output,
+            "truncated": truncated,
+            "diff": diff
+        }
+    return {
+        "input": test_case.get("input", ""),
+        "expected_output": test_case.get("expected_output", "").strip(),
+        "actual_output": actual_output,
+        "passed": passed,
+        "error": error,
+        "truncated": truncated,
+        "time_ms": time_ms
+    }
+
+def _time_limit_exceeded_batch_result(test_case, compact=False):
+    return _batch_result(test_case, compact, error=deadlines.TIME_LIMIT_EXCEEDED)
+
+def _process_test_case_batch(test_case, language, code, deadline=None, test_budget=None, checker=checkers.DEFAULT,
+                             compact=False):
+    """Process a single test case for batch run (used in parallel execution)
+
+    Deadline handling is the same as for judge.judge_test_case. The returned
+    output is capped at RUN_BATCH_OUTPUT_LIMIT (COMPACT_OUTPUT_LIMIT in
+    compact mode) characters whatever the program prints.
+    """
+    timeout = None
+    if deadline is not None:
+        timeout = deadline.budget(test_budget)
+        if timeout < deadlines.MIN_TEST_BUDGET:
+            return _time_limit_exceeded_batch_result(test_case, compact)
     try:
+        start = time.perf_counter()
         result = piston.execute_code(
             language=language,
             code=code,
-            stdin=test_case.get("input", "")
+            stdin=test_case.get("input", ""),
+            timeout=timeout
         )
+        time_ms = round((time.perf_counter() - start) * 1000, 1)
         
         # Log errors if they exist
         # Check for compilation errors first
@@ -430,23 +723,35 @@ def _process_test_case_batch(test_case, language, code):
                         endpoint="/run-batch"
                     )
         
-        # Extract output
-        actual_output = ""
-        if result.get("run"):
-            actual_output = (result["run"].get("stdout") or result["run"].get("stderr") or result["run"].get("output") or "").strip()
-        elif result.get("compile"):
-            actual_output = (result["compile"].get("stdout") or result["compile"].get("stderr") or result["compile"].get("output") or "").strip()
+        if piston.timed_out(result):
+            return _time_limit_exceeded_batch_result(test_case, compact)
+
+        # Only stdout is compared; stderr is still shown when there is no stdout
+        stdout = (result.get("run") or {}).get("stdout") or ""
+        expected_output = test_case.get("expected_output", "")
+        passed = checker.matches(expected_output, stdout, test_case.get("input", ""))
         
-        expected_output = test_case.get("expected_output", "").strip()
-        passed = actual_output == expected_output
+        limit = COMPACT_OUTPUT_LIMIT if compact else RUN_BATCH_OUTPUT_LIMIT
+        actual_output, truncated = _clip_output(stdout, limit)
+        if not actual_output:
+            stage = result.get("run") or result.get("compile") or {}
+            actual_output, truncated = _clip_output(stage.get("stderr") or stage.get("output") or "", limit)
         
-        return {
-            "input": test_case.get("input", ""),
-            "expected_output": expected_output,
-            "actual_output": actual_output,
-            "passed": passed,
-            "error": None
-        }
+        diff = None
+        if compact and not passed:
+            diff = checkers.first_difference(expected_output, stdout)
+        return _batch_result(test_case, compact, passed=passed, actual_output=actual_output, truncated=truncated,
+                             time_ms=time_ms, diff=diff)
+    except piston.ExecutionTimeout as e:
+        logger.log_error(
+            error_type="TimeLimitExceeded",
+            error_message=str(e),
+            code=code,
+            language=language,
+            stdin=test_case.get("input", ""),
+            endpoint="/run-batch"
+        )
+        return _time_limit_exceeded_batch_result(test_case, compact)
     except Exception as e:
         logger.log_error(
             error_type="BatchExecutionError",
@@ -456,44 +761,67 @@ def _process_test_case_batch(test_case, language, code):
             stdin=test_case.get("input", ""),
             endpoint="/run-batch"
         )
-        return {
-            "input": test_case.get("input", ""),
-            "expected_output": test_case.get("expected_output", ""),
-            "actual_output": None,
-            "passed": False,
-            "error": "Execution failed"
-        }
+        return _batch_result(test_case, compact, error="Execution failed")
 
 @app.post("/run-batch")
-def run_batch(request: BatchRunRequest):
-    """Run code against multiple test cases in one request (parallel execution)"""
+def run_batch(request: BatchRunRequest, http_request: Request, response: Response):
+    """Run code against multiple test cases in one request (parallel execution)
+
+    With compact=true each result holds only passed, error, time_ms, a short
+    actual_output excerpt (truncated says whether it was cut) and, for a wrong
+    answer, diff: the first differing line.
+    """
+    _check_admission("/run-batch")
+    _check_language(request.language)
+    # Each test case is one execution
+    _check_rate_limit("run", request.team_id, http_request, response, cost=max(len(request.test_cases), 1))
     try:
         # Use ThreadPoolExecutor for parallel processing
         # This helps handle concurrent requests from multiple teams during competition
         max_workers = min(len(request.test_cases), 20)  # Limit concurrent threads
+        deadline = deadlines.Deadline(deadlines.RUN_DEADLINE)
+        test_budget = deadline.test_budget(len(request.test_cases), max_workers)
+        checker = checkers.for_problem(request.problem_id)
         
-        results = []
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        try:
             # Submit all test cases for parallel execution
             future_to_test = {
                 executor.submit(
-                    _process_test_case_batch,
+                    tracing.bind(admission.controller.track_task(
+                        metrics.track_pool_task("run_batch", _process_test_case_batch)
+                    )),
                     test_case,
                     request.language,
-                    request.code
+                    request.code,
+                    deadline,
+                    test_budget,
+                    checker,
+                    request.compact
                 ): idx
                 for idx, test_case in enumerate(request.test_cases)
             }
             
             # Collect results as they complete (maintain order by using index)
             results_dict = {}
-            for future in as_completed(future_to_test):
-                idx = future_to_test[future]
-                result = future.result()
-                results_dict[idx] = result
-            
-            # Reconstruct results in original order
-            results = [results_dict[i] for i in sorted(results_dict.keys())]
+            try:
+                for future in as_completed(future_to_test, timeout=deadline.wait_timeout()):
+                    idx = future_to_test[future]
+                    result = future.result()
+                    results_dict[idx] = result
+            except FuturesTimeoutError:
+                pass  # unfinished tests are reported as Time Limit Exceeded below
+        finally:
+            # Don't wait for stragglers; their executor calls end at their own timeout.
+            # Queued tests are not cancelled: they return at once once out of time,
+            # which keeps the pool and admission accounting balanced.
+            executor.shutdown(wait=False)
+        
+        # Reconstruct results in original order
+        results = [
+            results_dict.get(i) or _time_limit_exceeded_batch_result(test_case, request.compact)
+            for i, test_case in enumerate(request.test_cases)
+        ]
         
         return {"results": results}
     except Exception as e:
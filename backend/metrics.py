@@ -0,0 +1,283 @@
+"""
+Prometheus-style metrics for the backend
+Exposed in text format by the /metrics endpoint
+
+Metrics are plain in-process objects: bucket arrays are allocated once when a
+label combination is first seen, and each update is a few integer/float
+additions under a per-series lock that is practically never contended.
+With several worker processes each worker reports its own numbers.
+"""
+
+import bisect
+import threading
+import time
+
+# Latency buckets in seconds, shared by the request/executor histograms
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_registry = []
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(labelnames, labelvalues, extra=None):
+    pairs = list(zip(labelnames, labelvalues))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+class _Metric:
+    """Base class: keeps one child series per label combination"""
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._children_lock = threading.Lock()
+        _registry.append(self)
+
+    def labels(self, *labelvalues):
+        """Get the series for these label values (created on first use)"""
+        child = self._children.get(labelvalues)
+        if child is None:
+            if len(labelvalues) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            with self._children_lock:
+                child = self._children.get(labelvalues)
+                if child is None:
+                    child = self._new_child()
+                    self._children[labelvalues] = child
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _default(self):
+        return self.labels()
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        for labelvalues, child in list(self._children.items()):
+            lines.extend(child.render(self.name, self.labelnames, labelvalues))
+        return lines
+
+class _CounterChild:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._value = 0.0
+
+    def inc(self, amount: float = 1):
+        with self._lock:
+            self._value += amount
+
+    def render(self, name, labelnames, labelvalues):
+        return [f"{name}{_format_labels(labelnames, labelvalues)} {_format_value(self._value)}"]
+
+class Counter(_Metric):
+    """Monotonically increasing count (e.g. requests, errors)"""
+    type_name = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1):
+        self._default().inc(amount)
+
+class _GaugeChild(_CounterChild):
+    def dec(self, amount: float = 1):
+        with self._lock:
+            self._value -= amount
+
+    def set(self, value: float):
+        self._value = value
+
+class Gauge(_Metric):
+    """Value that can go up and down (e.g. queue depth, active workers)"""
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames=(), callback=None):
+        super().__init__(name, documentation, labelnames)
+        # Optional function returning the current value, read at scrape time
+        self._callback = callback
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def inc(self, amount: float = 1):
+        self._default().inc(amount)
+
+    def dec(self, amount: float = 1):
+        self._default().dec(amount)
+
+    def set(self, value: float):
+        self._default().set(value)
+
+    def render(self):
+        if self._callback is not None:
+            try:
+                self.set(self._callback())
+            except Exception:
+                pass
+        return super().render()
+
+class _HistogramChild:
+    def __init__(self, buckets):
+        self._lock = threading.Lock()
+        self._buckets = buckets
+        # One slot per bucket plus +Inf, allocated once
+        self._counts = [0] * (len(buckets) + 1)
+        self._sum = 0.0
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self._buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    def render(self, name, labelnames, labelvalues):
+        with self._lock:
+            counts = list(self._counts)
+            total_sum = self._sum
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self._buckets + (float("inf"),), counts):
+            cumulative += count
+            labels = _format_labels(labelnames, labelvalues, ("le", _format_value(float(bound))))
+            lines.append(f"{name}_bucket{labels} {cumulative}")
+        labels = _format_labels(labelnames, labelvalues)
+        lines.append(f"{name}_sum{labels} {_format_value(total_sum)}")
+        lines.append(f"{name}_count{labels} {cumulative}")
+        return lines
+
+class Histogram(_Metric):
+    """Distribution of observed values (e.g. latencies) over fixed buckets"""
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self._default().observe(value)
+
+def render_latest() -> str:
+    """All registered metrics in the Prometheus text exposition format"""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+
+# HTTP
+HTTP_REQUESTS = Counter(
+    "http_requests_total", "HTTP requests by route, method and status code",
+    ("route", "method", "status")
+)
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route and method",
+    ("route", "method")
+)
+
+# Code executor (Piston)
+EXECUTOR_REQUEST_DURATION = Histogram(
+    "executor_request_duration_seconds", "Latency of calls to the code executor by language",
+    ("language",)
+)
+EXECUTOR_ERRORS = Counter(
+    "executor_errors_total", "Executor calls that failed, timed out or returned a compile/runtime error, by language",
+    ("language", "kind")
+)
+
+# Test-case thread pools used by /submit and /run-batch
+POOL_QUEUED = Gauge(
+    "judge_pool_queued_tasks", "Test-case tasks waiting for a worker thread", ("pool",)
+)
+POOL_ACTIVE = Gauge(
+    "judge_pool_active_workers", "Worker threads currently running a test case", ("pool",)
+)
+POOL_QUEUE_WAIT = Histogram(
+    "judge_pool_queue_wait_seconds", "Time test-case tasks spent waiting for a worker thread", ("pool",)
+)
+
+# Database connection pool
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds", "Time spent waiting to check out a database connection"
+)
+
+# Error log
+ERROR_LOG_WRITES = Counter(
+    "error_log_writes_total", "Entries written to the error log by error type", ("error_type",)
+)
+ERROR_LOG_WRITE_DURATION = Histogram(
+    "error_log_write_duration_seconds", "Time taken by logger.log_error"
+)
+
+def track_pool_task(pool: str, fn):
+    """
+    Wrap a function submitted to a test-case thread pool so the pool's queue
+    depth, active worker count and queue wait are recorded
+
+    Call this at submit time: the task counts as queued from then until a
+    worker thread starts running it.
+    """
+    queued = POOL_QUEUED.labels(pool)
+    active = POOL_ACTIVE.labels(pool)
+    queue_wait = POOL_QUEUE_WAIT.labels(pool)
+    queued.inc()
+    submitted_at = time.perf_counter()
+
+    def run(*args, **kwargs):
+        queued.dec()
+        queue_wait.observe(time.perf_counter() - submitted_at)
+        active.inc()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            active.dec()
+
+    return run
+
+class MetricsMiddleware:
+    """ASGI middleware recording request counts and latency per route template"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # Use the route template (e.g. /problems/{id}) to keep label cardinality bounded
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "unmatched"
+            method = scope.get("method", "")
+            HTTP_REQUEST_DURATION.labels(route_path, method).observe(time.perf_counter() - start)
+            HTTP_REQUESTS.labels(route_path, method, str(status_code)).inc()
@@ -0,0 +1,309 @@
+"""
+Micro-benchmarks for the judging hot path
+Runs the per-test-case judging functions, output checkers and error
+logging in-process against a fake executor, over payloads from a few bytes
+up to multi-MB outputs, and reports ns/op and peak allocated bytes per op.
+
+It also compares response serialization for the largest API payloads:
+stdlib json (FastAPI's default) vs orjson, plus gzip/brotli compression,
+and prints the bytes each would put on the wire.
+
+Usage:
+    python microbench.py                          # run everything
+    python microbench.py --filter serialize       # serializer comparison only
+    python microbench.py --filter submit --quick  # subset, fewer iterations
+    python microbench.py --save baseline.json     # store a baseline
+    python microbench.py --compare baseline.json  # flag regressions (exit 1)
+
+Nothing here touches the network, the database or backend/logs.
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from types import SimpleNamespace
+
+from dotenv import load_dotenv
+
+# main builds the database engine at import time; it never connects here
+load_dotenv()
+for _name, _value in (("DB_USER", "bench"), ("DB_PASSWORD", "bench"), ("DB_HOST", "localhost"),
+                      ("DB_PORT", "5432"), ("DB_NAME", "bench")):
+    os.environ.setdefault(_name, _value)
+
+import checkers
+import judge
+import logger
+import main
+import piston
+import responses
+
+# Payload sizes in bytes: tiny stdin up to multi-MB outputs
+SIZES = {
+    "tiny": 16,
+    "1KB": 1024,
+    "64KB": 64 * 1024,
+    "1MB": 1024 * 1024,
+    "4MB": 4 * 1024 * 1024,
+}
+
+def _text(size: int) -> str:
+    """Multi-line text of roughly the given size, like typical program output"""
+    line = "1 2 3 4 5 6 7 8 9 10 11 12 13 14 15\n"
+    return (line * (size // len(line) + 1))[:size]
+
+class FakeExecutor:
+    """Stands in for piston.execute_code, returning a prepared result"""
+
+    def __init__(self, stdout: str = "", stderr: str = "", code: int = 0, compile_stderr: str = None):
+        self.result = {"language": "python", "version": "3.10.0",
+                       "run": {"stdout": stdout, "stderr": stderr, "code": code, "signal": None,
+                               "output": stdout + stderr}}
+        if compile_stderr is not None:
+            self.result["compile"] = {"stdout": "", "stderr": compile_stderr, "code": 1, "signal": None,
+                                      "output": compile_stderr}
+
+    def __call__(self, language, code, stdin, **kwargs):
+        return self.result
+
+def _use_temporary_log_dir():
+    """Point the error logger at a throwaway directory"""
+    log_dir = Path(tempfile.mkdtemp(prefix="microbench-logs-"))
+    logger.LOG_DIR = log_dir
+    logger.ERROR_LOG_FILE = log_dir / "error_log.jsonl"
+    logger.ERROR_LOG_DB = log_dir / "error_log.db"
+    logger._db_conn = None
+    return log_dir
+
+def build_benchmarks() -> dict:
+    """name -> (setup, fn); setup() returns the arguments passed to fn"""
+    benchmarks = {}
+    code = "import sys\nfor line in sys.stdin:\n    print(line.strip())\n" * 20
+
+    for size_name, size in SIZES.items():
+        output = _text(size)
+
+        def submit_pass(output=output):
+            piston.execute_code = FakeExecutor(stdout=output)
+            test_case = SimpleNamespace(input_data="1 2\n", expected_output=output)
+            return (test_case, "python", code, 1, 1)
+
+        def submit_runtime_error(output=output):
+            piston.execute_code = FakeExecutor(stderr=output[:4096], code=1)
+            test_case = SimpleNamespace(input_data=output, expected_output="42\n")
+            return (test_case, "python", code, 1, 1)
+
+        def batch_pass(output=output):
+            piston.execute_code = FakeExecutor(stdout=output)
+            return ({"input": "1 2\n", "expected_output": output}, "python", code)
+
+        def compare_outputs(output=output):
+            return (output, output + "\n")
+
+        def check_output(output=output, checker=None):
+            return (checker, checker.prepare(output), output + "\n")
+
+        def log_error(output=output):
+            return (output,)
+
+        benchmarks[f"submit_case/pass/{size_name}"] = (submit_pass, judge.judge_test_case)
+        benchmarks[f"submit_case/runtime_error/{size_name}"] = (submit_runtime_error, judge.judge_test_case)
+        benchmarks[f"batch_case/pass/{size_name}"] = (batch_pass, main._process_test_case_batch)
+        benchmarks[f"compare/strip_equal/{size_name}"] = (compare_outputs, _compare_outputs)
+        for checker in (checkers.ExactChecker(), checkers.TokenChecker(), checkers.FloatChecker()):
+            benchmarks[f"compare/{checker.mode}/{size_name}"] = (
+                lambda output=output, checker=checker: check_output(output, checker), _check_output
+            )
+        benchmarks[f"log_error/{size_name}"] = (log_error, _log_error)
+
+    for payload_name, content in api_payloads().items():
+        body = _json_orjson(content)
+        benchmarks[f"serialize/{payload_name}/json"] = (lambda content=content: (content,), _json_stdlib)
+        benchmarks[f"serialize/{payload_name}/orjson"] = (lambda content=content: (content,), _json_orjson)
+        for encoding in ("gzip", "br"):
+            benchmarks[f"compress/{payload_name}/{encoding}"] = (
+                lambda body=body, encoding=encoding: (body, encoding), responses.compress
+            )
+
+    return benchmarks
+
+def api_payloads() -> dict:
+    """Realistically sized bodies of the largest API responses"""
+    code_blob = "def solve(a, b):\n    # Compute the answer\n    return a + b\n\n" * 60
+    problems = [{"id": i, "title": f"Problem {i}", "buggy_file_blob": code_blob} for i in range(1, 21)]
+    case_text = _text(1024)
+    run_batch = {"results": [
+        {"input": case_text, "expected_output": case_text, "actual_output": case_text, "passed": True, "error": None}
+        for _ in range(50)
+    ]}
+    run_batch_compact = {"results": [
+        {"passed": True, "error": None, "time_ms": 12.5, "actual_output": case_text, "truncated": False, "diff": None}
+        for _ in range(50)
+    ]}
+    admin_logs = {"total": 100, "next_cursor": 1, "logs": [
+        {"id": i, "timestamp": "2024-11-15T12:34:56.789012", "error_type": "RuntimeError",
+         "error_message": "Traceback (most recent call last):\n  File \"main.py\", line 3\nNameError: name 'x' is not defined",
+         "endpoint": "/submit", "team_id": 7, "problem_id": 3, "language": "python", "code": code_blob,
+         "stdin": "1 2", "additional_info": {}}
+        for i in range(100, 0, -1)
+    ]}
+    return {"problems": problems, "run_batch": run_batch, "run_batch_compact": run_batch_compact,
+            "admin_logs": admin_logs}
+
+def _json_stdlib(content):
+    # What starlette's JSONResponse.render does
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+def _json_orjson(content):
+    return responses.FastJSONResponse.render(None, content)
+
+def print_wire_sizes():
+    """Bytes on the wire for each API payload, before and after"""
+    print(f"\n{'payload':<20}{'json':>12}{'orjson':>12}{'gzip':>12}{'br':>12}")
+    print("-" * 68)
+    for name, content in api_payloads().items():
+        body = _json_orjson(content)
+        print(f"{name:<20}{_format_bytes(len(_json_stdlib(content))):>12}{_format_bytes(len(body)):>12}"
+              f"{_format_bytes(len(responses.compress(body, 'gzip'))):>12}"
+              f"{_format_bytes(len(responses.compress(body, 'br'))):>12}")
+
+def _compare_outputs(actual: str, expected: str) -> bool:
+    # How outputs were compared before checkers.py, kept as a reference point
+    return actual.strip() == expected.strip()
+
+def _check_output(checker, prepared, actual: str) -> bool:
+    # Expected outputs are prepared once at catalog load, as in judging
+    return checker.check(prepared, actual, "")
+
+def _log_error(code: str):
+    logger.log_error(
+        error_type="RuntimeError",
+        error_message="Traceback (most recent call last):\n  ValueError",
+        code=code,
+        language="python",
+        stdin="1 2\n",
+        team_id=1,
+        problem_id=1,
+        endpoint="/submit"
+    )
+
+def measure(setup, fn, min_time: float, repeats: int) -> dict:
+    """
+    Time fn(*setup()) and measure its peak allocation
+
+    Returns:
+        Dict with ns_per_op (best of `repeats` runs), iterations per run,
+        and alloc_peak_bytes (peak traced memory during a single call)
+    """
+    args = setup()
+    fn(*args)  # warm up caches, imports, SQLite connection
+
+    # Grow the iteration count until one run takes at least min_time
+    iterations = 1
+    while True:
+        start = time.perf_counter_ns()
+        for _ in range(iterations):
+            fn(*args)
+        elapsed = time.perf_counter_ns() - start
+        if elapsed >= min_time * 1e9 or iterations >= 1_000_000:
+            break
+        iterations *= 2
+
+    best = elapsed / iterations
+    for _ in range(repeats - 1):
+        start = time.perf_counter_ns()
+        for _ in range(iterations):
+            fn(*args)
+        best = min(best, (time.perf_counter_ns() - start) / iterations)
+
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        baseline, _ = tracemalloc.get_traced_memory()
+        fn(*args)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {"ns_per_op": round(best, 1), "iterations": iterations, "alloc_peak_bytes": peak - baseline}
+
+def _format_ns(ns: float) -> str:
+    for unit, scale in (("s", 1e9), ("ms", 1e6), ("us", 1e3)):
+        if ns >= scale:
+            return f"{ns / scale:.2f}{unit}"
+    return f"{ns:.0f}ns"
+
+def _format_bytes(size: float) -> str:
+    for unit, scale in (("MB", 1024 * 1024), ("KB", 1024)):
+        if size >= scale:
+            return f"{size / scale:.1f}{unit}"
+    return f"{size:.0f}B"
+
+def compare_to_baseline(results: dict, baseline: dict, threshold_pct: float) -> list:
+    """Names of benchmarks slower (or allocating more) than baseline by more than threshold_pct"""
+    regressions = []
+    factor = 1 + threshold_pct / 100
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if result["ns_per_op"] > base["ns_per_op"] * factor:
+            regressions.append(f"{name}: {_format_ns(base['ns_per_op'])} -> {_format_ns(result['ns_per_op'])}")
+        if result["alloc_peak_bytes"] > base["alloc_peak_bytes"] * factor + 1024:
+            regressions.append(f"{name}: peak alloc {_format_bytes(base['alloc_peak_bytes'])} -> "
+                               f"{_format_bytes(result['alloc_peak_bytes'])}")
+    return regressions
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for judging hot functions")
+    parser.add_argument("--filter", default="", help="Only run benchmarks whose name contains this")
+    parser.add_argument("--quick", action="store_true", help="Shorter runs (less precise)")
+    parser.add_argument("--save", help="Write results to this baseline file")
+    parser.add_argument("--compare", help="Compare against this baseline file")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Percent slowdown counted as a regression")
+    args = parser.parse_args()
+
+    log_dir = _use_temporary_log_dir()
+    original_execute = piston.execute_code
+    min_time, repeats = (0.05, 2) if args.quick else (0.2, 5)
+
+    print(f"{'benchmark':<36}{'time/op':>12}{'peak alloc/op':>16}")
+    print("-" * 64)
+    results = {}
+    try:
+        for name, (setup, fn) in build_benchmarks().items():
+            if args.filter not in name:
+                continue
+            result = measure(setup, fn, min_time, repeats)
+            results[name] = result
+            print(f"{name:<36}{_format_ns(result['ns_per_op']):>12}{_format_bytes(result['alloc_peak_bytes']):>16}")
+    finally:
+        piston.execute_code = original_execute
+        print(f"\n(temporary error logs written to {log_dir})")
+
+    if any(name.startswith(("serialize/", "compress/")) for name in results):
+        print_wire_sizes()
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Baseline written to {args.save}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s) beyond {args.threshold}%:")
+            for regression in regressions:
+                print(f"   {regression}")
+            sys.exit(1)
+        print(f"\n✅ No regressions beyond {args.threshold}% against {args.compare}")
+
+if __name__ == "__main__":
+    main_cli()
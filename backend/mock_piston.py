@@ -0,0 +1,184 @@
+"""
+Local Piston-compatible mock server for offline benchmarking
+Implements POST /api/v2/piston/execute and GET /api/v2/piston/runtimes
+
+Run this, then point the backend at it:
+
+    python mock_piston.py --port 2000 --latency lognormal:-1.6,0.5 --rate-limit-rate 0.02
+    PISTON_API_URL=http://127.0.0.1:2000/api/v2/piston/execute python start_server.py
+
+Several instances (e.g. one with --latency fixed:2 or --error-rate 1 to see
+hedging and circuit breaking at work) can be combined with PISTON_API_URLS:
+
+    PISTON_API_URLS=http://127.0.0.1:2000/api/v2/piston/execute,http://127.0.0.1:2001/api/v2/piston/execute
+
+Latency distributions (seconds):
+    fixed:0.2            always 0.2s
+    uniform:0.1,0.5      uniformly between 0.1s and 0.5s
+    normal:0.3,0.05      mean 0.3s, standard deviation 0.05s (clamped at 0)
+    lognormal:-1.6,0.5   exp(N(mu, sigma)), a typical long-tailed service shape
+    exponential:0.25     mean 0.25s
+
+Output modes:
+    echo     stdout is the request's stdin (default; cheap and deterministic)
+    canned   stdout is the --stdout text for every request
+    execute  really run Python (and JavaScript if node is installed) in a
+             subprocess; other languages fall back to echo
+"""
+
+import argparse
+import asyncio
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import List, Optional
+
+import uvicorn
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+# Runtimes reported by /runtimes, shaped like the public Piston instance
+RUNTIMES = [
+    {"language": "python", "version": "3.10.0", "aliases": ["py", "py3", "python3", "python3.10"]},
+    {"language": "javascript", "version": "18.15.0", "aliases": ["node-javascript", "node-js", "javascript", "js"]},
+    {"language": "java", "version": "15.0.2", "aliases": []},
+    {"language": "c++", "version": "10.2.0", "aliases": ["cpp", "g++"]},
+    {"language": "c", "version": "10.2.0", "aliases": ["gcc"]},
+    {"language": "csharp", "version": "6.12.0", "aliases": ["mono", "mono-csharp", "mono-c#", "mono-cs", "c#", "cs"]},
+]
+COMPILED_LANGUAGES = {"java", "c++", "c", "csharp"}
+
+class MockConfig:
+    """Behaviour of the mock, set from the command line"""
+    latency = "fixed:0"
+    error_rate = 0.0
+    rate_limit_rate = 0.0
+    mode = "echo"
+    stdout = ""
+    execute_timeout = 3.0
+
+config = MockConfig()
+rng = random.Random()
+
+class PistonFile(BaseModel):
+    name: Optional[str] = None
+    content: str
+
+class ExecuteRequest(BaseModel):
+    language: str
+    version: str = "*"
+    files: List[PistonFile]
+    stdin: str = ""
+    run_timeout: Optional[int] = None
+
+app = FastAPI(title="Mock Piston")
+
+def resolve_runtime(language: str):
+    for runtime in RUNTIMES:
+        if language == runtime["language"] or language in runtime["aliases"]:
+            return runtime
+    return None
+
+def sample_latency(spec: str) -> float:
+    """Draw one latency in seconds from a "kind:params" distribution spec"""
+    kind, _, params = spec.partition(":")
+    values = [float(value) for value in params.split(",") if value]
+    if kind == "fixed":
+        return values[0] if values else 0.0
+    if kind == "uniform":
+        return rng.uniform(values[0], values[1])
+    if kind == "normal":
+        return max(rng.gauss(values[0], values[1]), 0.0)
+    if kind == "lognormal":
+        return rng.lognormvariate(values[0], values[1])
+    if kind == "exponential":
+        return rng.expovariate(1 / values[0]) if values[0] > 0 else 0.0
+    raise ValueError(f"Unknown latency distribution '{kind}'")
+
+def _stage(stdout: str = "", stderr: str = "", code: int = 0, signal=None) -> dict:
+    return {"stdout": stdout, "stderr": stderr, "code": code, "signal": signal, "output": stdout + stderr}
+
+def _execute_for_real(language: str, code: str, stdin: str, timeout: float):
+    """Run the program locally; returns a Piston "run" stage or None if unsupported"""
+    if language == "python":
+        command = [sys.executable, "main.py"]
+    elif language == "javascript" and shutil.which("node"):
+        command = ["node", "main.js"]
+    else:
+        return None
+
+    with tempfile.TemporaryDirectory() as workdir:
+        Path(workdir, command[-1]).write_text(code, encoding="utf-8")
+        try:
+            completed = subprocess.run(
+                command, input=stdin, capture_output=True, text=True, cwd=workdir, timeout=timeout
+            )
+        except subprocess.TimeoutExpired as e:
+            return _stage(e.stdout or "", e.stderr or "", None, "SIGKILL")
+        return _stage(completed.stdout, completed.stderr, completed.returncode)
+
+@app.get("/api/v2/piston/runtimes")
+def runtimes():
+    return RUNTIMES
+
+@app.post("/api/v2/piston/execute")
+async def execute(request: ExecuteRequest):
+    await asyncio.sleep(sample_latency(config.latency))
+
+    if config.rate_limit_rate and rng.random() < config.rate_limit_rate:
+        return JSONResponse(status_code=429, content={"message": "Requests are limited to 5 per second"})
+    if config.error_rate and rng.random() < config.error_rate:
+        return JSONResponse(status_code=500, content={"message": "Mock Piston injected error"})
+
+    runtime = resolve_runtime(request.language)
+    if runtime is None or request.version not in ("*", runtime["version"]):
+        return JSONResponse(
+            status_code=400, content={"message": f"{request.language}-{request.version} runtime is unknown"}
+        )
+
+    code = request.files[0].content if request.files else ""
+    run = None
+    if config.mode == "execute":
+        timeout = request.run_timeout / 1000 if request.run_timeout else config.execute_timeout
+        run = await asyncio.to_thread(_execute_for_real, runtime["language"], code, request.stdin, timeout)
+    if run is None:
+        run = _stage(config.stdout if config.mode == "canned" else request.stdin)
+
+    result = {"language": runtime["language"], "version": runtime["version"], "run": run}
+    if runtime["language"] in COMPILED_LANGUAGES:
+        result["compile"] = _stage()
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Piston-compatible mock server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=2000)
+    parser.add_argument("--latency", default="fixed:0", help="Latency distribution, e.g. lognormal:-1.6,0.5")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with HTTP 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of requests answered with HTTP 429")
+    parser.add_argument("--mode", choices=["echo", "canned", "execute"], default="echo")
+    parser.add_argument("--stdout", default="", help="Output returned in canned mode")
+    parser.add_argument("--execute-timeout", type=float, default=3.0, help="Seconds before a real execution is killed")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed for latency and fault injection")
+    args = parser.parse_args()
+
+    sample_latency(args.latency)  # fail fast on a bad spec
+    config.latency = args.latency
+    config.error_rate = args.error_rate
+    config.rate_limit_rate = args.rate_limit_rate
+    config.mode = args.mode
+    config.stdout = args.stdout
+    config.execute_timeout = args.execute_timeout
+    rng.seed(args.seed)
+
+    print("🧪 Starting mock Piston server...")
+    print(f"📍 Execute endpoint: http://{args.host}:{args.port}/api/v2/piston/execute")
+    print(f"   Latency: {args.latency} | errors: {args.error_rate:.1%} | 429s: {args.rate_limit_rate:.1%} | mode: {args.mode}")
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
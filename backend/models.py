@@ -23,6 +23,7 @@ class Submission(Base):
     problem_id = Column(Integer, ForeignKey("problems.id"), primary_key=True)
     submitted_at = Column(DateTime)
     code_file_blob = Column(Text)
+    language = Column(String)  # None for submissions made before it was recorded
     status = Column(String)
 
     team = relationship("Team")
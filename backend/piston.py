@@ -1,11 +1,155 @@
+import os
+import json
+import time
+import hashlib
+import threading
 import requests
+import metrics
+import tracing
+from piston_pool import EndpointPool
+from runtimes import RuntimeRegistry, UnsupportedLanguage, parse_pins
+from shared_state import store
 
-PISTON_API_URL = "https://emkc.org/api/v2/piston/execute"
+# Set PISTON_API_URL (e.g. in .env) to use a self-hosted instance or mock_piston.py
+PISTON_API_URL = os.getenv("PISTON_API_URL", "https://emkc.org/api/v2/piston/execute")
+# Or PISTON_API_URLS, comma-separated, to balance over several instances (see piston_pool.py)
+PISTON_API_URLS = [url.strip() for url in os.getenv("PISTON_API_URLS", "").split(",") if url.strip()] or [PISTON_API_URL]
 
-def execute_code(language: str, code: str, stdin: str) -> dict:
+endpoints = EndpointPool(PISTON_API_URLS)
+
+# Exact runtime versions per language, e.g. "python=3.10.0,java=15.0.2" (see runtimes.py)
+PISTON_PINNED_VERSIONS = parse_pins(os.getenv("PISTON_PINNED_VERSIONS", ""))
+
+runtime_registry = RuntimeRegistry(PISTON_API_URLS, PISTON_PINNED_VERSIONS)
+
+# Results of identical executions (language, version, code, stdin) are reused
+# for this many seconds, across all worker processes; 0 disables the cache
+EXECUTION_CACHE_TTL = float(os.getenv("EXECUTION_CACHE_TTL", "300"))
+# Results with more output than this are not cached
+EXECUTION_CACHE_MAX_BYTES = int(os.getenv("EXECUTION_CACHE_MAX_BYTES", str(1024 * 1024)))
+
+# Largest run_timeout (ms) Piston accepts; the public instance allows 3000
+PISTON_MAX_RUN_TIMEOUT_MS = int(os.getenv("PISTON_MAX_RUN_TIMEOUT_MS", "3000"))
+# Part of a time budget kept for the round trip, so Piston's own kill answers before the HTTP timeout
+RUN_TIMEOUT_MARGIN = 0.25
+# HTTP timeout (seconds) for executions that are not given a time budget
+PISTON_HTTP_TIMEOUT = float(os.getenv("PISTON_HTTP_TIMEOUT", "30"))
+
+class ExecutionTimeout(Exception):
+    """The executor did not answer within the time budget"""
+
+EXECUTION_CACHE = metrics.Counter(
+    "executor_cache_requests_total", "Execution result cache lookups by result (hit/miss)", ("result",)
+)
+
+EXECUTIONS_COALESCED = metrics.Counter(
+    "executor_coalesced_requests_total", "Executions that shared an identical in-flight upstream call"
+)
+
+class _Flight:
+    """An upstream execution that identical concurrent requests wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+# Cache key -> _Flight of the execution currently running in this process
+_flights = {}
+_flights_lock = threading.Lock()
+
+def _cache_key(language: str, version: str, code: str, stdin: str) -> str:
+    digest = hashlib.sha256(json.dumps([language, version, code, stdin]).encode("utf-8")).hexdigest()
+    return f"exec:{digest}"
+
+def _is_cacheable(result: dict) -> bool:
+    """Only cache complete executions (not executor errors such as rate limits) of bounded size"""
+    run = result.get("run")
+    if not run or run.get("signal"):
+        return False
+    size = sum(len(stage.get("stdout") or "") + len(stage.get("stderr") or "")
+               for stage in (run, result.get("compile") or {}))
+    return size <= EXECUTION_CACHE_MAX_BYTES
+
+def timed_out(result: dict) -> bool:
+    """Whether Piston stopped the program for running out of time"""
+    run = result.get("run") or {}
+    return run.get("status") == "TO" or run.get("signal") == "SIGKILL"
+
+def execute_code(language: str, code: str, stdin: str, timeout: float = None) -> dict:
+    """
+    Run code on Piston (or return the cached result of an identical run)
+
+    Identical executions requested at the same time (a double-clicked Run,
+    several tabs) share one upstream call and all receive its result.
+    The language runs on its pinned runtime version (see runtimes.py).
+
+    Args:
+        timeout: Seconds the execution may take, including the round trip;
+            sent to Piston as run_timeout and used as the HTTP timeout
+
+    Raises:
+        UnsupportedLanguage: The executor offers no runtime for the language
+        ExecutionTimeout: Piston did not answer within the timeout
+    """
+    version = runtime_registry.resolve(language)
+    cache_key = None
+    if EXECUTION_CACHE_TTL > 0:
+        cache_key = _cache_key(language, version, code, stdin)
+        try:
+            cached = store.get(cache_key)
+        except Exception as e:
+            print(f"Execution cache lookup failed: {e}")
+            cached = None
+        if cached is not None:
+            EXECUTION_CACHE.labels("hit").inc()
+            return cached
+        EXECUTION_CACHE.labels("miss").inc()
+
+    result = _execute_single_flight(language, version, code, stdin, timeout)
+
+    if cache_key is not None and _is_cacheable(result):
+        try:
+            store.set(cache_key, result, ttl=EXECUTION_CACHE_TTL)
+        except Exception as e:
+            print(f"Execution cache store failed: {e}")
+    return result
+
+def _execute_single_flight(language: str, version: str, code: str, stdin: str, timeout: float = None) -> dict:
+    """_execute_upstream, joining an identical execution already in flight instead of starting another"""
+    key = _cache_key(language, version, code, stdin)
+    with _flights_lock:
+        flight = _flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _flights[key] = _Flight()
+
+    if not leader:
+        EXECUTIONS_COALESCED.inc()
+        wait = timeout if timeout is not None else PISTON_HTTP_TIMEOUT
+        with tracing.span("executor"):
+            finished = flight.done.wait(wait)
+        if not finished:
+            raise ExecutionTimeout(f"No response from executor within {wait:.1f}s")
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+    try:
+        flight.result = _execute_upstream(language, version, code, stdin, timeout)
+        return flight.result
+    except Exception as e:
+        flight.error = e
+        raise
+    finally:
+        with _flights_lock:
+            del _flights[key]
+        flight.done.set()
+
+def _execute_upstream(language: str, version: str, code: str, stdin: str, timeout: float = None) -> dict:
     payload = {
         "language": language,
-        "version": "*",
+        "version": version,
         "files": [
             {
                 "content": code
@@ -13,5 +157,29 @@ def execute_code(language: str, code: str, stdin: str) -> dict:
         ],
         "stdin": stdin
     }
-    response = requests.post(PISTON_API_URL, json=payload)
-    return response.json()
\ No newline at end of file
+    if timeout is not None:
+        run_timeout_ms = int((timeout - RUN_TIMEOUT_MARGIN) * 1000)
+        payload["run_timeout"] = max(min(run_timeout_ms, PISTON_MAX_RUN_TIMEOUT_MS), 1)
+    start = time.perf_counter()
+    try:
+        with tracing.span("executor"):
+            result = endpoints.execute(payload, timeout if timeout is not None else PISTON_HTTP_TIMEOUT)
+    except requests.exceptions.Timeout as e:
+        metrics.EXECUTOR_ERRORS.labels(language, "timeout").inc()
+        raise ExecutionTimeout(f"No response from executor within {timeout or PISTON_HTTP_TIMEOUT:.1f}s") from e
+    except Exception:
+        metrics.EXECUTOR_ERRORS.labels(language, "request").inc()
+        raise
+    finally:
+        metrics.EXECUTOR_REQUEST_DURATION.labels(language).observe(time.perf_counter() - start)
+
+    if (result.get("compile") or {}).get("code"):
+        metrics.EXECUTOR_ERRORS.labels(language, "compile").inc()
+    elif timed_out(result):
+        metrics.EXECUTOR_ERRORS.labels(language, "timeout").inc()
+    elif (result.get("run") or {}).get("code"):
+        metrics.EXECUTOR_ERRORS.labels(language, "runtime").inc()
+    elif "run" not in result:
+        # Piston error payload, e.g. {"message": "..."} for unknown runtimes or rate limits
+        metrics.EXECUTOR_ERRORS.labels(language, "executor").inc()
+    return result
@@ -0,0 +1,289 @@
+"""
+Load balancing, hedging and circuit breaking across Piston endpoints
+Configure several Piston-compatible instances (self-hosted Piston or
+mock_piston.py) with PISTON_API_URLS. Each call goes to the healthy
+endpoint with the fewest outstanding requests. A call still running after
+the recent p95 latency is duplicated on a second endpoint, and whichever
+answers first wins. Hedged calls run on at most PISTON_HEDGE_WORKERS threads;
+when they are all busy a call runs on its caller's thread without a hedge
+rather than waiting for one.
+
+Each endpoint has a circuit breaker. After CIRCUIT_FAILURE_THRESHOLD
+consecutive failures (connection errors, timeouts, HTTP 5xx/429) it is taken
+out of rotation for CIRCUIT_COOLDOWN seconds. Then a single probe request is
+let through, and a successful probe closes the circuit again. A call that
+fails is retried once on another endpoint.
+"""
+
+import os
+import time
+import random
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import requests
+
+import metrics
+
+# Consecutive failures that open an endpoint's circuit
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("PISTON_CIRCUIT_FAILURES", "5"))
+# Seconds an open circuit waits before letting a probe request through
+CIRCUIT_COOLDOWN = float(os.getenv("PISTON_CIRCUIT_COOLDOWN", "10"))
+# Hedging starts once this many latencies have been observed
+HEDGE_MIN_SAMPLES = 20
+# Never hedge sooner than this, whatever the p95
+HEDGE_MIN_DELAY = 0.05
+# Recent latencies kept for the p95
+_LATENCY_WINDOW = 500
+# Threads for hedged calls (the primary and its duplicate). A call that finds
+# them all busy runs on its caller's thread without hedging instead of queueing
+HEDGE_WORKERS = int(os.getenv("PISTON_HEDGE_WORKERS", "64"))
+
+ENDPOINT_OUTSTANDING = metrics.Gauge(
+    "executor_endpoint_outstanding_requests", "Requests in flight to each executor endpoint", ("endpoint",)
+)
+ENDPOINT_CIRCUIT_OPEN = metrics.Gauge(
+    "executor_endpoint_circuit_open", "1 while an executor endpoint is out of rotation", ("endpoint",)
+)
+HEDGED_REQUESTS = metrics.Counter(
+    "executor_hedged_requests_total", "Duplicate executor requests sent after the p95 latency, by outcome",
+    ("outcome",)
+)
+
+class NoEndpointAvailable(Exception):
+    """Every executor endpoint has an open circuit"""
+
+class CircuitBreaker:
+    """Closed -> open after repeated failures -> half-open (one probe) -> closed"""
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD, cooldown: float = CIRCUIT_COOLDOWN):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def available(self) -> bool:
+        """Whether a request may be sent now (claims the probe slot when half-open)"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.cooldown:
+                self.state = self.HALF_OPEN
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    @property
+    def is_open(self) -> bool:
+        return self.state != self.CLOSED
+
+class Attempt:
+    """Outcome of one request to one endpoint"""
+
+    def __init__(self, endpoint, result=None, error=None, ok=True):
+        self.endpoint = endpoint
+        self.result = result
+        self.error = error
+        self.ok = ok
+
+    def unwrap(self) -> dict:
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+class Endpoint:
+    """One Piston-compatible execute URL with its own connection pool and breaker"""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.outstanding = 0
+        self.breaker = CircuitBreaker()
+        self.session = requests.Session()
+        self._lock = threading.Lock()
+
+    def call(self, payload: dict, timeout: float) -> Attempt:
+        with self._lock:
+            self.outstanding += 1
+        ENDPOINT_OUTSTANDING.labels(self.url).inc()
+        try:
+            response = self.session.post(self.url, json=payload, timeout=timeout)
+            result = response.json()
+        except Exception as e:
+            self.breaker.record_failure()
+            return Attempt(self, error=e, ok=False)
+        finally:
+            with self._lock:
+                self.outstanding -= 1
+            ENDPOINT_OUTSTANDING.labels(self.url).dec()
+            ENDPOINT_CIRCUIT_OPEN.labels(self.url).set(1 if self.breaker.is_open else 0)
+
+        # 4xx other than 429 is about the request (e.g. unknown language), not the endpoint
+        if response.status_code >= 500 or response.status_code == 429:
+            self.breaker.record_failure()
+            ENDPOINT_CIRCUIT_OPEN.labels(self.url).set(1 if self.breaker.is_open else 0)
+            return Attempt(self, result=result, ok=False)
+        self.breaker.record_success()
+        ENDPOINT_CIRCUIT_OPEN.labels(self.url).set(0)
+        return Attempt(self, result=result)
+
+class EndpointPool:
+    """Piston endpoints with least-outstanding balancing and p95 hedging"""
+
+    def __init__(self, urls):
+        self.endpoints = [Endpoint(url) for url in urls]
+        self._latencies = deque(maxlen=_LATENCY_WINDOW)
+        self._p95 = None
+        self._samples_since_p95 = 0
+        self._lock = threading.Lock()
+        # Only needed for hedging, so a single endpoint never starts it
+        self._executor = None
+        # One slot per hedge thread; a call is only handed to the executor
+        # when it can start right away
+        self._slots = threading.BoundedSemaphore(HEDGE_WORKERS)
+
+    def choose(self, exclude=None):
+        """Endpoint with the fewest outstanding requests among those with a closed circuit"""
+        candidates = [endpoint for endpoint in self.endpoints if endpoint is not exclude]
+        random.shuffle(candidates)  # spread ties
+        candidates.sort(key=lambda endpoint: endpoint.outstanding)
+        for endpoint in candidates:
+            if endpoint.breaker.available():
+                return endpoint
+        return None
+
+    def hedge_delay(self):
+        """Recent p95 latency, or None until enough calls have been seen"""
+        with self._lock:
+            if len(self._latencies) < HEDGE_MIN_SAMPLES:
+                return None
+            if self._p95 is None or self._samples_since_p95 >= 25:
+                ordered = sorted(self._latencies)
+                self._p95 = ordered[int(len(ordered) * 0.95) - 1]
+                self._samples_since_p95 = 0
+            return max(self._p95, HEDGE_MIN_DELAY)
+
+    def _observe(self, seconds: float):
+        with self._lock:
+            self._latencies.append(seconds)
+            self._samples_since_p95 += 1
+
+    def _timed_call(self, endpoint: Endpoint, payload: dict, timeout: float) -> Attempt:
+        start = time.perf_counter()
+        attempt = endpoint.call(payload, timeout)
+        if attempt.ok:
+            self._observe(time.perf_counter() - start)
+        return attempt
+
+    def _call_with_failover(self, primary: Endpoint, payload: dict, timeout: float, started: float) -> Attempt:
+        attempt = self._timed_call(primary, payload, timeout)
+        if not attempt.ok:
+            backup = self.choose(exclude=primary)
+            remaining = timeout - (time.monotonic() - started)
+            if backup is not None and remaining > 0:
+                attempt = self._timed_call(backup, payload, remaining)
+        return attempt
+
+    def _submit(self, endpoint: Endpoint, payload: dict, timeout: float):
+        """
+        Start a call on a hedge thread
+
+        Returns:
+            Its future, or None if every hedge thread is busy (the call is
+            never queued behind others, where it would wait out its hedge
+            delay and timeout before even being sent)
+        """
+        if not self._slots.acquire(blocking=False):
+            return None
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=HEDGE_WORKERS, thread_name_prefix="piston-hedge")
+
+        def call():
+            try:
+                return self._timed_call(endpoint, payload, timeout)
+            finally:
+                self._slots.release()
+
+        try:
+            return self._executor.submit(call)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def execute(self, payload: dict, timeout: float) -> dict:
+        """
+        Send payload to the best endpoint, hedging to a second one if it is
+        slow and failing over to a second one if it fails
+
+        Returns:
+            The parsed response of the first successful attempt (or of the
+            last failed one if none succeeded)
+
+        Raises:
+            NoEndpointAvailable: All circuits are open
+            requests.exceptions.RequestException: No endpoint answered
+        """
+        primary = self.choose()
+        if primary is None:
+            raise NoEndpointAvailable("All executor endpoints are out of rotation")
+        started = time.monotonic()
+
+        delay = self.hedge_delay() if len(self.endpoints) > 1 else None
+        first = self._submit(primary, payload, timeout) if delay is not None and delay < timeout else None
+        if first is None:
+            # No hedging yet, or every hedge thread is busy: call on this thread
+            return self._call_with_failover(primary, payload, timeout, started).unwrap()
+
+        pending = {first}
+        done, pending = wait(pending, timeout=delay)
+        second = None
+        if not done:
+            second = self.choose(exclude=primary)
+            if second is not None:
+                hedge = self._submit(second, payload, timeout - delay)
+                if hedge is None:
+                    HEDGED_REQUESTS.labels("skipped").inc()
+                    second = None
+                else:
+                    HEDGED_REQUESTS.labels("sent").inc()
+                    pending.add(hedge)
+        hedged = second is not None
+
+        last = None
+        while True:
+            for future in done:
+                attempt = future.result()
+                if attempt.ok:
+                    if hedged and attempt.endpoint is second:
+                        HEDGED_REQUESTS.labels("won").inc()
+                    return attempt.result
+                last = attempt
+            if not pending:
+                if second is None:
+                    # Fail over once, on this thread since nothing else is running
+                    backup = self.choose(exclude=primary)
+                    remaining = timeout - (time.monotonic() - started)
+                    if backup is not None and remaining > 0:
+                        last = self._timed_call(backup, payload, remaining)
+                return last.unwrap()
+            remaining = timeout - (time.monotonic() - started)
+            done, pending = wait(pending, timeout=max(remaining, 0), return_when=FIRST_COMPLETED)
+            if not done:
+                raise requests.exceptions.Timeout(f"No executor answered within {timeout:.1f}s")
@@ -0,0 +1,95 @@
+"""
+Per-team rate limits for the code execution endpoints
+Each team (or client address, for requests without a team_id) has one token
+bucket for runs and one for submissions, kept in the shared state store so
+the limit holds across worker processes. A check is a single keyed row
+update, and a bucket is forgotten once it has refilled, so storage only
+grows with the number of teams currently being throttled.
+
+/run costs one token, /run-batch one per test case and /submit one
+submission token. The run defaults let a team run a 50-case batch every 10
+seconds, with four back to back; load tests need one team id per simulated
+user (benchmark.py --users) or higher limits.
+"""
+
+import os
+from dataclasses import dataclass
+
+import metrics
+from shared_state import store
+
+@dataclass(frozen=True)
+class Limit:
+    """Token bucket size and refill rate (tokens per second)"""
+    capacity: float
+    refill_per_second: float
+
+def _limit(name: str, burst: str, per_second: str) -> Limit:
+    """Limit from <name>_RATE_LIMIT_BURST / _PER_SECOND, rejecting values the bucket cannot work with"""
+    limit = Limit(
+        capacity=float(os.getenv(f"{name}_RATE_LIMIT_BURST", burst)),
+        refill_per_second=float(os.getenv(f"{name}_RATE_LIMIT_PER_SECOND", per_second))
+    )
+    if limit.capacity <= 0 or limit.refill_per_second <= 0:
+        raise ValueError(f"{name}_RATE_LIMIT_BURST and {name}_RATE_LIMIT_PER_SECOND must be positive")
+    return limit
+
+# Runs: bursts of 200 test cases, then five per second on average
+RUN_LIMIT = _limit("RUN", "200", "5")
+# Submissions: bursts of 5, then one every 10 seconds
+SUBMIT_LIMIT = _limit("SUBMIT", "5", "0.1")
+
+LIMITS = {"run": RUN_LIMIT, "submit": SUBMIT_LIMIT}
+
+RATE_LIMITED = metrics.Counter(
+    "rate_limited_requests_total", "Requests rejected with 429 by the per-team rate limit", ("bucket",)
+)
+
+@dataclass
+class RateLimitResult:
+    allowed: bool
+    limit: float
+    remaining: float
+    retry_after: float
+
+    def headers(self) -> dict:
+        """X-RateLimit-* headers (plus Retry-After when rejected)"""
+        headers = {
+            "X-RateLimit-Limit": str(int(self.limit)),
+            "X-RateLimit-Remaining": str(int(self.remaining))
+        }
+        if not self.allowed:
+            headers["Retry-After"] = str(max(int(self.retry_after + 0.999), 1))
+        return headers
+
+def client_key(team_id, client_host) -> str:
+    """Bucket owner: the team if known, otherwise the client address"""
+    if team_id is not None:
+        return f"team:{team_id}"
+    return f"ip:{client_host or 'unknown'}"
+
+def check(bucket: str, key: str, cost: float = 1) -> RateLimitResult:
+    """
+    Take `cost` tokens from the key's bucket
+
+    Args:
+        bucket: "run" or "submit"
+        key: Value from client_key()
+        cost: Tokens this request uses (number of test cases for a batch)
+
+    Returns:
+        RateLimitResult; fails open (allowed) if the state store is unavailable
+    """
+    limit = LIMITS[bucket]
+    # A batch larger than the bucket could never run; charge it a full bucket instead
+    cost = min(cost, limit.capacity)
+    try:
+        allowed, remaining, retry_after = store.take_tokens(
+            f"ratelimit:{bucket}:{key}", limit.capacity, limit.refill_per_second, cost
+        )
+    except Exception as e:
+        print(f"Rate limit check failed: {e}")
+        return RateLimitResult(True, limit.capacity, limit.capacity, 0.0)
+    if not allowed:
+        RATE_LIMITED.labels(bucket).inc()
+    return RateLimitResult(allowed, limit.capacity, remaining, retry_after)
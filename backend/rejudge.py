@@ -0,0 +1,317 @@
+"""
+Rejudge stored submissions against the current test cases
+Use this after fixing a test case mid-contest. It re-runs every stored
+Submission.code_file_blob (for one problem or the whole contest) through the
+same judging path as /submit and updates the verdicts in bulk.
+
+- A few submissions run at a time, each with fewer test workers than /submit
+  uses. When started from /admin/rejudge, no new work starts while the
+  worker's admission controller reports overload, so live traffic keeps
+  priority.
+- Finished verdicts are checkpointed in the shared state store. A rerun
+  after a crash or restart skips what is already done (use --restart to
+  start over).
+- Progress is published in the store, so GET /admin/rejudge on any worker
+  can report it.
+- A verdict is written only if the submission is still the one that was
+  judged (same submitted_at). Submissions replaced by a resubmit during
+  the rejudge keep their new verdict and count as skipped_resubmitted.
+
+Each submission is run in the language it was submitted in. Submissions
+made before the language was recorded are not guessed at: they are left
+unchanged and counted as skipped_no_language.
+
+Usage:
+    python rejudge.py --problem-id 3
+    python rejudge.py --parallelism 8
+    python rejudge.py --restart
+"""
+
+import os
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from dotenv import load_dotenv
+from sqlalchemy import update
+
+load_dotenv()
+
+import models
+import catalog
+import database
+import admission
+import deadlines
+import judge
+import piston
+from shared_state import store
+
+# Submissions judged at the same time
+REJUDGE_PARALLELISM = int(os.getenv("REJUDGE_PARALLELISM", "4"))
+# Test cases of one submission run at the same time (live /submit uses up to 20)
+REJUDGE_TEST_WORKERS = int(os.getenv("REJUDGE_TEST_WORKERS", "5"))
+# Verdicts written to the database per transaction
+FLUSH_EVERY = 50
+# Pause before checking again while live traffic has the executor overloaded
+OVERLOAD_BACKOFF = 1.0
+# A job whose progress has not been updated for this long is considered dead
+STALE_AFTER = 120
+
+PROGRESS_KEY = "rejudge:progress"
+
+def _checkpoint_key(problem_id) -> str:
+    return f"rejudge:checkpoint:{problem_id if problem_id is not None else 'all'}"
+
+def current_progress():
+    """Progress of the latest rejudge job, or None if there has been none"""
+    return store.get(PROGRESS_KEY)
+
+def is_running() -> bool:
+    progress = current_progress()
+    return bool(progress and progress["state"] == "running"
+                and time.time() - progress["updated_at"] < STALE_AFTER)
+
+def _load_work(db, problem_id):
+    """Submissions to rejudge with their language, plus test cases per problem"""
+    query = db.query(
+        models.Submission.team_id,
+        models.Submission.problem_id,
+        models.Submission.code_file_blob,
+        models.Submission.language,
+        models.Submission.submitted_at,
+        models.Submission.status
+    )
+    if problem_id is not None:
+        query = query.filter(models.Submission.problem_id == problem_id)
+    submissions = query.order_by(models.Submission.problem_id, models.Submission.team_id).all()
+
+    test_query = db.query(models.TestCase)
+    if problem_id is not None:
+        test_query = test_query.filter(models.TestCase.problem_id == problem_id)
+    test_cases = {}
+    for tc in test_query.order_by(models.TestCase.test_case_id).all():
+        db.expunge(tc)  # read from worker threads after the session is gone
+        test_cases.setdefault(tc.problem_id, []).append(tc)
+    return submissions, test_cases
+
+def _flush(updates) -> list:
+    """
+    Write a batch of new verdicts in one transaction
+
+    Each verdict is written only if the submission was not replaced since it
+    was loaded (same submitted_at), so a resubmit during the rejudge keeps
+    its own verdict.
+
+    Returns:
+        The updates that were written
+    """
+    if not updates:
+        return []
+    written = []
+    db = database.SessionLocal()
+    try:
+        for item in updates:
+            result = db.execute(
+                update(models.Submission)
+                .where(models.Submission.team_id == item["team_id"],
+                       models.Submission.problem_id == item["problem_id"],
+                       models.Submission.submitted_at == item["submitted_at"])
+                .values(status=item["status"])
+            )
+            if result.rowcount:
+                written.append(item)
+        db.commit()
+    finally:
+        db.close()
+    return written
+
+def rejudge(problem_id=None, parallelism: int = REJUDGE_PARALLELISM, restart: bool = False,
+            on_progress=None) -> dict:
+    """
+    Rejudge all stored submissions of a problem (or of every problem)
+
+    Args:
+        problem_id: Problem to rejudge; None for the whole contest
+        parallelism: Submissions judged at the same time
+        restart: Ignore the checkpoint of a previous run
+        on_progress: Called with the progress dict after each submission
+
+    Returns:
+        Final progress dict (total, done, changed, failed, elapsed_seconds, ...)
+    """
+    checkpoint_key = _checkpoint_key(problem_id)
+    if restart:
+        store.delete(checkpoint_key)
+    finished = store.get(checkpoint_key, {})  # "team_id:problem_id" -> status
+
+    db = database.SessionLocal()
+    try:
+        submissions, test_cases = _load_work(db, problem_id)
+        prepared = catalog.get_catalog(db)["expected"]
+    finally:
+        db.close()
+
+    started = time.time()
+    progress = {
+        "state": "running",
+        "problem_id": problem_id,
+        "total": len(submissions),
+        "done": 0,
+        "skipped": 0,
+        "skipped_resubmitted": 0,
+        "skipped_no_language": 0,
+        "changed": 0,
+        "failed": 0,
+        "started_at": started,
+        "updated_at": started,
+        "elapsed_seconds": 0.0,
+        "eta_seconds": None
+    }
+    lock = threading.Lock()
+    pending_updates = []
+
+    def publish():
+        progress["updated_at"] = time.time()
+        progress["elapsed_seconds"] = round(progress["updated_at"] - started, 1)
+        judged = progress["done"] - progress["skipped"]
+        remaining = progress["total"] - progress["done"]
+        if judged:
+            progress["eta_seconds"] = round(progress["elapsed_seconds"] / judged * remaining, 1)
+        store.set(PROGRESS_KEY, progress)
+        if on_progress is not None:
+            on_progress(dict(progress))
+
+    def flush_pending():
+        written = _flush(pending_updates)
+        progress["changed"] += sum(item["status"] != item["old_status"] for item in written)
+        progress["skipped_resubmitted"] += len(pending_updates) - len(written)
+        pending_updates.clear()
+
+    def judge_one(submission):
+        cases = test_cases.get(submission.problem_id, [])
+        deadline = deadlines.Deadline(deadlines.SUBMIT_DEADLINE)
+        return judge.judge_submission(
+            cases, submission.language, submission.code_file_blob or "", submission.team_id, submission.problem_id,
+            deadline, max_workers=REJUDGE_TEST_WORKERS, pool="rejudge", endpoint="/admin/rejudge",
+            prepared=prepared
+        )
+
+    def record(submission, status, error=None):
+        key = f"{submission.team_id}:{submission.problem_id}"
+        with lock:
+            progress["done"] += 1
+            if error is not None:
+                progress["failed"] += 1
+                print(f"Rejudge of team {submission.team_id}, problem {submission.problem_id} failed: {error}")
+            else:
+                finished[key] = status
+                pending_updates.append({
+                    "team_id": submission.team_id,
+                    "problem_id": submission.problem_id,
+                    "submitted_at": submission.submitted_at,
+                    "status": status,
+                    "old_status": submission.status
+                })
+                if len(pending_updates) >= FLUSH_EVERY:
+                    flush_pending()
+                    store.set(checkpoint_key, finished)
+            publish()
+
+    publish()
+    todo = []
+    for submission in submissions:
+        if f"{submission.team_id}:{submission.problem_id}" in finished:
+            progress["done"] += 1
+            progress["skipped"] += 1
+        elif not submission.language:
+            progress["done"] += 1
+            progress["skipped"] += 1
+            progress["skipped_no_language"] += 1
+            print(f"Skipping team {submission.team_id}, problem {submission.problem_id}: no recorded language")
+        else:
+            todo.append(submission)
+    publish()
+
+    executor = ThreadPoolExecutor(max_workers=max(parallelism, 1), thread_name_prefix="rejudge")
+    running = {}
+    try:
+        for submission in todo:
+            # Wait for a free slot, and for live traffic to calm down
+            while len(running) >= parallelism or admission.controller.overloaded():
+                if running:
+                    done, _ = wait(list(running), timeout=OVERLOAD_BACKOFF, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        finished_submission = running.pop(future)
+                        error = future.exception()
+                        record(finished_submission, None if error else future.result(), error)
+                else:
+                    time.sleep(OVERLOAD_BACKOFF)
+            running[executor.submit(judge_one, submission)] = submission
+
+        for future in list(running):
+            error = future.exception()
+            record(running.pop(future), None if error else future.result(), error)
+    finally:
+        executor.shutdown(wait=True)
+        with lock:
+            flush_pending()
+            store.set(checkpoint_key, finished)
+            progress["state"] = "finished"
+            publish()
+
+    # A complete run needs no checkpoint; the next rejudge starts fresh
+    if progress["failed"] == 0:
+        store.delete(checkpoint_key)
+    return progress
+
+def start_in_background(problem_id=None, parallelism: int = REJUDGE_PARALLELISM, restart: bool = False) -> bool:
+    """Run rejudge() in a daemon thread; returns False if a job is already running"""
+    if is_running():
+        return False
+    # Claim the job before the thread starts so a second request sees it
+    store.set(PROGRESS_KEY, {"state": "running", "problem_id": problem_id, "total": None, "done": 0,
+                             "updated_at": time.time()})
+
+    def run():
+        try:
+            rejudge(problem_id=problem_id, parallelism=parallelism, restart=restart)
+        except Exception as e:
+            print(f"Rejudge failed: {e}")
+            store.set(PROGRESS_KEY, {"state": "failed", "problem_id": problem_id, "error": str(e),
+                                     "updated_at": time.time()})
+
+    threading.Thread(target=run, name="rejudge", daemon=True).start()
+    return True
+
+def main():
+    parser = argparse.ArgumentParser(description="Rejudge stored submissions against the current test cases")
+    parser.add_argument("--problem-id", type=int, default=None, help="Only this problem (default: all)")
+    parser.add_argument("--parallelism", type=int, default=REJUDGE_PARALLELISM, help="Submissions judged at once")
+    parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint of an interrupted run")
+    args = parser.parse_args()
+
+    if is_running():
+        print("❌ A rejudge job is already running")
+        return
+
+    # The server keeps runtime pins current in the background; from the command line fetch them once
+    piston.runtime_registry.refresh()
+
+    def show(progress):
+        eta = f", ETA {progress['eta_seconds']:.0f}s" if progress.get("eta_seconds") is not None else ""
+        print(f"\r⚖️  {progress['done']}/{progress['total']} judged, {progress['changed']} changed, "
+              f"{progress['failed']} failed ({progress['elapsed_seconds']:.0f}s{eta})", end="", flush=True)
+
+    progress = rejudge(problem_id=args.problem_id, parallelism=args.parallelism, restart=args.restart,
+                       on_progress=show)
+    print(f"\n✅ Rejudged {progress['done'] - progress['skipped']} submission(s) "
+          f"({progress['skipped']} skipped), {progress['changed']} verdict(s) changed")
+    if progress["skipped_no_language"]:
+        print(f"⚠️  {progress['skipped_no_language']} submission(s) have no recorded language and were left unchanged")
+    if progress["skipped_resubmitted"]:
+        print(f"ℹ️  {progress['skipped_resubmitted']} submission(s) were resubmitted during the rejudge "
+              "and kept their new verdict")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+"""
+Replay a captured contest trace against a backend
+Re-drives the requests recorded by capture.py with their original arrival
+times (or faster with --speed), open loop like benchmark.py, and reports
+latency percentiles per route next to the latencies seen when the trace was
+captured. Results are saved in benchmark.py's format, so two replays can be
+compared with `python benchmark.py compare`.
+
+Captured code and inputs are not in the trace, so each execution request is
+rebuilt from its shape: an echo program in the same language padded to the
+same size, stdin and test cases of the same sizes. Each request carries a
+nonce in the code's padding and in every input, so requests of the same
+shape still differ and reach the executor instead of being answered by the
+execution result cache or joined to an identical request in flight (a
+replay would otherwise overstate capacity). Inputs shorter than their
+nonce line come out slightly larger than captured. Every anonymized team
+gets its own team id, so per-team rate limits apply as in the contest.
+/submit needs a real team and goes out as the --team-name team, whose
+submission status it overwrites (use a dedicated team), and several teams'
+submits then share that team's rate limit.
+
+Usage:
+    python replay.py logs/capture.1234.jsonl logs/capture.1235.jsonl
+    python replay.py logs/capture.*.jsonl --speed 4 --output replay.json
+    python replay.py trace.jsonl --start 600 --duration 300  # a 5 minute window
+"""
+
+import argparse
+import itertools
+import json
+import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import requests
+
+from benchmark import BASE_URL, ScenarioContext, summarize, summarize_by_route, print_report
+from capture import read_trace
+
+# Team ids for replayed /run and /run-batch traffic, one per anonymized team
+REPLAY_TEAM_ID_BASE = 1_000_000
+
+# Programs that copy stdin to stdout, so replayed test cases pass
+ECHO_PROGRAMS = {
+    "python": ("import sys\nsys.stdout.write(sys.stdin.read())\n", "#"),
+    "javascript": ("process.stdout.write(require('fs').readFileSync(0, 'utf8'));\n", "//"),
+    "java": ("import java.io.*;\npublic class Main {\n    public static void main(String[] args) throws IOException {\n"
+             "        System.out.write(System.in.readAllBytes());\n        System.out.flush();\n    }\n}\n", "//"),
+    "cpp": ("#include <iostream>\nint main() {\n    std::cout << std::cin.rdbuf();\n    return 0;\n}\n", "//"),
+    "c": ("#include <stdio.h>\nint main(void) {\n    int c;\n    while ((c = getchar()) != EOF) putchar(c);\n"
+          "    return 0;\n}\n", "//"),
+    "csharp": ("using System;\nclass Program {\n    static void Main() {\n"
+               "        Console.Out.Write(Console.In.ReadToEnd());\n    }\n}\n", "//"),
+}
+
+def echo_program(language: str, size: int, nonce: str = "") -> str:
+    """Echo program in the language with a nonce comment, padded with comment lines to about size characters"""
+    program, comment = ECHO_PROGRAMS.get(language, ECHO_PROGRAMS["python"])
+    program += f"{comment} replay {nonce}\n"
+    line = f"{comment} padding to the captured code size\n"
+    missing = max(size - len(program), 0)
+    return program + (line * (missing // len(line) + 1))[:missing]
+
+def text_of_size(size: int, nonce: str = "") -> str:
+    """Multi-line numeric text of the given size, like typical test input, starting with the nonce"""
+    head = f"{nonce}\n" if nonce else ""
+    line = "1 2 3 4 5 6 7 8 9 10\n"
+    missing = max(size - len(head), 0)
+    return head + (line * (missing // len(line) + 1))[:missing]
+
+class ReplayClient:
+    """Builds and sends the request for one trace record"""
+
+    def __init__(self, ctx: ScenarioContext):
+        self.ctx = ctx
+        self._team_ids = {}
+        self._lock = threading.Lock()
+        # Unique per replay and per record, so no two requests are identical
+        self._run_token = secrets.token_hex(4)
+        self._counter = itertools.count()
+
+    def team_id(self, anonymized) -> int:
+        if anonymized is None:
+            return self.ctx.team_id
+        with self._lock:
+            return self._team_ids.setdefault(anonymized, REPLAY_TEAM_ID_BASE + len(self._team_ids))
+
+    def nonce(self) -> str:
+        return f"{self._run_token}-{next(self._counter)}"
+
+    def send(self, record: dict):
+        ctx = self.ctx
+        path = record["path"]
+        url = f"{ctx.base_url}{path}"
+        params = dict(record.get("query") or {})
+        shape = record.get("shape") or {}
+        language = shape.get("language") or "python"
+
+        if path == "/login":
+            return ctx.session.post(url, json={"team_name": ctx.team_name, "password": ctx.password},
+                                    timeout=ctx.timeout)
+        if record["method"] == "GET":
+            if "team" in record:
+                params["team_id"] = ctx.team_id
+            return ctx.session.get(url, params=params, timeout=ctx.timeout)
+
+        nonce = self.nonce()
+        body = {"language": language, "code": echo_program(language, shape.get("code_len", 0), nonce)}
+        if path == "/run":
+            body["stdin"] = text_of_size(shape.get("stdin_len", 0), nonce)
+            body["team_id"] = self.team_id(record.get("team"))
+        elif path == "/run-batch":
+            cases = [text_of_size(input_len, f"{nonce}.{i}")
+                     for i, (input_len, _) in enumerate(shape.get("cases") or [])]
+            body["test_cases"] = [{"input": case, "expected_output": case} for case in cases]
+            body["team_id"] = self.team_id(record.get("team"))
+            body["compact"] = shape.get("compact", False)
+            if "problem_id" in shape:
+                body["problem_id"] = shape["problem_id"]
+        elif path == "/submit":
+            body["team_id"] = ctx.team_id
+            body["problem_id"] = shape.get("problem_id") or ctx.problems[0]["id"]
+        return ctx.session.post(url, json=body, timeout=ctx.timeout)
+
+def select_window(records: list, start: float, duration: float) -> list:
+    """Records arriving between start and start + duration seconds into the trace"""
+    if not records:
+        return records
+    first = records[0]["ts"]
+    end = start + duration if duration else float("inf")
+    return [record for record in records if start <= record["ts"] - first < end]
+
+def captured_samples(records: list) -> list:
+    """The trace's own latencies as benchmark samples"""
+    return [{"route": record["path"], "latency": record["ms"] / 1000, "ok": record["status"] < 400}
+            for record in records]
+
+def replay(client: ReplayClient, records: list, speed: float, max_concurrency: int):
+    """
+    Send every record at its captured arrival time divided by speed
+
+    Latency is measured from the scheduled send time, as in benchmark.py.
+    """
+    samples = []
+    samples_lock = threading.Lock()
+
+    def execute(record, scheduled_at):
+        try:
+            response = client.send(record)
+            ok = response.status_code < 400
+            status_code = response.status_code
+            error = None if ok else f"HTTP {status_code}"
+        except requests.exceptions.Timeout:
+            ok, status_code, error = False, None, "Timeout"
+        except Exception as e:
+            ok, status_code, error = False, None, str(e)
+        sample = {
+            "route": record["path"],
+            "latency": time.perf_counter() - scheduled_at,
+            "ok": ok,
+            "status_code": status_code,
+            "error": error,
+        }
+        with samples_lock:
+            samples.append(sample)
+
+    first = records[0]["ts"]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        for record in records:
+            scheduled_at = start + (record["ts"] - first) / speed
+            delay = scheduled_at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            executor.submit(execute, record, scheduled_at)
+    elapsed = time.perf_counter() - start
+    return samples, elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a captured contest trace against a backend")
+    parser.add_argument("traces", nargs="+", help="Trace files written by capture.py (one per worker)")
+    parser.add_argument("--base-url", default=BASE_URL)
+    parser.add_argument("--speed", type=float, default=1.0, help="Time compression, e.g. 4 replays 4x faster")
+    parser.add_argument("--start", type=float, default=0.0, help="Seconds into the trace to start at")
+    parser.add_argument("--duration", type=float, default=0.0, help="Seconds of trace to replay (0: all)")
+    parser.add_argument("--max-concurrency", type=int, default=256, help="Maximum requests in flight")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Per-request timeout in seconds")
+    parser.add_argument("--team-name", default="Default Team")
+    parser.add_argument("--password", default="password")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    records = select_window(read_trace(args.traces), args.start, args.duration)
+    if not records:
+        print("❌ No requests in the selected part of the trace")
+        return
+    span = records[-1]["ts"] - records[0]["ts"]
+
+    print("="*80)
+    print("🔁 TRACE REPLAY")
+    print("="*80)
+    print(f"Target: {args.base_url}")
+    print(f"Trace: {len(records)} requests over {span:.0f}s, replayed at {args.speed:g}x "
+          f"(~{span / args.speed:.0f}s)")
+    print(f"Started at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print("="*80)
+
+    ctx = ScenarioContext(args.base_url, args.team_name, args.password, args.timeout)
+    ctx.setup()
+    started_at = datetime.now().isoformat()
+    samples, elapsed = replay(ReplayClient(ctx), records, args.speed, args.max_concurrency)
+
+    print("\n📼 As captured:")
+    captured = captured_samples(records)
+    print_report(summarize_by_route(captured, span or 1.0), summarize(captured, span or 1.0))
+
+    routes = summarize_by_route(samples, elapsed)
+    overall = summarize(samples, elapsed)
+    print("\n🔁 Replayed:")
+    print_report(routes, overall)
+
+    failures = {}
+    for sample in samples:
+        if not sample["ok"]:
+            failures[sample["error"]] = failures.get(sample["error"], 0) + 1
+    if failures:
+        print("\n❌ Failure Analysis:")
+        for error, count in sorted(failures.items(), key=lambda item: -item[1]):
+            print(f"   {error}: {count}")
+
+    if args.output:
+        results = {
+            "meta": {
+                "started_at": started_at,
+                "base_url": args.base_url,
+                "traces": args.traces,
+                "speed": args.speed,
+                "start": args.start,
+                "duration": args.duration,
+                "requests": len(records),
+                "elapsed": round(elapsed, 3),
+            },
+            "routes": routes,
+            "overall": overall,
+        }
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
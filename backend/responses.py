@@ -0,0 +1,131 @@
+"""
+Response encoding for the API
+FastJSONResponse renders JSON with orjson (several times faster than the
+standard library encoder on large payloads), and CompressionMiddleware
+compresses responses above a size threshold with brotli or gzip,
+whichever the client prefers.
+
+Browsers do not talk to this server directly. The Next.js API routes fetch
+from it (Node's fetch decompresses on the way in) and compress again for the
+browser with the same settings (src/lib/compress.js), so this middleware
+only shrinks the internal hop and responses to direct API clients.
+"""
+
+import os
+import gzip
+
+import brotli
+import orjson
+from fastapi.responses import JSONResponse
+
+import tracing
+
+# Responses smaller than this are sent uncompressed
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+# Fast settings: most of the size win for a fraction of the CPU of max levels
+BROTLI_QUALITY = 4
+GZIP_LEVEL = 5
+
+_COMPRESSIBLE_TYPES = (b"application/json", b"text/")
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson; rendering time is recorded as a "serialize" span"""
+
+    def render(self, content) -> bytes:
+        with tracing.span("serialize"):
+            return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+def choose_encoding(accept_encoding: str):
+    """Pick "br" or "gzip" from an Accept-Encoding header (None if neither is acceptable)"""
+    accepted = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip()] = quality
+    best = None
+    for encoding in ("br", "gzip"):
+        quality = accepted.get(encoding, accepted.get("*", 0.0))
+        if quality > 0 and (best is None or quality > best[1]):
+            best = (encoding, quality)
+    return best[0] if best else None
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing complete (non-streaming) responses
+
+    Streaming responses such as the SSE log tail pass through untouched so
+    events are not held back waiting for a compressor to flush.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = ""
+        for name, value in scope.get("headers", []):
+            if name == b"accept-encoding":
+                accept_encoding = value.decode("latin-1")
+                break
+        encoding = choose_encoding(accept_encoding) if accept_encoding else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            headers = list(start_message.get("headers", []))
+            content_type = b""
+            already_encoded = False
+            for name, value in headers:
+                if name == b"content-type":
+                    content_type = value
+                elif name == b"content-encoding":
+                    already_encoded = True
+
+            if (message.get("more_body", False) or already_encoded or len(body) < self.minimum_size
+                    or not content_type.startswith(_COMPRESSIBLE_TYPES)):
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            with tracing.span("compress"):
+                body = compress(body, encoding)
+            headers = [(name, value) for name, value in headers if name != b"content-length"]
+            headers.append((b"content-encoding", encoding.encode("latin-1")))
+            headers.append((b"content-length", str(len(body)).encode("latin-1")))
+            headers.append((b"vary", b"Accept-Encoding"))
+            await send({**start_message, "headers": headers})
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_wrapper)
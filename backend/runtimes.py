@@ -0,0 +1,174 @@
+"""
+Runtime discovery and version pinning for executor calls
+Piston resolves "version": "*" to its newest runtime on every call, so an
+upgrade mid-contest would silently change how submissions run. Instead the
+runtime list is fetched from /runtimes at startup and refreshed every
+RUNTIME_REFRESH_INTERVAL seconds, and each language is pinned to an exact
+version:
+
+- PISTON_PINNED_VERSIONS (e.g. "python=3.10.0,java=15.0.2") wins when set.
+- Otherwise the version first chosen in this contest is kept while the
+  executor still offers it. The choice is saved in the shared state store so
+  all workers agree; a newer runtime is only picked up once the pinned one
+  disappears.
+
+Languages the executor does not offer are rejected before any network call.
+Only the background refresher fetches the list; requests never wait for it.
+Until it has been fetched once, a language uses its configured pin, else the
+pin saved by another worker or an earlier run, else "*".
+"""
+
+import os
+import time
+import threading
+
+import requests
+
+from shared_state import store
+
+# Seconds between runtime list refreshes
+RUNTIME_REFRESH_INTERVAL = float(os.getenv("RUNTIME_REFRESH_INTERVAL", "600"))
+# Seconds before retrying after a failed fetch
+RUNTIME_RETRY_INTERVAL = 30.0
+# HTTP timeout (seconds) for the runtime list
+RUNTIME_FETCH_TIMEOUT = 5.0
+
+_PINS_KEY = "runtimes:pinned"
+
+class UnsupportedLanguage(ValueError):
+    """The executor offers no runtime for the requested language"""
+
+def parse_pins(spec: str) -> dict:
+    """"python=3.10.0,java=15.0.2" -> {"python": "3.10.0", "java": "15.0.2"}"""
+    pins = {}
+    for item in spec.split(","):
+        language, _, version = item.partition("=")
+        if language.strip() and version.strip():
+            pins[language.strip()] = version.strip()
+    return pins
+
+def _version_key(version: str):
+    return tuple(int(part) if part.isdigit() else 0 for part in version.split("."))
+
+def runtimes_url(execute_url: str) -> str:
+    """The /runtimes URL next to a Piston /execute URL"""
+    base = execute_url.rstrip("/")
+    if base.endswith("/execute"):
+        base = base[:-len("/execute")]
+    return f"{base}/runtimes"
+
+class RuntimeRegistry:
+    """Requested language name -> exact runtime version, refreshed in the background"""
+
+    def __init__(self, execute_urls, pinned: dict = None):
+        self.urls = [runtimes_url(url) for url in execute_urls]
+        self.configured_pins = dict(pinned or {})
+        self._versions = None  # language or alias -> pinned version; None until fetched
+        self._next_attempt = 0.0
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def _fetch(self) -> list:
+        last_error = None
+        for url in self.urls:
+            try:
+                response = requests.get(url, timeout=RUNTIME_FETCH_TIMEOUT)
+                response.raise_for_status()
+                return response.json()
+            except Exception as e:
+                last_error = e
+        raise last_error
+
+    def refresh(self) -> bool:
+        """Fetch the runtime list and re-pin versions; returns False if the executor could not be reached"""
+        try:
+            runtimes = self._fetch()
+        except Exception as e:
+            print(f"Runtime list fetch failed: {e}")
+            with self._lock:
+                self._next_attempt = time.monotonic() + RUNTIME_RETRY_INTERVAL
+            return False
+
+        available = {}  # canonical language -> versions
+        aliases = {}  # language or alias -> canonical language
+        for runtime in runtimes:
+            language = runtime["language"]
+            available.setdefault(language, set()).add(runtime["version"])
+            for name in [language, *runtime.get("aliases", [])]:
+                aliases.setdefault(name, language)
+
+        try:
+            saved = store.get(_PINS_KEY, {})
+        except Exception as e:
+            print(f"Runtime pin lookup failed: {e}")
+            saved = {}
+        pins = {}
+        for language, versions in available.items():
+            wanted = self.configured_pins.get(language) or saved.get(language)
+            if wanted in versions:
+                pins[language] = wanted
+            else:
+                pins[language] = max(versions, key=_version_key)
+                if wanted:
+                    print(f"⚠️  Runtime {language} {wanted} is no longer offered; using {pins[language]}")
+        if pins != saved:
+            try:
+                store.set(_PINS_KEY, pins)
+            except Exception as e:
+                print(f"Runtime pin store failed: {e}")
+
+        versions = {name: pins[language] for name, language in aliases.items()}
+        # Pins given for an alias (e.g. "cpp=10.2.0") apply when that version exists
+        for name, version in self.configured_pins.items():
+            if name in aliases and version in available[aliases[name]]:
+                versions[name] = version
+        with self._lock:
+            self._versions = versions
+            self._next_attempt = time.monotonic() + RUNTIME_REFRESH_INTERVAL
+        return True
+
+    def resolve(self, language: str) -> str:
+        """
+        Exact runtime version to request for a language
+
+        Raises:
+            UnsupportedLanguage: The executor offers no such language
+        """
+        with self._lock:
+            versions = self._versions
+        if versions is None:
+            return self._fallback(language)
+        version = versions.get(language)
+        if version is None:
+            raise UnsupportedLanguage(f"Language '{language}' is not supported")
+        return version
+
+    def _fallback(self, language: str) -> str:
+        """Version to use before the runtime list has been fetched (no network call)"""
+        if language in self.configured_pins:
+            return self.configured_pins[language]
+        try:
+            return store.get(_PINS_KEY, {}).get(language, "*")
+        except Exception as e:
+            print(f"Runtime pin lookup failed: {e}")
+            return "*"
+
+    def snapshot(self) -> dict:
+        """Current language -> version pins (empty until the list has been fetched)"""
+        with self._lock:
+            return dict(self._versions or {})
+
+    def start(self):
+        """Fetch the runtime list now and refresh it every RUNTIME_REFRESH_INTERVAL seconds"""
+        if self._thread is not None:
+            return
+
+        def loop():
+            while True:
+                self.refresh()
+                with self._lock:
+                    wait = max(self._next_attempt - time.monotonic(), 1.0)
+                time.sleep(wait)
+
+        self._thread = threading.Thread(target=loop, name="runtime-refresh", daemon=True)
+        self._thread.start()
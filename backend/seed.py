@@ -1,10 +1,12 @@
 
-from database import SessionLocal, engine
+from database import SessionLocal, engine, upgrade_schema
 from models import Base, Team, Problem, TestCase, CodeDraft
 import bcrypt
+import catalog
 
 # Create all tables in the database
 Base.metadata.create_all(bind=engine)
+upgrade_schema()
 
 # Create a new session
 db = SessionLocal()
@@ -96,6 +98,8 @@ try:
             db.commit()
 
         print("Created all 6 problems with test cases.")
+        # Workers serving /bootstrap reload the new problems
+        catalog.invalidate()
         print("Database seeding completed successfully!")
     else:
         print("Database already contains data. Seeding skipped.")
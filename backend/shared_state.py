@@ -0,0 +1,153 @@
+"""
+State shared by all worker processes of the backend
+A small key-value store on a local SQLite file (WAL mode), so caches and
+limits stay global when the server runs with several workers instead of
+being multiplied per process.
+
+Values are stored as JSON with an optional expiry. Token buckets are
+updated inside one write transaction, so concurrent workers never
+double-spend a token.
+"""
+
+import os
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+STATE_DIR = Path(__file__).parent / "state"
+
+# Override with SHARED_STATE_PATH to put the store somewhere else (e.g. tmpfs)
+SHARED_STATE_PATH = Path(os.getenv("SHARED_STATE_PATH", str(STATE_DIR / "shared_state.db")))
+
+# Expired keys are deleted after roughly this many writes
+_PURGE_EVERY = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS kv (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    expires_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_kv_expires_at ON kv(expires_at);
+"""
+
+class SharedStore:
+    """Key-value store shared across processes; each thread uses its own connection"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._local = threading.local()
+        self._writes = 0
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def _after_write(self, conn):
+        self._writes += 1
+        if self._writes % _PURGE_EVERY == 0:
+            conn.execute("DELETE FROM kv WHERE expires_at IS NOT NULL AND expires_at < ?", (time.time(),))
+
+    def get(self, key: str, default=None):
+        """Value for key, or default if missing or expired"""
+        row = self._connection().execute(
+            "SELECT value, expires_at FROM kv WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or (row[1] is not None and row[1] < time.time()):
+            return default
+        return json.loads(row[0])
+
+    def set(self, key: str, value, ttl: float = None):
+        """Store a JSON-serializable value, expiring after ttl seconds if given"""
+        conn = self._connection()
+        expires_at = time.time() + ttl if ttl else None
+        conn.execute(
+            "INSERT INTO kv (key, value, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT (key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at",
+            (key, json.dumps(value), expires_at)
+        )
+        self._after_write(conn)
+
+    def setdefault(self, key: str, value, ttl: float = None):
+        """
+        Store value only if key is missing or expired, atomically across workers
+
+        Returns:
+            The value now stored at key (value, or whatever another worker stored first)
+        """
+        conn = self._connection()
+        now = time.time()
+        expires_at = now + ttl if ttl else None
+        conn.execute(
+            "INSERT INTO kv (key, value, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT (key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at "
+            "WHERE kv.expires_at IS NOT NULL AND kv.expires_at < ?",
+            (key, json.dumps(value), expires_at, now)
+        )
+        self._after_write(conn)
+        return self.get(key, value)
+
+    def delete(self, key: str):
+        self._connection().execute("DELETE FROM kv WHERE key = ?", (key,))
+
+    def incr(self, key: str, amount: int = 1) -> int:
+        """Atomically add to an integer value (missing counts as 0) and return the result"""
+        conn = self._connection()
+        row = conn.execute(
+            "INSERT INTO kv (key, value, expires_at) VALUES (?, ?, NULL) "
+            "ON CONFLICT (key) DO UPDATE SET value = CAST(value AS INTEGER) + ? RETURNING value",
+            (key, str(amount), amount)
+        ).fetchone()
+        return int(row[0])
+
+    def take_tokens(self, key: str, capacity: float, refill_per_second: float, cost: float = 1):
+        """
+        Token bucket: try to take `cost` tokens from the bucket at key
+
+        The bucket starts full, refills continuously up to capacity and is
+        forgotten once it would be full again, so idle buckets use no space.
+
+        Returns:
+            Tuple of (allowed, tokens remaining, seconds until `cost` tokens are available)
+        """
+        conn = self._connection()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT value FROM kv WHERE key = ?", (key,)).fetchone()
+            tokens, updated_at = json.loads(row[0]) if row else (capacity, now)
+            tokens = min(capacity, tokens + (now - updated_at) * refill_per_second)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            retry_after = 0.0 if allowed else (cost - tokens) / refill_per_second
+            # Drop the bucket once it has refilled completely
+            expires_at = now + (capacity - tokens) / refill_per_second
+            conn.execute(
+                "INSERT INTO kv (key, value, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at",
+                (key, json.dumps([tokens, now]), expires_at)
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        self._after_write(conn)
+        return allowed, tokens, retry_after
+
+    def clear(self, prefix: str = ""):
+        """Delete all keys starting with prefix (everything if empty)"""
+        self._connection().execute(
+            "DELETE FROM kv WHERE substr(key, 1, ?) = ?", (len(prefix), prefix)
+        )
+
+store = SharedStore(SHARED_STATE_PATH)
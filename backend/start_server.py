@@ -2,20 +2,40 @@
 """
 Script to start the FastAPI server
 Run this script to start the backend server
+
+    python start_server.py                        # single process on 127.0.0.1:8001
+    python start_server.py --workers 0            # one worker per CPU core
+    python start_server.py --workers 4 --host 0.0.0.0
+
+With several workers, the execution result cache and other shared state live
+in shared_state.py's SQLite store, so every worker sees the same entries.
+Metrics, slow-request lists and the profiler are per worker.
 """
+import argparse
+import os
+
 import uvicorn
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Start the FastAPI backend server")
+    parser.add_argument("--host", default=os.getenv("HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8001")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", "1")),
+                        help="Worker processes (0 = one per CPU core)")
+    args = parser.parse_args()
+    workers = args.workers if args.workers > 0 else (os.cpu_count() or 1)
+
     print("🚀 Starting FastAPI backend server...")
-    print("📍 Server will be available at: http://127.0.0.1:8001")
-    print("📖 API docs will be available at: http://127.0.0.1:8001/docs")
+    print(f"📍 Server will be available at: http://{args.host}:{args.port}")
+    print(f"📖 API docs will be available at: http://{args.host}:{args.port}/docs")
+    print(f"👷 Worker processes: {workers}")
     print("Press Ctrl+C to stop the server")
     print("-" * 50)
     print("⏳ Testing database connection...")
     uvicorn.run(
         "main:app",
-        host="127.0.0.1",
-        port=8001,
+        host=args.host,
+        port=args.port,
+        workers=workers,
         reload=False,  # Disable reload to avoid /docs issues
     )
-
@@ -0,0 +1,109 @@
+"""
+Starter code per language for each problem
+Problems are stored as buggy Python. For the other languages the editor
+offers a translation of the buggy function (name, parameters and the buggy
+return expression) wrapped in a program reading two integers from stdin,
+or a generic skeleton when the Python has no function to translate.
+
+Templates are generated once when the catalog loads (see catalog.py) and
+served by /problems/{id}/template, so switching languages in the editor is
+a cached fetch instead of parsing the Python in the browser.
+"""
+
+import re
+import hashlib
+
+LANGUAGES = ("python", "javascript", "java", "cpp", "c", "csharp")
+
+_FUNCTION = re.compile(r"def\s+(\w+)\s*\(([^)]*)\)\s*:", re.ASCII)
+_RETURN = re.compile(r"return\s+([^#\n]+)", re.ASCII)
+
+# Used when the Python has no function definition to translate
+FALLBACK_TEMPLATES = {
+    "javascript": (
+        "// Write your fix here\n\nfunction solution() {\n    // TODO: Implement your solution\n}\n\n"
+        "// Read input\nconst readline = require('readline');\nconst rl = readline.createInterface({\n"
+        "    input: process.stdin,\n    output: process.stdout\n});\n\nrl.on('line', (line) => {\n"
+        "    // Process input\n    console.log(solution());\n    rl.close();\n});"
+    ),
+    "java": (
+        "// Write your fix here\n\npublic class Main {\n    public static void main(String[] args) {\n"
+        "        // TODO: Implement your solution\n        java.util.Scanner scanner = new java.util.Scanner(System.in);\n"
+        "        // Read input and process\n    }\n}"
+    ),
+    "cpp": (
+        "// Write your fix here\n\n#include <iostream>\nusing namespace std;\n\nint main() {\n"
+        "    // TODO: Implement your solution\n    int a, b;\n    cin >> a >> b;\n    // Process and output\n"
+        "    return 0;\n}"
+    ),
+    "c": (
+        "// Write your fix here\n\n#include <stdio.h>\n\nint main() {\n    // TODO: Implement your solution\n"
+        "    int a, b;\n    scanf(\"%d %d\", &a, &b);\n    // Process and output\n    return 0;\n}"
+    ),
+    "csharp": (
+        "// Write your fix here\n\nusing System;\n\nclass Program {\n    static void Main() {\n"
+        "        // TODO: Implement your solution\n        string[] input = Console.ReadLine().Split();\n"
+        "        // Process and output\n    }\n}"
+    ),
+}
+
+def _translations(name: str, params: list, buggy_return: str) -> dict:
+    plain = ", ".join(params)
+    typed = ", ".join(f"int {p}" for p in params)
+    return {
+        "javascript": (
+            f"function {name}({plain}) {{\n    // This function has a bug\n    return {buggy_return}; // Bug: fix this\n}}\n\n"
+            "// Read input from stdin\nconst readline = require('readline');\nconst rl = readline.createInterface({\n"
+            "    input: process.stdin,\n    output: process.stdout\n});\n\nlet inputLines = [];\n"
+            "rl.on('line', (line) => {\n    inputLines.push(line);\n});\n\nrl.on('close', () => {\n"
+            f"    const [a, b] = inputLines[0].split(' ').map(Number);\n    console.log({name}(a, b));\n}});"
+        ),
+        "java": (
+            f"public class Main {{\n    public static int {name}({typed}) {{\n        // This function has a bug\n"
+            f"        return {buggy_return}; // Bug: fix this\n    }}\n    \n"
+            "    public static void main(String[] args) {\n        java.util.Scanner scanner = new java.util.Scanner(System.in);\n"
+            "        int a = scanner.nextInt();\n        int b = scanner.nextInt();\n"
+            f"        System.out.println({name}(a, b));\n    }}\n}}"
+        ),
+        "cpp": (
+            f"#include <iostream>\nusing namespace std;\n\nint {name}({typed}) {{\n    // This function has a bug\n"
+            f"    return {buggy_return}; // Bug: fix this\n}}\n\nint main() {{\n    int a, b;\n    cin >> a >> b;\n"
+            f"    cout << {name}(a, b) << endl;\n    return 0;\n}}"
+        ),
+        "c": (
+            f"#include <stdio.h>\n\nint {name}({typed}) {{\n    // This function has a bug\n"
+            f"    return {buggy_return}; // Bug: fix this\n}}\n\nint main() {{\n    int a, b;\n"
+            f"    scanf(\"%d %d\", &a, &b);\n    printf(\"%d\\n\", {name}(a, b));\n    return 0;\n}}"
+        ),
+        "csharp": (
+            f"using System;\n\nclass Program {{\n    static int {name}({typed}) {{\n        // This function has a bug\n"
+            f"        return {buggy_return}; // Bug: fix this\n    }}\n    \n    static void Main() {{\n"
+            "        string[] input = Console.ReadLine().Split();\n        int a = int.Parse(input[0]);\n"
+            f"        int b = int.Parse(input[1]);\n        Console.WriteLine({name}(a, b));\n    }}\n}}"
+        ),
+    }
+
+def generate(python_code: str) -> dict:
+    """
+    Starter code in every language for one problem
+
+    Args:
+        python_code: The problem's buggy Python file
+
+    Returns:
+        language -> code; Python is the original file unchanged
+    """
+    python_code = python_code or ""
+    function = _FUNCTION.search(python_code)
+    if function is None:
+        generated = dict(FALLBACK_TEMPLATES)
+    else:
+        params = [p.strip() for p in function.group(2).split(",")]
+        buggy_return = _RETURN.search(python_code)
+        generated = _translations(function.group(1), params, buggy_return.group(1).strip() if buggy_return else "")
+    generated["python"] = python_code
+    return generated
+
+def etag(code: str) -> str:
+    """Quoted ETag for a template's content"""
+    return f'"{hashlib.sha256(code.encode("utf-8")).hexdigest()[:16]}"'
@@ -0,0 +1,245 @@
+"""
+Per-request timing spans and a sampling CPU profiler
+
+TimingMiddleware gives every HTTP request a RequestTrace. Code on the request
+path wraps slow operations in span("db" | "executor" | "log" | "serialize")
+and the summed time per category is returned in a Server-Timing header.
+Spans from test cases running in parallel are added up, so a category can
+exceed the request's wall time. The slowest requests are kept for
+/admin/slow-requests.
+
+The profiler samples the stacks of all threads at a fixed interval and
+writes them in folded format (one "frame;frame;frame count" line per
+stack), which flamegraph.pl and speedscope can open directly.
+"""
+
+import os
+import sys
+import time
+import heapq
+import threading
+import contextvars
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+# Number of slowest requests kept in memory
+SLOW_REQUESTS_KEPT = int(os.getenv("SLOW_REQUESTS_KEPT", "20"))
+
+PROFILE_DIR = Path(__file__).parent / "logs" / "profiles"
+
+_current_trace = contextvars.ContextVar("current_trace", default=None)
+
+class RequestTrace:
+    """Timing spans collected for one request"""
+
+    def __init__(self, method: str, path: str):
+        self.method = method
+        self.path = path
+        self.started_at = datetime.now().isoformat()
+        self.start = time.perf_counter()
+        self.spans = {}  # category -> [total seconds, count]
+        self._lock = threading.Lock()
+
+    def add(self, category: str, seconds: float):
+        with self._lock:
+            totals = self.spans.get(category)
+            if totals is None:
+                self.spans[category] = [seconds, 1]
+            else:
+                totals[0] += seconds
+                totals[1] += 1
+
+    def server_timing(self) -> str:
+        """Server-Timing header value, e.g. 'db;dur=4.1;desc="3", total;dur=9.8'"""
+        with self._lock:
+            parts = [
+                f'{category};dur={seconds * 1000:.1f};desc="{count}"'
+                for category, (seconds, count) in self.spans.items()
+            ]
+        parts.append(f"total;dur={(time.perf_counter() - self.start) * 1000:.1f}")
+        return ", ".join(parts)
+
+    def summary(self, route: str, status_code: int, duration: float) -> dict:
+        with self._lock:
+            spans = {
+                category: {"ms": round(seconds * 1000, 2), "count": count}
+                for category, (seconds, count) in self.spans.items()
+            }
+        return {
+            "started_at": self.started_at,
+            "method": self.method,
+            "path": self.path,
+            "route": route,
+            "status": status_code,
+            "duration_ms": round(duration * 1000, 2),
+            "spans": spans
+        }
+
+def current_trace():
+    """The trace of the request being handled, or None outside a request"""
+    return _current_trace.get()
+
+def record(category: str, seconds: float):
+    """Add a measured duration to the current request's trace (no-op outside a request)"""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add(category, seconds)
+
+@contextmanager
+def span(category: str):
+    """Time the enclosed block into the current request's trace"""
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add(category, time.perf_counter() - start)
+
+def bind(fn):
+    """
+    Wrap fn to run in a copy of the caller's context
+
+    Thread pools do not inherit context variables; use this when submitting
+    work so spans recorded by the task land in the request's trace.
+    """
+    context = contextvars.copy_context()
+
+    def run(*args, **kwargs):
+        return context.run(fn, *args, **kwargs)
+
+    return run
+
+# Slowest requests as a min-heap of (duration, sequence, summary)
+_slowest = []
+_slowest_lock = threading.Lock()
+_sequence = 0
+
+def _remember_if_slow(duration: float, summary: dict):
+    global _sequence
+    with _slowest_lock:
+        _sequence += 1
+        item = (duration, _sequence, summary)
+        if len(_slowest) < SLOW_REQUESTS_KEPT:
+            heapq.heappush(_slowest, item)
+        elif duration > _slowest[0][0]:
+            heapq.heapreplace(_slowest, item)
+
+def slowest_requests() -> list:
+    """Summaries of the slowest requests seen so far, slowest first"""
+    with _slowest_lock:
+        items = sorted(_slowest, reverse=True)
+    return [summary for _, _, summary in items]
+
+def clear_slowest_requests():
+    with _slowest_lock:
+        _slowest.clear()
+
+class TimingMiddleware:
+    """ASGI middleware: one RequestTrace per request, Server-Timing header, slow-request tracking"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trace = RequestTrace(scope.get("method", ""), scope.get("path", ""))
+        token = _current_trace.set(trace)
+        status_code = 500
+        streaming = False
+
+        async def send_wrapper(message):
+            nonlocal status_code, streaming
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = list(message.get("headers", []))
+                for name, value in headers:
+                    if name.lower() == b"content-type" and value.startswith(b"text/event-stream"):
+                        streaming = True
+                headers.append((b"server-timing", trace.server_timing().encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_trace.reset(token)
+            # Long-lived streams (SSE) would crowd out real slow requests
+            if not streaming:
+                duration = time.perf_counter() - trace.start
+                route = getattr(scope.get("route"), "path", None) or "unmatched"
+                _remember_if_slow(duration, trace.summary(route, status_code, duration))
+
+class SamplingProfiler:
+    """Samples all thread stacks at a fixed interval until stopped"""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.stacks = {}
+        self.samples = 0
+        self.started_at = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self.started_at = datetime.now()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                key = ";".join(reversed(stack))
+                self.stacks[key] = self.stacks.get(key, 0) + 1
+            self.samples += 1
+
+    def stop(self) -> Path:
+        """Stop sampling and write the folded stacks; returns the file path"""
+        self._stop.set()
+        self._thread.join()
+        PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+        path = PROFILE_DIR / f"profile-{self.started_at.strftime('%Y%m%d-%H%M%S')}.folded"
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in sorted(self.stacks.items(), key=lambda item: -item[1]):
+                f.write(f"{stack} {count}\n")
+        return path
+
+_profiler = None
+_profiler_lock = threading.Lock()
+
+def start_profiler(interval: float = 0.005) -> bool:
+    """Start sampling; returns False if a profile is already running"""
+    global _profiler
+    with _profiler_lock:
+        if _profiler is not None:
+            return False
+        _profiler = SamplingProfiler(interval=interval)
+        _profiler.start()
+        return True
+
+def stop_profiler():
+    """Stop sampling and write the profile; returns (path, samples) or None if not running"""
+    global _profiler
+    with _profiler_lock:
+        if _profiler is None:
+            return None
+        profiler, _profiler = _profiler, None
+    path = profiler.stop()
+    return path, profiler.samples
+
+def profiler_running() -> bool:
+    return _profiler is not None
@@ -3,83 +3,116 @@ Simple script to view error logs
 Run this to see error logs in a readable format
 """
 
-import json
-from pathlib import Path
-from datetime import datetime
+import argparse
 
-LOG_FILE = Path(__file__).parent / "logs" / "error_log.jsonl"
+import logger
 
-def view_logs(limit=50, error_type=None, team_id=None):
+def print_log(i, log):
+    """Print a single log entry"""
+    print(f"[{i}] {log.get('timestamp', 'Unknown time')}")
+    print(f"    Type: {log.get('error_type', 'Unknown')}")
+    print(f"    Endpoint: {log.get('endpoint', 'Unknown')}")
+    if log.get('team_id'):
+        print(f"    Team ID: {log.get('team_id')}")
+    if log.get('problem_id'):
+        print(f"    Problem ID: {log.get('problem_id')}")
+    if log.get('language'):
+        print(f"    Language: {log.get('language')}")
+    print(f"    Error: {(log.get('error_message') or 'No message')[:200]}...")
+    if log.get('code'):
+        print(f"    Code snippet: {log.get('code', '')[:100]}...")
+    print("-" * 80)
+
+def view_logs(limit=50, error_type=None, team_id=None, problem_id=None, language=None,
+              endpoint=None, since=None, until=None, cursor=None):
     """View error logs in a readable format"""
-    if not LOG_FILE.exists():
+    if not logger.ERROR_LOG_FILE.exists() and not logger.ERROR_LOG_DB.exists():
         print("No error logs found. Log file doesn't exist yet.")
         return
-    
+
     print("="*80)
     print("ERROR LOGS")
     print("="*80)
     print()
-    
-    logs = []
+
     try:
-        with open(LOG_FILE, "r", encoding="utf-8") as f:
-            for line in f:
-                if line.strip():
-                    try:
-                        log_entry = json.loads(line)
-                        
-                        # Apply filters
-                        if error_type and log_entry.get("error_type") != error_type:
-                            continue
-                        if team_id and log_entry.get("team_id") != team_id:
-                            continue
-                        
-                        logs.append(log_entry)
-                    except json.JSONDecodeError:
-                        continue
-        
-        # Sort by timestamp (most recent first)
-        logs.sort(key=lambda x: x.get("timestamp", ""), reverse=True)
-        logs = logs[:limit]
-        
+        # Same indexed query path as the /admin/logs endpoint (most recent first)
+        logs, next_cursor = logger.query_error_logs(
+            limit=limit,
+            error_type=error_type,
+            team_id=team_id,
+            problem_id=problem_id,
+            language=language,
+            endpoint=endpoint,
+            since=since,
+            until=until,
+            cursor=cursor
+        )
+
         if not logs:
             print("No logs found matching the criteria.")
             return
-        
+
         for i, log in enumerate(logs, 1):
-            print(f"[{i}] {log.get('timestamp', 'Unknown time')}")
-            print(f"    Type: {log.get('error_type', 'Unknown')}")
-            print(f"    Endpoint: {log.get('endpoint', 'Unknown')}")
-            if log.get('team_id'):
-                print(f"    Team ID: {log.get('team_id')}")
-            if log.get('problem_id'):
-                print(f"    Problem ID: {log.get('problem_id')}")
-            if log.get('language'):
-                print(f"    Language: {log.get('language')}")
-            print(f"    Error: {log.get('error_message', 'No message')[:200]}...")
-            if log.get('code'):
-                print(f"    Code snippet: {log.get('code', '')[:100]}...")
-            print("-" * 80)
-        
+            print_log(i, log)
+
         print(f"\nTotal logs shown: {len(logs)}")
-        
+        if next_cursor is not None:
+            print(f"More logs available: rerun with --cursor {next_cursor}")
+
     except Exception as e:
         print(f"Error reading logs: {e}")
 
+def follow_logs(error_type=None, team_id=None, problem_id=None, language=None, endpoint=None):
+    """Print new error logs as they are written, until interrupted"""
+    print("="*80)
+    print("FOLLOWING ERROR LOGS (Ctrl+C to stop)")
+    print("="*80)
+    print()
+
+    try:
+        for i, log in enumerate(logger.follow_error_logs(
+            error_type=error_type,
+            team_id=team_id,
+            problem_id=problem_id,
+            language=language,
+            endpoint=endpoint
+        ), 1):
+            print_log(i, log)
+    except KeyboardInterrupt:
+        print("\nStopped following logs.")
+
 if __name__ == "__main__":
-    import sys
-    
-    limit = 50
-    error_type = None
-    team_id = None
-    
-    # Parse command line arguments
-    if len(sys.argv) > 1:
-        limit = int(sys.argv[1])
-    if len(sys.argv) > 2:
-        error_type = sys.argv[2]
-    if len(sys.argv) > 3:
-        team_id = int(sys.argv[3])
-    
-    view_logs(limit=limit, error_type=error_type, team_id=team_id)
+    parser = argparse.ArgumentParser(description="View error logs")
+    parser.add_argument("limit", nargs="?", type=int, default=50, help="Maximum number of logs to show")
+    parser.add_argument("error_type", nargs="?", default=None, help="Filter by error type")
+    parser.add_argument("team_id", nargs="?", type=int, default=None, help="Filter by team ID")
+    parser.add_argument("--problem-id", type=int, default=None, help="Filter by problem ID")
+    parser.add_argument("--language", default=None, help="Filter by language")
+    parser.add_argument("--endpoint", default=None, help="Filter by endpoint (e.g. /submit)")
+    parser.add_argument("--since", default=None, help="Only logs at or after this ISO time")
+    parser.add_argument("--until", default=None, help="Only logs before this ISO time")
+    parser.add_argument("--cursor", type=int, default=None, help="Continue from a previous page")
+    parser.add_argument("--follow", "-f", action="store_true", help="Keep printing new logs as they are written")
+    args = parser.parse_args()
 
+    if args.follow:
+        follow_logs(
+            error_type=args.error_type,
+            team_id=args.team_id,
+            problem_id=args.problem_id,
+            language=args.language,
+            endpoint=args.endpoint
+        )
+    else:
+        view_logs(
+            limit=args.limit,
+            error_type=args.error_type,
+            team_id=args.team_id,
+            problem_id=args.problem_id,
+            language=args.language,
+            endpoint=args.endpoint,
+            since=args.since,
+            until=args.until,
+            cursor=args.cursor
+        )
@@ -0,0 +1,45 @@
+import { NextResponse } from 'next/server';
+import { compressedJson } from '@/lib/compress';
+
+export async function GET(req) {
+  try {
+    const { searchParams } = new URL(req.url);
+    const team_id = searchParams.get('team_id');
+
+    if (!team_id) {
+      return NextResponse.json({ error: 'team_id is required' }, { status: 400 });
+    }
+
+    // Forward the browser's cached ETag so an unchanged bootstrap costs a 304
+    const headers = { 'Content-Type': 'application/json' };
+    const ifNoneMatch = req.headers.get('if-none-match');
+    if (ifNoneMatch) {
+      headers['If-None-Match'] = ifNoneMatch;
+    }
+
+    const res = await fetch(`http://127.0.0.1:8001/bootstrap?team_id=${team_id}`, {
+      method: 'GET',
+      headers,
+      cache: 'no-store',
+    });
+
+    const etag = res.headers.get('ETag');
+    const cacheHeaders = etag ? { ETag: etag, 'Cache-Control': 'private, no-cache' } : {};
+
+    if (res.status === 304) {
+      return new NextResponse(null, { status: 304, headers: cacheHeaders });
+    }
+
+    if (!res.ok) {
+      const errorData = await res.json().catch(() => ({ error: 'Backend returned a non-JSON error' }));
+      console.error("Backend error:", errorData);
+      return NextResponse.json({ error: errorData.detail || 'Backend error' }, { status: res.status });
+    }
+
+    return await compressedJson(req, await res.text(), { headers: cacheHeaders });
+
+  } catch (error) {
+    console.error("API Route error:", error);
+    return NextResponse.json({ error: 'Failed to connect to the backend service. Is the Python server running?' }, { status: 500 });
+  }
+}
@@ -1,6 +1,7 @@
 import { NextResponse } from 'next/server';
+import { compressedJson } from '@/lib/compress';
 
-export async function GET() {
+export async function GET(req) {
   try {
     // Forward the request to the Python backend with timeout
     const controller = new AbortController();
@@ -24,8 +25,7 @@ export async function GET() {
     }
 
     // If successful, parse the JSON and forward it to the client
-    const data = await res.json();
-    return NextResponse.json(data);
+    return await compressedJson(req, await res.text());
 
   } catch (error) {
     console.error("API Route error:", error);
@@ -1,8 +1,21 @@
 import { NextResponse } from 'next/server';
+import { compressedJson } from '@/lib/compress';
+
+// Rate limit headers from the backend that are passed on to the browser
+const RATE_LIMIT_HEADERS = ['Retry-After', 'X-RateLimit-Limit', 'X-RateLimit-Remaining'];
+
+function rateLimitHeaders(res) {
+  const headers = {};
+  for (const name of RATE_LIMIT_HEADERS) {
+    const value = res.headers.get(name);
+    if (value) headers[name] = value;
+  }
+  return headers;
+}
 
 export async function POST(req) {
   try {
-    const { language, code, stdin } = await req.json();
+    const { language, code, stdin, team_id } = await req.json();
 
     if (!language || !code) {
       return NextResponse.json({ error: 'Language and code are required' }, { status: 400 });
@@ -18,9 +31,24 @@ export async function POST(req) {
         language,
         code,
         stdin: stdin || '',
+        team_id,
       }),
     });
 
+    if (res.status === 429 || res.status === 503) {
+      // Rate limited or shedding load; pass the retry hint through
+      const retryAfter = res.headers.get('Retry-After') || '5';
+      const error = res.status === 429 ? 'Too many runs, please slow down' : 'Server is busy, please try again shortly';
+      return NextResponse.json(
+        { error, retry_after: Number(retryAfter) },
+        { status: res.status, headers: rateLimitHeaders(res) }
+      );
+    }
+
+    if (res.status === 504) {
+      return NextResponse.json({ error: 'Time Limit Exceeded' }, { status: 504 });
+    }
+
     if (!res.ok) {
       const errorData = await res.json().catch(() => ({ error: 'Backend returned a non-JSON error' }));
       console.error("Backend error:", errorData);
@@ -28,8 +56,7 @@ export async function POST(req) {
       return NextResponse.json({ error: 'Failed to execute code' }, { status: res.status });
     }
 
-    const data = await res.json();
-    return NextResponse.json(data);
+    return await compressedJson(req, await res.text(), { headers: rateLimitHeaders(res) });
 
   } catch (error) {
     console.error("API Route error:", error);
@@ -1,4 +1,5 @@
 import { NextResponse } from 'next/server';
+import { compressedJson } from '@/lib/compress';
 
 export async function GET(req) {
   try {
@@ -23,8 +24,7 @@ export async function GET(req) {
       return NextResponse.json({ error: errorData.detail || 'Backend error' }, { status: res.status });
     }
 
-    const data = await res.json();
-    return NextResponse.json(data);
+    return await compressedJson(req, await res.text());
 
   } catch (error) {
     console.error("API Route error:", error);
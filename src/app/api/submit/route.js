@@ -1,5 +1,17 @@
 import { NextResponse } from 'next/server';
 
+// Rate limit headers from the backend that are passed on to the browser
+const RATE_LIMIT_HEADERS = ['Retry-After', 'X-RateLimit-Limit', 'X-RateLimit-Remaining'];
+
+function rateLimitHeaders(res) {
+  const headers = {};
+  for (const name of RATE_LIMIT_HEADERS) {
+    const value = res.headers.get(name);
+    if (value) headers[name] = value;
+  }
+  return headers;
+}
+
 export async function POST(req) {
   try {
     const { problem_id, team_id, code, language } = await req.json();
@@ -18,6 +30,14 @@ export async function POST(req) {
       }),
     });
 
+    if (res.status === 429) {
+      const retryAfter = res.headers.get('Retry-After') || '10';
+      return NextResponse.json(
+        { error: `Too many submissions, please wait ${retryAfter} seconds`, retry_after: Number(retryAfter) },
+        { status: 429, headers: rateLimitHeaders(res) }
+      );
+    }
+
     // Check if the backend responded successfully
     if (!res.ok) {
       // If the backend returned an error, try to parse it and forward it
@@ -28,7 +48,7 @@ export async function POST(req) {
 
     // If successful, parse the JSON and forward it to the client
     const data = await res.json();
-    return NextResponse.json(data);
+    return NextResponse.json(data, { headers: rateLimitHeaders(res) });
 
   } catch (error) {
     // This block will catch network errors (e.g., if the backend is not running)
@@ -34,8 +34,7 @@ export async function GET(req) {
       );
     }
 
-    const data = await res.json();
-    return NextResponse.json(data);
+    return await compressedJson(req, await res.text());
   } catch (error) {
     console.error("API Route error:", error);
     return NextResponse.json(
@@ -81,50 +81,6 @@ const languageOptions = [
   { value: "csharp", label: "C#" },
 ];
 
-// Generate language-specific code templates based on Python buggy code
-const generateCodeTemplate = (pythonCode, targetLanguage, problemId) => {
-  // Extract function name and logic from Python code
-  const functionMatch = pythonCode.match(/def\s+(\w+)\s*\([^)]*\)\s*:/);
-  if (!functionMatch) {
-    // Fallback templates if we can't parse
-    const templates = {
-      python: pythonCode,
-      javascript: `// Write your fix here\n\nfunction solution() {\n    // TODO: Implement your solution\n}\n\n// Read input\nconst readline = require('readline');\nconst rl = readline.createInterface({\n    input: process.stdin,\n    output: process.stdout\n});\n\nrl.on('line', (line) => {\n    // Process input\n    console.log(solution());\n    rl.close();\n});`,
-      java: `// Write your fix here\n\npublic class Main {\n    public static void main(String[] args) {\n        // TODO: Implement your solution\n        java.util.Scanner scanner = new java.util.Scanner(System.in);\n        // Read input and process\n    }\n}`,
-      cpp: `// Write your fix here\n\n#include <iostream>\nusing namespace std;\n\nint main() {\n    // TODO: Implement your solution\n    int a, b;\n    cin >> a >> b;\n    // Process and output\n    return 0;\n}`,
-      c: `// Write your fix here\n\n#include <stdio.h>\n\nint main() {\n    // TODO: Implement your solution\n    int a, b;\n    scanf("%d %d", &a, &b);\n    // Process and output\n    return 0;\n}`,
-      csharp: `// Write your fix here\n\nusing System;\n\nclass Program {\n    static void Main() {\n        // TODO: Implement your solution\n        string[] input = Console.ReadLine().Split();\n        // Process and output\n    }\n}`,
-    };
-    return templates[targetLanguage] || pythonCode;
-  }
-
-  const functionName = functionMatch[1];
-  const paramsMatch = pythonCode.match(/def\s+\w+\s*\(([^)]*)\)/);
-  const params = paramsMatch ? paramsMatch[1].split(',').map(p => p.trim()) : [];
-
-  // Extract the buggy return statement
-  const returnMatch = pythonCode.match(/return\s+([^#\n]+)/);
-  const buggyReturn = returnMatch ? returnMatch[1].trim() : '';
-
-  // Extract main block logic
-  const mainBlock = pythonCode.includes("if __name__ == '__main__':")
-    ? pythonCode.split("if __name__ == '__main__':")[1]
-    : '';
-
-  // Generate templates based on problem structure
-  // For Python, we keep the original code as-is so users can modify it freely
-  const templates = {
-    python: pythonCode, // Keep original Python code - user can modify it
-    javascript: `function ${functionName}(${params.join(', ')}) {\n    // This function has a bug\n    return ${buggyReturn}; // Bug: fix this\n}\n\n// Read input from stdin\nconst readline = require('readline');\nconst rl = readline.createInterface({\n    input: process.stdin,\n    output: process.stdout\n});\n\nlet inputLines = [];\nrl.on('line', (line) => {\n    inputLines.push(line);\n});\n\nrl.on('close', () => {\n    const [a, b] = inputLines[0].split(' ').map(Number);\n    console.log(${functionName}(a, b));\n});`,
-    java: `public class Main {\n    public static int ${functionName}(${params.map(p => `int ${p}`).join(', ')}) {\n        // This function has a bug\n        return ${buggyReturn}; // Bug: fix this\n    }\n    \n    public static void main(String[] args) {\n        java.util.Scanner scanner = new java.util.Scanner(System.in);\n        int a = scanner.nextInt();\n        int b = scanner.nextInt();\n        System.out.println(${functionName}(a, b));\n    }\n}`,
-    cpp: `#include <iostream>\nusing namespace std;\n\nint ${functionName}(${params.map(p => `int ${p}`).join(', ')}) {\n    // This function has a bug\n    return ${buggyReturn}; // Bug: fix this\n}\n\nint main() {\n    int a, b;\n    cin >> a >> b;\n    cout << ${functionName}(a, b) << endl;\n    return 0;\n}`,
-    c: `#include <stdio.h>\n\nint ${functionName}(${params.map(p => `int ${p}`).join(', ')}) {\n    // This function has a bug\n    return ${buggyReturn}; // Bug: fix this\n}\n\nint main() {\n    int a, b;\n    scanf("%d %d", &a, &b);\n    printf("%d\\n", ${functionName}(a, b));\n    return 0;\n}`,
-    csharp: `using System;\n\nclass Program {\n    static int ${functionName}(${params.map(p => `int ${p}`).join(', ')}) {\n        // This function has a bug\n        return ${buggyReturn}; // Bug: fix this\n    }\n    \n    static void Main() {\n        string[] input = Console.ReadLine().Split();\n        int a = int.Parse(input[0]);\n        int b = int.Parse(input[1]);\n        Console.WriteLine(${functionName}(a, b));\n    }\n}`,
-  };
-
-  return templates[targetLanguage] || pythonCode;
-};
-
 export default function BranchPage() {
   const router = useRouter();
   const params = useParams();
@@ -152,6 +108,9 @@ export default function BranchPage() {
   const undoStack = useRef([]);
   const redoStack = useRef([]);
   const isUndoRedo = useRef(false);
+  // Language templates already fetched for this problem, and the one last asked for
+  const templateCache = useRef(new Map());
+  const requestedLanguage = useRef(null);
 
 
   useEffect(() => {
@@ -202,106 +161,79 @@ export default function BranchPage() {
       const found = list.find((p) => Number(p.id) === problemId);
       if (found) {
         setProblem(found);
-        const pythonCode = found.buggy_file_blob || "";
-        
-        // Use template
-        const initialLanguage = "python";
-        setLanguage(initialLanguage);
-        const templateCode = generateCodeTemplate(pythonCode, initialLanguage, problemId);
+        // Start in Python, whose template is the buggy file itself
+        setLanguage("python");
         resetHistory(); // Reset undo/redo history when loading template
-        setCode(templateCode);
+        setCode(found.buggy_file_blob || "");
         setStdin(""); // Clear stdin - user will provide their own input
         return true;
       }
       return false;
     };
 
+    const restoreCachedSubmissions = () => {
+      const cachedSubs = localStorage.getItem("submissions");
+      if (cachedSubs) {
+        try {
+          setSubmissions(JSON.parse(cachedSubs));
+        } catch (parseError) {
+          console.warn("Failed to parse cached submissions", parseError);
+        }
+      }
+    };
+
+    // One request for problems, visible test cases and submission statuses
     const initializeProblem = async () => {
+      let problemSet = false;
       if (cached) {
-        const result = await trySetProblem(cached);
-        if (result) {
+        problemSet = await trySetProblem(cached);
+        if (problemSet) {
           setLoadingProblem(false);
-          return;
         }
       }
 
-      setLoadingProblem(true);
-      try {
-        const res = await fetch("/api/problems");
-        if (!res.ok) throw new Error("Failed to load problems");
-        const data = await res.json();
-        localStorage.setItem("problems_cache", JSON.stringify(data));
-        const result = await trySetProblem(data);
-        if (!result) {
-          toast.error("Challenge not found. Redirecting to the map.");
-          router.replace("/");
-        }
-      } catch (error) {
-        console.error(error);
-        toast.error("Unable to load this challenge right now.");
-      } finally {
-        setLoadingProblem(false);
+      if (!problemSet) {
+        setLoadingProblem(true);
       }
-    };
-
-    initializeProblem();
-  }, [isAuthenticated, problemId, router, teamInfo]);
-
-  // Fetch test cases when problem is loaded (only visible ones)
-  useEffect(() => {
-    if (!problem || !problem.id) return;
-
-    const fetchTestCases = async () => {
       try {
-        // Only fetch visible test cases (not hidden ones)
-        const res = await fetch(`/api/testcases?problem_id=${problem.id}`);
-        if (!res.ok) throw new Error("Failed to load test cases");
+        const res = await fetch(`/api/bootstrap?team_id=${teamInfo.team_id}`);
+        if (!res.ok) throw new Error("Failed to load challenge data");
         const data = await res.json();
-        setTestCases(data);
-      } catch (error) {
-        console.error("Failed to fetch test cases:", error);
-      }
-    };
-
-    fetchTestCases();
-  }, [problem]);
 
+        localStorage.setItem("problems_cache", JSON.stringify(data.problems));
+        if (!problemSet) {
+          const result = await trySetProblem(data.problems);
+          if (!result) {
+            toast.error("Challenge not found. Redirecting to the map.");
+            router.replace("/");
+            return;
+          }
+        }
 
-  useEffect(() => {
-    if (!isAuthenticated || !teamInfo) return;
+        setTestCases((data.test_cases || {})[String(problemId)] || []);
 
-    const fetchSubmissions = async () => {
-      try {
-        const response = await fetch(
-          `/api/submissions?team_id=${teamInfo.team_id}`
-        );
-        if (!response.ok) throw new Error("Failed to fetch submissions");
-        const data = await response.json();
         const subs = {};
-        data.forEach((sub) => {
+        data.submissions.forEach((sub) => {
           subs[sub.problem_id] = sub.status;
         });
         setSubmissions(subs);
         localStorage.setItem("submissions", JSON.stringify(subs));
       } catch (error) {
-        if (!submissionsFetchWarned.current) {
+        console.error(error);
+        if (!problemSet) {
+          toast.error("Unable to load this challenge right now.");
+        } else if (!submissionsFetchWarned.current) {
           submissionsFetchWarned.current = true;
           toast.error("Unable to sync submissions. Showing last saved progress.");
         }
-        const cached = localStorage.getItem("submissions");
-        if (cached) {
-          try {
-            setSubmissions(JSON.parse(cached));
-          } catch (parseError) {
-            console.warn("Failed to parse cached submissions", parseError);
-          }
-        }
-        console.warn("Failed to fetch submissions. Using cached data if available.", error);
+        restoreCachedSubmissions();
+      } finally {
+        setLoadingProblem(false);
       }
     };
 
-    fetchSubmissions();
-  }, [isAuthenticated, teamInfo]);
+    initializeProblem();
+  }, [isAuthenticated, problemId, router, teamInfo]);
 
   useEffect(() => {
     if (!isAuthenticated || !timerStartTime) return;
@@ -408,9 +340,19 @@ export default function BranchPage() {
           language,
           code,
           stdin: useStdin,
+          team_id: teamInfo?.team_id,
         }),
       });
       const data = await response.json();
+      if (response.status === 429 || response.status === 503) {
+        const reason = response.status === 429 ? "Too many runs" : "Server is busy";
+        setOutput(`${reason}. Please try again in ${data.retry_after || 5} seconds.`);
+        return;
+      }
+      if (response.status === 504) {
+        setOutput("Time Limit Exceeded");
+        return;
+      }
       if (!response.ok) {
         // Hide actual error details
         throw new Error("Failed to execute code.");
@@ -497,11 +439,21 @@ export default function BranchPage() {
           language,
           code,
           test_cases: testCasesForBatch,
+          team_id: teamInfo?.team_id,
+          problem_id: problem?.id,
+          // Inputs and expected outputs are known here; only verdicts and output excerpts come back
+          compact: true,
         }),
       });
 
       const data = await response.json();
 
+      if (response.status === 429 || response.status === 503) {
+        const reason = response.status === 429 ? "Too many runs" : "Server is busy";
+        setOutput(`${reason}. Please try again in ${data.retry_after || 5} seconds.`);
+        toast.error(`${reason}, please retry shortly.`);
+        return;
+      }
       if (!response.ok) {
         throw new Error(data.error || "Failed to run test cases");
       }
@@ -519,11 +471,22 @@ export default function BranchPage() {
           failedCount++;
         }
 
+        let actual = result.error === "Time Limit Exceeded"
+          ? "Time Limit Exceeded"
+          : result.error ? "Error occurred" : (result.actual_output || "(no output)");
+        if (!result.error && result.truncated) {
+          actual += "\n  ... (output truncated)";
+        }
+        if (!passed && result.diff) {
+          const shown = (line) => (line === null ? "(end of output)" : JSON.stringify(line));
+          actual += `\n  First difference on line ${result.diff.line}: expected ${shown(result.diff.expected)}, got ${shown(result.diff.actual)}`;
+        }
+
         return {
           testCase: i + 1,
-          input: result.input,
-          expected: result.expected_output,
-          actual: result.error ? "Error occurred" : (result.actual_output || "(no output)"),
+          input: testCasesForBatch[i].input,
+          expected: testCasesForBatch[i].expected_output.trim(),
+          actual,
           passed,
         };
       });
@@ -737,6 +700,42 @@ export default function BranchPage() {
     redoStack.current = [];
   };
 
+  // Load the server-generated starter code for a language (cached per problem)
+  const switchTemplate = async (newLanguage) => {
+    requestedLanguage.current = newLanguage;
+    const applyTemplate = (templateCode) => {
+      // Ignore answers for a language the user already switched away from
+      if (requestedLanguage.current !== newLanguage) return;
+      resetHistory(); // Reset undo/redo history on language change
+      setCode(templateCode);
+    };
+
+    if (newLanguage === "python") {
+      applyTemplate(problem.buggy_file_blob);
+      return;
+    }
+    const cacheKey = `${problemId}:${newLanguage}`;
+    if (templateCache.current.has(cacheKey)) {
+      applyTemplate(templateCache.current.get(cacheKey));
+      return;
+    }
+
+    try {
+      const res = await fetch(
+        `/api/problems/${problemId}/template?language=${encodeURIComponent(newLanguage)}`
+      );
+      const data = await res.json();
+      if (!res.ok) {
+        throw new Error(data.error || "Template request failed");
+      }
+      templateCache.current.set(cacheKey, data.code);
+      applyTemplate(data.code);
+    } catch (error) {
+      console.error("Failed to load template", error);
+      toast.error("Unable to load the starter code for this language.");
+    }
+  };
+
   const solvedCount = useMemo(
     () => Object.values(submissions).filter((status) => status === "Accepted").length,
     [submissions]
@@ -876,17 +875,10 @@ export default function BranchPage() {
                       key={option.value}
                       className={`${styles.languageTab} ${language === option.value ? styles.languageTabActive : ''}`}
                       onClick={() => {
-                        const newLanguage = option.value;
-                        setLanguage(newLanguage);
+                        setLanguage(option.value);
                         // Update code template when language changes
                         if (problem?.buggy_file_blob) {
-                          const newCode = generateCodeTemplate(
-                            problem.buggy_file_blob,
-                            newLanguage,
-                            problemId
-                          );
-                          resetHistory(); // Reset undo/redo history on language change
-                          setCode(newCode);
+                          switchTemplate(option.value);
                         }
                       }}
                     >
@@ -123,9 +123,10 @@ export default function Home() {
   // Fetch problems with caching
   useEffect(() => {
     if (isAuthenticated && !showLanding) {
-      fetchProblems();
       if (teamInfo) {
-        fetchSubmissions();
+        fetchBootstrap();
+      } else {
+        fetchProblems();
       }
     }
   }, [isAuthenticated, teamInfo, showLanding]);
@@ -178,6 +179,27 @@ export default function Home() {
     }
   };
 
+  // Problems and submission statuses in one round trip
+  const fetchBootstrap = async () => {
+    try {
+      const response = await fetch(`/api/bootstrap?team_id=${teamInfo.team_id}`);
+      if (!response.ok) throw new Error("Failed to fetch bootstrap data");
+      const data = await response.json();
+      setProblems(data.problems);
+      localStorage.setItem("problems_cache", JSON.stringify(data.problems));
+      const subs = {};
+      data.submissions.forEach((sub) => {
+        subs[sub.problem_id] = sub.status;
+      });
+      setSubmissions(subs);
+      localStorage.setItem("submissions", JSON.stringify(subs));
+    } catch (error) {
+      console.warn("Bootstrap failed, falling back to separate requests.", error);
+      fetchProblems();
+      fetchSubmissions();
+    }
+  };
+
   const fetchSubmissions = async () => {
     if (!teamInfo) return;
 
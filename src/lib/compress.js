@@ -0,0 +1,53 @@
+import { promisify } from 'util';
+import { brotliCompress, gzip, constants } from 'zlib';
+
+const brotliAsync = promisify(brotliCompress);
+const gzipAsync = promisify(gzip);
+
+// Same settings as the backend (backend/responses.py): bodies smaller than this
+// are sent as they are, and fast levels give most of the size win
+const COMPRESSION_MIN_SIZE = 1024;
+const BROTLI_QUALITY = 4;
+const GZIP_LEVEL = 5;
+
+// "br" or "gzip" from an Accept-Encoding header, whichever the browser prefers (br on a tie)
+const chooseEncoding = (acceptEncoding) => {
+  const accepted = {};
+  for (const part of acceptEncoding.toLowerCase().split(',')) {
+    const [name, ...params] = part.trim().split(';');
+    const q = params.map((p) => p.trim()).find((p) => p.startsWith('q='));
+    accepted[name.trim()] = q ? Number(q.slice(2)) || 0 : 1;
+  }
+  const br = accepted.br ?? accepted['*'] ?? 0;
+  const gz = accepted.gzip ?? accepted['*'] ?? 0;
+  if (br > 0 && br >= gz) return 'br';
+  if (gz > 0) return 'gzip';
+  return null;
+};
+
+/**
+ * JSON response for the browser, compressed when it is large enough
+ *
+ * The backend's JSON text is forwarded as it is, without parsing and
+ * re-serializing it. Node's fetch has already decompressed the backend's
+ * response, so this is what makes the browser get a compressed payload.
+ */
+export async function compressedJson(req, body, init = {}) {
+  const headers = new Headers(init.headers);
+  headers.set('Content-Type', 'application/json');
+  headers.append('Vary', 'Accept-Encoding');
+
+  const raw = Buffer.from(body, 'utf8');
+  const encoding = raw.length >= COMPRESSION_MIN_SIZE
+    ? chooseEncoding(req.headers.get('accept-encoding') || '')
+    : null;
+  if (!encoding) {
+    return new Response(raw, { ...init, headers });
+  }
+
+  const compressed = encoding === 'br'
+    ? await brotliAsync(raw, { params: { [constants.BROTLI_PARAM_QUALITY]: BROTLI_QUALITY } })
+    : await gzipAsync(raw, { level: GZIP_LEVEL });
+  headers.set('Content-Encoding', encoding);
+  return new Response(compressed, { ...init, headers });
+}